@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 {
     'name': 'Odoo Bank',
-    'version': '19.0.1.0.0',
+    'version': '19.0.1.1.0',
     'category': 'Banking',
     'summary': 'Comprehensive Banking Management System',
     'description': """
@@ -23,6 +23,7 @@
     'license': 'LGPL-3',
     'depends': [
         'base',
+        'bus',
         'mail',
         'web',
         'account',
@@ -35,15 +36,30 @@
         # Data
         'data/bank_data.xml',
         'data/email_templates.xml',
+        'data/bank_fee_rule_data.xml',
+        'data/bank_screening_rule_data.xml',
+        'data/bank_notification_template_data.xml',
         
         # Views
         'views/bank_customer_views.xml',
         'views/bank_account_views.xml',
+        'views/bank_account_hold_views.xml',
+        'views/bank_account_daily_balance_views.xml',
         'views/bank_transaction_views.xml',
+        'views/bank_transaction_archive_views.xml',
+        'views/bank_reconciliation_views.xml',
+        'views/bank_journal_views.xml',
         'views/bank_transfer_views.xml',
+        'views/bank_standing_order_views.xml',
+        'views/bank_fee_rule_views.xml',
+        'views/bank_screening_rule_views.xml',
+        'views/bank_notification_template_views.xml',
         'views/bank_loan_views.xml',
+        'views/bank_loan_portfolio_views.xml',
         'views/bank_fixed_deposit_views.xml',
         'views/bank_dashboard_views.xml',
+        'views/bank_job_views.xml',
+        'views/bank_balance_drift_views.xml',
         'views/bank_menus.xml',
         
         # Reports
@@ -1,7 +1,61 @@
 # -*- coding: utf-8 -*-
 
-from odoo import http
+import csv
+import io
+import os
+import tempfile
+from datetime import timedelta
+
+from werkzeug.exceptions import BadRequest, Forbidden
+
+from odoo import http, fields
 from odoo.http import request
+from odoo.modules.registry import Registry
+
+EXPORT_FETCH_SIZE = 5000
+XLSX_MAX_ROWS = 1048576  # Excel sheet row limit, header included
+
+EXPORT_COLUMNS = [
+    ('transaction_number', 'Transaction Number'),
+    ('transaction_date', 'Transaction Date'),
+    ('account_number', 'Account Number'),
+    ('customer_name', 'Customer'),
+    ('transaction_type', 'Transaction Type'),
+    ('amount', 'Amount'),
+    ('currency', 'Currency'),
+    ('balance_before', 'Balance Before'),
+    ('balance_after', 'Balance After'),
+    ('status', 'Status'),
+    ('reference', 'Reference'),
+    ('description', 'Description'),
+]
+
+EXPORT_QUERY = """
+    SELECT t.transaction_number, t.transaction_date, a.account_number, c.full_name,
+           t.transaction_type, t.amount, cur.name, t.balance_before, t.balance_after,
+           t.status, t.reference, t.description
+      FROM (
+            SELECT id, transaction_number, transaction_date, account_id, customer_id,
+                   transaction_type, amount, currency_id, balance_before, balance_after,
+                   status, reference, description
+              FROM bank_transaction
+             WHERE transaction_date >= %(date_from)s
+               AND transaction_date < %(date_to)s
+               AND (%(account_id)s IS NULL OR account_id = %(account_id)s)
+            UNION ALL
+            SELECT id, transaction_number, transaction_date, account_id, customer_id,
+                   transaction_type, amount, currency_id, balance_before, balance_after,
+                   status, reference, description
+              FROM bank_transaction_archive
+             WHERE transaction_date >= %(date_from)s
+               AND transaction_date < %(date_to)s
+               AND (%(account_id)s IS NULL OR account_id = %(account_id)s)
+           ) t
+      JOIN bank_account a ON a.id = t.account_id
+      LEFT JOIN bank_customer c ON c.id = t.customer_id
+      LEFT JOIN res_currency cur ON cur.id = t.currency_id
+     ORDER BY t.transaction_date, t.id
+"""
 
 
 class BankController(http.Controller):
@@ -12,7 +66,115 @@ class BankController(http.Controller):
         return request.render('odoo_bank.customer_dashboard', {})
     
     @http.route('/bank/api/transfer', type='json', auth='user', methods=['POST'])
-    def api_transfer(self, **kwargs):
-        """API endpoint for money transfers"""
-        # This will be used by OWL components
-        return {'status': 'success'}
+    def api_transfer(self, from_account_id, to_account_id, amount, description=False, **kwargs):
+        """Internal transfer between two accounts, completed at once when no approval is needed"""
+        return request.env['bank.transfer'].transfer_internal(
+            int(from_account_id), int(to_account_id), float(amount), description or False)
+    
+    @http.route('/bank/api/accounts/search', type='json', auth='user', methods=['POST'])
+    def api_search_accounts(self, term='', offset=0, limit=20, **kwargs):
+        """Typeahead search of active accounts by number or name prefix, one page at a time"""
+        return request.env['bank.account'].search_accounts(term, offset=offset, limit=limit)
+    
+    @http.route('/bank/export/transactions', type='http', auth='user', methods=['GET'])
+    def export_transactions(self, date_from=None, date_to=None, account_id=None, file_format='csv', **kwargs):
+        """Stream transactions between date_from (included) and date_to (excluded) as CSV or XLSX
+        
+        Rows are fetched from a server-side cursor in chunks of EXPORT_FETCH_SIZE
+        and written to the response as they come, so memory does not grow with
+        the size of the export.
+        """
+        if not request.env.user.has_group('odoo_bank.group_bank_manager'):
+            raise Forbidden()
+        if file_format not in ('csv', 'xlsx'):
+            raise BadRequest('Unsupported export format')
+        try:
+            params = {
+                'date_from': fields.Date.to_date(date_from) or fields.Date.today().replace(month=1, day=1),
+                'date_to': fields.Date.to_date(date_to) or fields.Date.today() + timedelta(days=1),
+                'account_id': int(account_id) if account_id else None,
+            }
+        except ValueError:
+            raise BadRequest('Invalid export parameters')
+        
+        request.env['bank.audit.log'].sudo().log_action(
+            'export', 'bank.transaction', 0,
+            f"Transaction export {params['date_from']} - {params['date_to']} ({file_format})",
+        )
+        
+        filename = f"transactions_{params['date_from']}_{params['date_to']}.{file_format}"
+        if file_format == 'csv':
+            body, mimetype = self._stream_transactions_csv(request.db, params), 'text/csv; charset=utf-8'
+        else:
+            body = self._stream_transactions_xlsx(request.db, params)
+            mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        return request.make_response(body, headers=[
+            ('Content-Type', mimetype),
+            ('Content-Disposition', http.content_disposition(filename)),
+            ('X-Accel-Buffering', 'no'),
+        ])
+    
+    def _fetch_export_rows(self, dbname, params):
+        """Yield lists of export rows, reading them through a server-side cursor
+        
+        The generator runs after the request cursor is closed, so it opens its
+        own (read-only, hence on the replica when one is configured).
+        """
+        with Registry(dbname).cursor(readonly=True) as cr:
+            cr.execute("DECLARE bank_transaction_export NO SCROLL CURSOR FOR " + EXPORT_QUERY, params)
+            while True:
+                cr.execute("FETCH FORWARD %s FROM bank_transaction_export", [EXPORT_FETCH_SIZE])
+                rows = cr.fetchall()
+                if not rows:
+                    break
+                yield rows
+            cr.execute("CLOSE bank_transaction_export")
+    
+    def _stream_transactions_csv(self, dbname, params):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([label for _name, label in EXPORT_COLUMNS])
+        for rows in self._fetch_export_rows(dbname, params):
+            writer.writerows(rows)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue().encode('utf-8')
+    
+    def _stream_transactions_xlsx(self, dbname, params):
+        """Build the workbook in constant-memory mode on disk, then stream the file
+        
+        XLSX is a zip archive and cannot be emitted row by row; xlsxwriter's
+        constant_memory mode flushes each row to a temporary file instead of
+        keeping the sheet in memory. Rows beyond the Excel limit continue on
+        a new sheet.
+        """
+        import xlsxwriter
+        
+        fd, path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(fd)
+        try:
+            workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'remove_timezone': True})
+            date_format = workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm:ss'})
+            headers = [label for _name, label in EXPORT_COLUMNS]
+            sheet, row_index = None, XLSX_MAX_ROWS
+            for rows in self._fetch_export_rows(dbname, params):
+                for row in rows:
+                    if row_index >= XLSX_MAX_ROWS:
+                        sheet = workbook.add_worksheet()
+                        sheet.write_row(0, 0, headers)
+                        sheet.set_column(1, 1, 20, date_format)
+                        row_index = 1
+                    sheet.write_row(row_index, 0, row)
+                    row_index += 1
+            if sheet is None:
+                workbook.add_worksheet().write_row(0, 0, headers)
+            workbook.close()
+            with open(path, 'rb') as f:
+                while True:
+                    chunk = f.read(64 * 1024)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            os.remove(path)
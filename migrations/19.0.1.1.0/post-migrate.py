@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """Back hold totals set before bank.account.hold with holds, then recompute them
+
+    hold_amount used to be edited directly. Any part of it not covered by
+    active holds becomes one 'other' hold, so the total stays what it was,
+    and hold_amount and available_balance are then recomputed from the
+    active holds.
+    """
+    if not version:
+        return
+    cr.execute("""
+        INSERT INTO bank_account_hold (account_id, hold_type, amount, reference, description,
+                                       placed_date, status, create_date, write_date)
+        SELECT a.id, 'other', a.hold_amount - coalesce(h.total, 0), 'MIGRATED',
+               'Hold amount set before account holds existed',
+               now() at time zone 'UTC', 'active', now() at time zone 'UTC', now() at time zone 'UTC'
+          FROM bank_account a
+          LEFT JOIN (SELECT account_id, sum(amount) AS total
+                       FROM bank_account_hold
+                      WHERE status = 'active'
+                      GROUP BY account_id) h ON h.account_id = a.id
+         WHERE a.hold_amount > coalesce(h.total, 0)
+    """)
+    _logger.info('Created %s holds for hold amounts set before account holds', cr.rowcount)
+    cr.execute("""
+        UPDATE bank_account a
+           SET hold_amount = coalesce(h.total, 0),
+               available_balance = a.balance - coalesce(h.total, 0)
+          FROM bank_account b
+          LEFT JOIN (SELECT account_id, sum(amount) AS total
+                       FROM bank_account_hold
+                      WHERE status = 'active'
+                      GROUP BY account_id) h ON h.account_id = b.id
+         WHERE a.id = b.id
+           AND (a.hold_amount IS DISTINCT FROM coalesce(h.total, 0)
+                OR a.available_balance IS DISTINCT FROM a.balance - coalesce(h.total, 0))
+    """)
+    _logger.info('Recomputed the hold totals of %s accounts', cr.rowcount)
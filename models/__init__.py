@@ -1,10 +1,28 @@
 # -*- coding: utf-8 -*-
 
+from . import bank_posting_mixin
+from . import bank_status_mixin
+from . import bank_batch
+from . import bank_job
+from . import bank_event
+from . import bank_replica
+from . import bank_exchange_rate
+from . import bank_fee_rule
 from . import bank_customer
 from . import bank_account
+from . import bank_account_hold
+from . import bank_journal
 from . import bank_transaction
+from . import bank_screening
 from . import bank_transfer
+from . import bank_standing_order
 from . import bank_loan
+from . import bank_loan_portfolio
 from . import bank_fixed_deposit
 from . import bank_notification
+from . import bank_notification_template
 from . import bank_audit_log
+from . import bank_reconciliation
+from . import bank_account_daily_balance
+from . import bank_balance_drift
+from . import bank_transaction_archive
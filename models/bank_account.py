@@ -1,22 +1,32 @@
 # -*- coding: utf-8 -*-
 
+from collections import defaultdict
+
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError
+from odoo.tools import SQL
+from odoo.tools.lru import LRU
+from odoo.tools.sql import create_index
 import random
 import string
 
+# Recently used account ids per (database, user), kept in the worker process
+_RECENT_ACCOUNTS = LRU(4096)
+RECENT_ACCOUNT_LIMIT = 10
+
 
 class BankAccount(models.Model):
     _name = 'bank.account'
     _description = 'Bank Account'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'bank.posting.mixin']
     _rec_name = 'account_number'
+    _bank_audit_action = 'update'
 
     # Account Information
     account_number = fields.Char(string='Account Number', required=True, 
                                  copy=False, readonly=True, 
                                  default=lambda self: 'New')
-    account_name = fields.Char(string='Account Name', required=True, tracking=True)
+    account_name = fields.Char(string='Account Name', required=True, tracking=True, index='trigram')
     account_type = fields.Selection([
         ('savings', 'Savings Account'),
         ('current', 'Current Account'),
@@ -37,7 +47,8 @@ class BankAccount(models.Model):
                                        currency_field='currency_id', 
                                        compute='_compute_available_balance', store=True)
     hold_amount = fields.Monetary(string='Hold Amount', currency_field='currency_id', 
-                                 default=0.0)
+                                 default=0.0, readonly=True,
+                                 help='Total of active holds, maintained by the hold records.')
     currency_id = fields.Many2one('res.currency', string='Currency', 
                                  required=True, 
                                  default=lambda self: self.env.company.currency_id)
@@ -63,6 +74,8 @@ class BankAccount(models.Model):
     # Relations
     transaction_ids = fields.One2many('bank.transaction', 'account_id', string='Transactions')
     transaction_count = fields.Integer(string='Transaction Count', compute='_compute_transaction_count')
+    hold_ids = fields.One2many('bank.account.hold', 'account_id', string='Holds')
+    active_hold_count = fields.Integer(string='Active Holds', compute='_compute_active_hold_count')
     color = fields.Integer(string='Color Index')
     
     # Security
@@ -82,6 +95,13 @@ class BankAccount(models.Model):
         ('account_number_unique', 'unique(account_number)', 'Account number must be unique!'),
     ]
     
+    def init(self):
+        # Prefix searches of the account picker, whatever the database collation
+        create_index(self.env.cr, 'bank_account_number_prefix_idx', self._table,
+                     ['account_number text_pattern_ops'], where="status = 'active'")
+        create_index(self.env.cr, 'bank_account_name_prefix_idx', self._table,
+                     ['lower(account_name) text_pattern_ops'], where="status = 'active'")
+    
     @api.model_create_multi
     def create(self, vals_list):
         for vals in vals_list:
@@ -98,8 +118,29 @@ class BankAccount(models.Model):
                 'description': f'Account created: {result.account_number}',
                 'user_id': self.env.user.id,
             })
+        results._post_opening_entries()
         return results
     
+    def _post_opening_entries(self):
+        """Book the balance accounts are created with against opening balance equity
+
+        The balance is already set, so only the entries are written, like
+        the opening entry of BankJournalLine.init for older accounts.
+        """
+        accounts = self.filtered(lambda a: not a.currency_id.is_zero(a.balance))
+        if not accounts:
+            return
+        Rate = self.env['bank.exchange.rate']
+        company_currency = self.env.company.currency_id
+        entries = []
+        for account in accounts:
+            company_balance = Rate._convert(account.balance, account.currency_id, company_currency)
+            entries.append(([
+                ('customer_deposits', account.id, -company_balance, -account.balance),
+                ('opening_equity', False, company_balance, False),
+            ], account.account_number, 'Opening balance', None))
+        self.env['bank.journal.entry']._create_entries(entries)
+    
     def _generate_account_number(self):
         """Generate unique 12-digit account number"""
         while True:
@@ -117,6 +158,13 @@ class BankAccount(models.Model):
         for record in self:
             record.transaction_count = len(record.transaction_ids)
     
+    def _compute_active_hold_count(self):
+        counts = dict(self.env['bank.account.hold']._read_group(
+            [('account_id', 'in', self.ids), ('status', '=', 'active')],
+            ['account_id'], ['__count']))
+        for record in self:
+            record.active_hold_count = counts.get(record, 0)
+    
     def action_activate(self):
         """Activate account"""
         for record in self:
@@ -124,13 +172,10 @@ class BankAccount(models.Model):
                 raise ValidationError('Customer KYC must be approved before activating account.')
             record.status = 'active'
             record.message_post(body='Account activated')
-            # Send notification
-            self.env['bank.notification'].create({
-                'customer_id': record.customer_id.id,
-                'notification_type': 'email',
-                'subject': 'Account Activated',
-                'message': f'Your account {record.account_number} has been activated.',
-            })
+        # Send notification
+        self.env['bank.notification']._notify('account_activated', [
+            (record.customer_id, {'account_number': record.account_number}) for record in self
+        ])
     
     def action_freeze(self):
         """Freeze account"""
@@ -158,21 +203,145 @@ class BankAccount(models.Model):
             'context': {'default_account_id': self.id}
         }
     
+    @api.model
+    def get_dashboard_data(self):
+        """Return the dashboard KPIs, read from the replica when available"""
+        with self.env['bank.replica.router']._read_env() as env:
+            [(account_count, total_balance)] = env['bank.account']._read_group(
+                [('status', '=', 'active')], [], ['__count', 'balance:sum'])
+            return {
+                'accountCount': account_count,
+                'totalBalance': total_balance or 0.0,
+                'transactionCount': env['bank.transaction'].search_count(
+                    [('status', '=', 'completed')]),
+                'pendingTransfers': env['bank.transfer'].search_count(
+                    [('status', '=', 'pending')]),
+                'activeLoans': env['bank.loan'].search_count([('status', '=', 'active')]),
+                'activeFDs': env['bank.fixed.deposit'].search_count([('status', '=', 'active')]),
+            }
+    
+    @api.model
+    def search_accounts(self, term='', offset=0, limit=20):
+        """Return a page of active accounts whose number or name starts with term
+
+        An empty term returns the accounts the user recently transferred
+        from or to. Results are dicts with id, account_number, account_name
+        and balance; has_more tells whether another page exists.
+        """
+        limit = min(int(limit), 50)
+        fields_to_read = ['account_number', 'account_name', 'balance']
+        term = (term or '').strip()
+        if not term:
+            recent_ids = self._get_recent_account_ids()
+            accounts = self.browse(recent_ids).exists().filtered(lambda a: a.status == 'active')
+            return {'records': accounts.read(fields_to_read), 'has_more': False}
+        escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        query = self._search([('status', '=', 'active')], offset=int(offset), limit=limit + 1, order='account_number')
+        # Both branches match the expression of a partial prefix index
+        query.add_where(SQL(
+            "(%s LIKE %s OR lower(%s) LIKE lower(%s) || '%%')",
+            SQL.identifier(query.table, 'account_number'), escaped + '%',
+            SQL.identifier(query.table, 'account_name'), escaped,
+        ))
+        records = self.browse(query).read(fields_to_read)
+        return {'records': records[:limit], 'has_more': len(records) > limit}
+    
+    @api.model
+    def _get_recent_account_ids(self):
+        """Return the ids of the accounts of the user's latest transfers, cached per worker"""
+        key = (self.env.cr.dbname, self.env.uid)
+        recent_ids = _RECENT_ACCOUNTS.get(key)
+        if recent_ids is None:
+            self.env['bank.transfer'].flush_model(['from_account_id', 'to_account_id'])
+            self.env.cr.execute("""
+                SELECT account_id
+                  FROM (SELECT t.id, a.account_id
+                          FROM (SELECT id, from_account_id, to_account_id
+                                  FROM bank_transfer
+                                 WHERE create_uid = %s
+                                 ORDER BY id DESC
+                                 LIMIT %s) t,
+                               LATERAL (VALUES (t.from_account_id), (t.to_account_id)) a(account_id)
+                         WHERE a.account_id IS NOT NULL) r
+                 GROUP BY account_id
+                 ORDER BY max(id) DESC
+                 LIMIT %s
+            """, [self.env.uid, RECENT_ACCOUNT_LIMIT * 2, RECENT_ACCOUNT_LIMIT])
+            recent_ids = tuple(row[0] for row in self.env.cr.fetchall())
+            # Transfers of the running transaction are only cached once committed
+            if key not in self.env.cr.postcommit.data.get('odoo_bank.recent_accounts', {}):
+                _RECENT_ACCOUNTS[key] = recent_ids
+        return list(recent_ids)
+    
+    @api.model
+    def _add_recent_accounts(self, account_ids):
+        """Put account_ids first in the user's cached recent accounts once the transaction commits"""
+        data = self.env.cr.postcommit.data
+        if 'odoo_bank.recent_accounts' not in data:
+            data['odoo_bank.recent_accounts'] = defaultdict(list)
+            self.env.cr.postcommit.add(self._commit_recent_accounts)
+        data['odoo_bank.recent_accounts'][(self.env.cr.dbname, self.env.uid)][:0] = account_ids
+    
+    @api.model
+    def _commit_recent_accounts(self):
+        """Apply the recent accounts of the committed transaction to the cache"""
+        pending = self.env.cr.postcommit.data.pop('odoo_bank.recent_accounts', None)
+        for key, account_ids in (pending or {}).items():
+            recent_ids = _RECENT_ACCOUNTS.get(key)
+            if recent_ids is not None:
+                merged = list(dict.fromkeys([*account_ids, *recent_ids]))
+                _RECENT_ACCOUNTS[key] = tuple(merged[:RECENT_ACCOUNT_LIMIT])
+    
+    def _get_statement_lines(self, date_from=None, date_to=None, limit=None):
+        """Return statement lines as dicts, including archived transactions,
+        read from the replica when available"""
+        self.ensure_one()
+        self.check_access('read')
+        type_labels = dict(self.env['bank.transaction']._fields['transaction_type'].selection)
+        with self.env['bank.replica.router']._read_env() as env:
+            lines = env['bank.transaction.archive'].read_history(
+                [self.id], date_from=date_from, date_to=date_to, limit=limit)
+        for line in lines:
+            line['transaction_type_label'] = type_labels.get(line['transaction_type'])
+        return lines
+    
+    def action_view_holds(self):
+        """View account holds"""
+        return {
+            'name': 'Account Holds',
+            'type': 'ir.actions.act_window',
+            'res_model': 'bank.account.hold',
+            'view_mode': 'list,form',
+            'domain': [('account_id', '=', self.id)],
+            'context': {'default_account_id': self.id, 'search_default_active': 1}
+        }
+    
+    def place_hold(self, amount, hold_type='other', reference=None, expires_at=None):
+        """Place a hold on the account and return it"""
+        self.ensure_one()
+        return self.env['bank.account.hold'].create({
+            'account_id': self.id,
+            'amount': amount,
+            'hold_type': hold_type,
+            'reference': reference,
+            'expires_at': expires_at,
+        })
+    
     def update_balance(self, amount, transaction_type):
-        """Update account balance"""
+        """Update account balance through a journal entry against cash
+
+        amount is in the account currency.
+        """
         self.ensure_one()
         if transaction_type in ['deposit', 'credit', 'interest']:
-            self.balance += amount
+            signed = amount
         elif transaction_type in ['withdrawal', 'debit', 'fee']:
-            if self.available_balance < amount:
-                raise ValidationError('Insufficient balance.')
-            self.balance -= amount
-        
-        # Log balance update
-        self.env['bank.audit.log'].create({
-            'action': 'update',
-            'model_name': 'bank.account',
-            'record_id': self.id,
-            'description': f'Balance updated: {transaction_type} {amount}. New balance: {self.balance}',
-            'user_id': self.env.user.id,
-        })
+            signed = -amount
+        else:
+            return
+        company_signed = self.env['bank.exchange.rate']._convert(
+            signed, self.currency_id, self.env.company.currency_id)
+        self.env['bank.journal.entry']._post([
+            ('cash', False, company_signed, False),
+            ('customer_deposits', self.id, -company_signed, -signed),
+        ], self.account_number, f'Balance update: {transaction_type} {amount}')
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from datetime import date, timedelta
+
+from odoo import models, fields, api
+
+from .bank_transaction import CREDIT_TYPES, DEBIT_TYPES
+
+_logger = logging.getLogger(__name__)
+
+
+class BankAccountDailyBalance(models.Model):
+    _name = 'bank.account.daily_balance'
+    _description = 'Bank Account Daily Balance'
+    _order = 'date desc, account_id'
+    _rec_name = 'date'
+
+    account_id = fields.Many2one('bank.account', string='Account', required=True,
+                                 ondelete='cascade', readonly=True)
+    date = fields.Date(string='Date', required=True, readonly=True)
+    currency_id = fields.Many2one(related='account_id.currency_id', string='Currency',
+                                  readonly=True)
+    opening_balance = fields.Monetary(string='Opening Balance', currency_field='currency_id',
+                                      readonly=True)
+    closing_balance = fields.Monetary(string='Closing Balance', currency_field='currency_id',
+                                      readonly=True)
+    total_credit = fields.Monetary(string='Total Credit', currency_field='currency_id',
+                                   readonly=True)
+    total_debit = fields.Monetary(string='Total Debit', currency_field='currency_id',
+                                  readonly=True)
+    transaction_count = fields.Integer(string='Transactions', readonly=True)
+
+    # Arbiter of the snapshot upsert
+    _account_date_unique = models.Constraint('unique(account_id, date)',
+                                             'Only one balance snapshot per account and day!')
+
+    @api.model
+    def _snapshot_day(self, day):
+        """Upsert the snapshots of every account with completed transactions on day
+
+        One set-based statement over the day's transactions (UTC day). Days
+        without activity get no row: point-in-time lookups carry the last
+        closing balance forward.
+        """
+        self.env['bank.transaction'].flush_model()
+        self.env.cr.execute("""
+            INSERT INTO bank_account_daily_balance
+                   (account_id, date, opening_balance, closing_balance, total_credit,
+                    total_debit, transaction_count, create_uid, create_date, write_uid, write_date)
+            SELECT d.account_id, %(day)s, d.closing - d.credit + d.debit, d.closing,
+                   d.credit, d.debit, d.txn_count,
+                   %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+              FROM (
+                    SELECT account_id,
+                           (array_agg(balance_after ORDER BY transaction_date DESC, id DESC))[1] AS closing,
+                           coalesce(sum(coalesce(account_amount, amount)) FILTER (WHERE transaction_type = ANY(%(credit)s)), 0) AS credit,
+                           coalesce(sum(coalesce(account_amount, amount)) FILTER (WHERE transaction_type = ANY(%(debit)s)), 0) AS debit,
+                           count(*) AS txn_count
+                      FROM bank_transaction
+                     WHERE status = 'completed'
+                       AND transaction_date >= %(day)s
+                       AND transaction_date < %(day)s::date + 1
+                     GROUP BY account_id
+                   ) d
+            ON CONFLICT (account_id, date) DO UPDATE
+               SET opening_balance = EXCLUDED.opening_balance,
+                   closing_balance = EXCLUDED.closing_balance,
+                   total_credit = EXCLUDED.total_credit,
+                   total_debit = EXCLUDED.total_debit,
+                   transaction_count = EXCLUDED.transaction_count,
+                   write_uid = EXCLUDED.write_uid,
+                   write_date = EXCLUDED.write_date
+        """, {
+            'day': day,
+            'uid': self.env.uid,
+            'credit': list(CREDIT_TYPES),
+            'debit': list(DEBIT_TYPES),
+        })
+        self.invalidate_model()
+        return self.env.cr.rowcount
+
+    @api.model
+    def cron_snapshot_daily_balances(self):
+        """Cron job to snapshot every day since the last snapshotted one, up to yesterday"""
+        params = self.env['ir.config_parameter'].sudo()
+        yesterday = fields.Date.today() - timedelta(days=1)
+        last_date = fields.Date.to_date(params.get_param('odoo_bank.daily_balance_last_date'))
+        if last_date:
+            day = last_date + timedelta(days=1)
+        else:
+            self.env.cr.execute("""
+                SELECT min(transaction_date)::date FROM bank_transaction WHERE status = 'completed'
+            """)
+            day = self.env.cr.fetchone()[0] or yesterday
+        # One chunk per day, keyed by the day's ordinal
+        Job = self.env['bank.job.run']
+        Job._launch('daily_balance', 'Snapshot Daily Account Balances', self._name, '_job_snapshot_days',
+                    Job._chunk_range(day.toordinal(), yesterday.toordinal(), 1)
+                    if day <= yesterday else [])
+        return True
+    
+    @api.model
+    def _job_snapshot_days(self, first, last, params):
+        """Job chunk: snapshot the days with ordinals in [first, last]"""
+        config = self.env['ir.config_parameter'].sudo()
+        count = 0
+        for ordinal in range(first, last + 1):
+            day = date.fromordinal(ordinal)
+            count += self._snapshot_day(day)
+            _logger.info('Daily balance snapshot %s', day)
+            last_date = fields.Date.to_date(config.get_param('odoo_bank.daily_balance_last_date'))
+            if not last_date or day > last_date:
+                config.set_param('odoo_bank.daily_balance_last_date', fields.Date.to_string(day))
+        return count
+
+    @api.model
+    def get_balance_at(self, account_ids, date):
+        """Return {account_id: closing balance on date} from the snapshots
+
+        One index lookup per account on (account_id, date); accounts without
+        any snapshot up to date have a zero balance.
+        """
+        self.env.cr.execute("""
+            SELECT a.id, coalesce(s.closing_balance, 0)
+              FROM unnest(%s::int[]) AS a(id)
+              LEFT JOIN LATERAL (
+                    SELECT closing_balance
+                      FROM bank_account_daily_balance
+                     WHERE account_id = a.id AND date <= %s
+                     ORDER BY date DESC
+                     LIMIT 1
+                   ) s ON TRUE
+        """, [list(account_ids), date])
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def get_average_balance(self, account_ids, date_from, date_to):
+        """Return {account_id: day-weighted average closing balance over [date_from, date_to]}"""
+        self.env.cr.execute("""
+            WITH points AS (
+                SELECT a.id AS account_id, %(from)s::date AS date, 0 AS seq,
+                       coalesce(p.closing_balance, 0) AS balance
+                  FROM unnest(%(ids)s::int[]) AS a(id)
+                  LEFT JOIN LATERAL (
+                        SELECT closing_balance
+                          FROM bank_account_daily_balance
+                         WHERE account_id = a.id AND date < %(from)s
+                         ORDER BY date DESC
+                         LIMIT 1
+                       ) p ON TRUE
+                UNION ALL
+                SELECT account_id, date, 1, closing_balance
+                  FROM bank_account_daily_balance
+                 WHERE account_id = ANY(%(ids)s) AND date BETWEEN %(from)s AND %(to)s
+            ), weighted AS (
+                SELECT account_id, balance,
+                       coalesce(lead(date) OVER (PARTITION BY account_id ORDER BY date, seq),
+                                %(to)s::date + 1) - date AS days
+                  FROM points
+            )
+            SELECT account_id, sum(balance * days) / (%(to)s::date - %(from)s::date + 1)
+              FROM weighted
+             GROUP BY account_id
+        """, {'ids': list(account_ids), 'from': date_from, 'to': date_to})
+        return {account_id: float(average) for account_id, average in self.env.cr.fetchall()}
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+from collections import defaultdict
+
+from odoo import models, fields, api
+from odoo.exceptions import ValidationError
+from odoo.tools.sql import create_index
+
+
+class BankAccountHold(models.Model):
+    _name = 'bank.account.hold'
+    _description = 'Bank Account Hold'
+    _order = 'placed_date desc, id desc'
+    _rec_name = 'reference'
+
+    # Hold Information
+    account_id = fields.Many2one('bank.account', string='Account', required=True,
+                                 ondelete='restrict', index=True)
+    customer_id = fields.Many2one(related='account_id.customer_id', string='Customer',
+                                  readonly=True)
+    hold_type = fields.Selection([
+        ('card_auth', 'Card Authorisation'),
+        ('fd_lien', 'Fixed Deposit Lien'),
+        ('legal', 'Legal Hold'),
+        ('cheque', 'Uncleared Cheque'),
+        ('other', 'Other'),
+    ], string='Hold Type', required=True, default='other')
+    amount = fields.Monetary(string='Amount', currency_field='currency_id', required=True)
+    currency_id = fields.Many2one(related='account_id.currency_id', string='Currency',
+                                  readonly=True)
+    reference = fields.Char(string='Reference')
+    description = fields.Text(string='Description')
+    fd_id = fields.Many2one('bank.fixed.deposit', string='Fixed Deposit')
+
+    # Dates
+    placed_date = fields.Datetime(string='Placed On', required=True,
+                                  default=fields.Datetime.now, readonly=True)
+    expires_at = fields.Datetime(string='Expires At')
+    released_date = fields.Datetime(string='Released On', readonly=True)
+
+    # Status
+    status = fields.Selection([
+        ('active', 'Active'),
+        ('released', 'Released'),
+        ('expired', 'Expired'),
+    ], string='Status', default='active', required=True, readonly=True)
+
+    _amount_positive = models.Constraint('CHECK(amount > 0)', 'Hold amount must be positive!')
+
+    def init(self):
+        # Only active holds are ever scanned, so keep both indexes partial
+        create_index(self.env.cr, 'bank_account_hold_active_account_idx', self._table,
+                     ['account_id'], where="status = 'active'")
+        create_index(self.env.cr, 'bank_account_hold_active_expiry_idx', self._table,
+                     ['expires_at'], where="status = 'active' AND expires_at IS NOT NULL")
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            vals['status'] = 'active'
+        holds = super(BankAccountHold, self).create(vals_list)
+        # Card authorisations must fit the available balance, other holds may exceed it
+        authorisations = holds.filtered(lambda h: h.hold_type == 'card_auth')
+        holds._apply_hold_delta(1, check_available=authorisations)
+        for hold in holds:
+            self.env['bank.audit.log'].create({
+                'action': 'create',
+                'model_name': 'bank.account.hold',
+                'record_id': hold.id,
+                'description': f'Hold placed on {hold.account_id.account_number}: {hold.amount}',
+                'user_id': self.env.user.id,
+            })
+        return holds
+
+    def write(self, vals):
+        if {'account_id', 'amount'} & set(vals) and self.filtered(lambda h: h.status == 'active'):
+            raise ValidationError('Release the hold and place a new one to change its amount or account.')
+        return super(BankAccountHold, self).write(vals)
+
+    def unlink(self):
+        if self.filtered(lambda h: h.status == 'active'):
+            raise ValidationError('Active holds must be released before deletion.')
+        return super(BankAccountHold, self).unlink()
+
+    def _apply_hold_delta(self, sign, check_available=None):
+        """Add (sign=1) or remove (sign=-1) these holds from their accounts' totals
+
+        Each account row is updated once, in a single statement. On each
+        account, the holds in check_available must together fit the
+        available balance; the other holds of the batch are not counted
+        against them.
+        """
+        deltas = defaultdict(float)
+        for hold in self:
+            deltas[hold.account_id.id] += sign * hold.amount
+        if not deltas:
+            return
+        checked = defaultdict(float)
+        for hold in check_available or ():
+            checked[hold.account_id.id] += sign * hold.amount
+        Account = self.env['bank.account']
+        Account.flush_model(['balance', 'hold_amount', 'available_balance'])
+        account_ids = list(deltas)
+        self.env.cr.execute("""
+            UPDATE bank_account a
+               SET hold_amount = a.hold_amount + d.delta,
+                   available_balance = a.balance - (a.hold_amount + d.delta)
+              FROM (SELECT unnest(%s::int[]) AS id,
+                           unnest(%s::numeric[]) AS delta,
+                           unnest(%s::numeric[]) AS checked) d
+             WHERE a.id = d.id
+               AND (d.checked <= 0 OR a.available_balance >= d.checked)
+         RETURNING a.id, a.balance, a.available_balance
+        """, [account_ids, [deltas[a] for a in account_ids], [checked[a] for a in account_ids]])
+        rows = self.env.cr.fetchall()
+        Account.browse(account_ids).invalidate_recordset(['hold_amount', 'available_balance'])
+        if len(rows) != len(account_ids):
+            refused = Account.browse(sorted(set(account_ids) - {row[0] for row in rows}))
+            raise ValidationError('Insufficient available balance for card authorisation on '
+                                  f'{", ".join(refused.mapped("account_number"))}.')
+        self.env['bank.event']._publish_balances([
+            (account_id, balance, available, 0.0) for account_id, balance, available in rows
+        ])
+
+    def action_release(self):
+        """Release active holds
+
+        The holds are claimed with a conditional UPDATE ... WHERE status =
+        'active' RETURNING id, so a hold released concurrently by another
+        user or by the expiry job is only taken off its account's total once.
+        """
+        if not self:
+            return
+        now = fields.Datetime.now()
+        self.flush_recordset(['status'])
+        self.env.cr.execute("""
+            UPDATE bank_account_hold
+               SET status = 'released', released_date = %s,
+                   write_date = %s, write_uid = %s
+             WHERE id = ANY(%s) AND status = 'active'
+         RETURNING id
+        """, [now, now, self.env.uid, self.ids])
+        released = self.browse([row[0] for row in self.env.cr.fetchall()])
+        self.invalidate_recordset(['status', 'released_date', 'write_date', 'write_uid'])
+        released._apply_hold_delta(-1)
+
+    @api.model
+    def cron_release_expired(self, batch_size=5000):
+        """Cron job to release lapsed holds in bulk"""
+        now = fields.Datetime.now()
+        expired_ids = self.search([('status', '=', 'active'), ('expires_at', '<=', now)], order='id').ids
+        Job = self.env['bank.job.run']
+        Job._launch('hold_release', 'Release Expired Account Holds', self._name, '_job_release_expired',
+                    Job._chunk_keys(expired_ids, batch_size), {'now': fields.Datetime.to_string(now)})
+        return True
+    
+    @api.model
+    def _job_release_expired(self, id_from, id_to, params):
+        """Job chunk: expire the lapsed active holds with ids in [id_from, id_to]"""
+        now = params['now']
+        self.flush_model()
+        self.env.cr.execute("""
+            UPDATE bank_account_hold h
+               SET status = 'expired', released_date = %s,
+                   write_date = %s, write_uid = %s
+             WHERE h.id IN (SELECT id FROM bank_account_hold
+                             WHERE id BETWEEN %s AND %s
+                               AND status = 'active' AND expires_at <= %s
+                               FOR UPDATE SKIP LOCKED)
+         RETURNING h.id
+        """, [now, now, self.env.uid, id_from, id_to, now])
+        hold_ids = [row[0] for row in self.env.cr.fetchall()]
+        expired = self.browse(hold_ids)
+        expired.invalidate_recordset(['status', 'released_date'])
+        expired._apply_hold_delta(-1)
+        return len(hold_ids)
@@ -22,6 +22,7 @@ class BankAuditLog(models.Model):
         ('logout', 'Logout'),
         ('sms_sent', 'SMS Sent'),
         ('email_sent', 'Email Sent'),
+        ('export', 'Export'),
         ('other', 'Other'),
     ], string='Action', required=True)
     
@@ -56,6 +57,12 @@ class BankAuditLog(models.Model):
     timestamp = fields.Datetime(string='Timestamp', default=fields.Datetime.now, 
                                required=True, readonly=True)
     
+    @api.model
+    def web_search_read(self, *args, **kwargs):
+        """Run audit log searches on the read replica when available"""
+        with self.env['bank.replica.router']._read_env() as env:
+            return super(BankAuditLog, self.with_env(env)).web_search_read(*args, **kwargs)
+    
     @api.model
     def log_action(self, action, model_name, record_id, description, severity='info', 
                    old_values=None, new_values=None):
@@ -77,9 +84,26 @@ class BankAuditLog(models.Model):
         from dateutil.relativedelta import relativedelta
         
         cutoff_date = fields.Datetime.now() - relativedelta(years=1)
-        old_logs = self.search([('timestamp', '<', cutoff_date)])
+        self.env.cr.execute("SELECT min(id), max(id) FROM bank_audit_log WHERE timestamp < %s",
+                            [cutoff_date])
+        low, high = self.env.cr.fetchone()
+        
+        Job = self.env['bank.job.run']
+        Job._launch('audit_log_cleanup', 'Cleanup Old Audit Logs', self._name, '_job_cleanup_old_logs',
+                    Job._chunk_range(low, high, 50000) if low else [],
+                    {'cutoff': fields.Datetime.to_string(cutoff_date)})
+        return True
+    
+    @api.model
+    def _job_cleanup_old_logs(self, id_from, id_to, params):
+        """Job chunk: handle the expired logs with ids in [id_from, id_to]"""
+        old_logs = self.search_count([
+            ('id', '>=', id_from),
+            ('id', '<=', id_to),
+            ('timestamp', '<', params['cutoff']),
+        ])
         
         # Archive instead of delete for compliance
         # old_logs.unlink()
         
-        return True
+        return old_logs
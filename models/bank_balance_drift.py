@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+
+
+class BankBalanceDrift(models.Model):
+    _name = 'bank.balance.drift'
+    _description = 'Bank Balance Drift'
+    _order = 'check_date desc, account_id, id'
+    _rec_name = 'account_id'
+
+    check_date = fields.Datetime(string='Checked On', required=True, readonly=True, index=True)
+    account_id = fields.Many2one('bank.account', string='Account', required=True, readonly=True,
+                                 ondelete='cascade', index=True)
+    drift_type = fields.Selection([
+        ('balance', 'Balance vs Journal'),
+        ('chain', 'Broken Balance Chain'),
+    ], string='Type', required=True, readonly=True)
+    transaction_number = fields.Char(string='Transaction', readonly=True,
+                                     help='Transaction whose balance before does not follow the previous one.')
+    expected = fields.Monetary(string='Expected', currency_field='currency_id', readonly=True)
+    actual = fields.Monetary(string='Actual', currency_field='currency_id', readonly=True)
+    difference = fields.Monetary(string='Difference', currency_field='currency_id',
+                                 compute='_compute_difference')
+    currency_id = fields.Many2one(related='account_id.currency_id', string='Currency', readonly=True)
+    state = fields.Selection([
+        ('open', 'Open'),
+        ('resolved', 'Resolved'),
+        ('rebuilt', 'Rebuilt'),
+    ], string='Status', default='open', required=True, readonly=True, index=True)
+
+    @api.depends('expected', 'actual')
+    def _compute_difference(self):
+        for record in self:
+            record.difference = record.actual - record.expected
+
+    @api.model
+    def _job_check_accounts(self, first, last, params):
+        """Job chunk: check the accounts with ids in [first, last]
+
+        The chain check streams the completed transactions of the range,
+        hot and archived, ordered by (transaction_date, id) and compares each
+        balance_before with the previous balance_after through a window
+        function. The balance check compares bank_account.balance with the
+        sum of the account's customer deposit journal lines, in the account
+        currency. Both run as single statements writing their findings
+        directly; findings of earlier checks of the range are closed first.
+        """
+        self.env['bank.transaction'].flush_model()
+        self.env['bank.account'].flush_model()
+        self.flush_model()
+        values = {
+            'first': first,
+            'last': last,
+            'check_date': params['check_date'],
+            'uid': self.env.uid,
+        }
+        self.env.cr.execute("""
+            UPDATE bank_balance_drift
+               SET state = 'resolved'
+             WHERE account_id BETWEEN %(first)s AND %(last)s AND state = 'open'
+        """, values)
+        self.env.cr.execute("""
+            WITH history AS (
+                SELECT account_id, id, transaction_number, transaction_date, balance_before, balance_after
+                  FROM bank_transaction
+                 WHERE account_id BETWEEN %(first)s AND %(last)s AND status = 'completed'
+                UNION ALL
+                SELECT account_id, id, transaction_number, transaction_date, balance_before, balance_after
+                  FROM bank_transaction_archive
+                 WHERE account_id BETWEEN %(first)s AND %(last)s AND status = 'completed'
+            ), chained AS (
+                SELECT account_id, transaction_number, balance_before,
+                       lag(balance_after) OVER (PARTITION BY account_id
+                                                ORDER BY transaction_date, id) AS previous_after
+                  FROM history
+            )
+            INSERT INTO bank_balance_drift
+                   (check_date, account_id, drift_type, transaction_number, expected, actual, state,
+                    create_uid, create_date, write_uid, write_date)
+            SELECT %(check_date)s, account_id, 'chain', transaction_number, previous_after, balance_before,
+                   'open', %(uid)s, %(check_date)s, %(uid)s, %(check_date)s
+              FROM chained
+             WHERE balance_before <> previous_after
+        """, values)
+        self.env.cr.execute("""
+            WITH ledger AS (
+                SELECT account_id, -sum(amount_currency) AS balance
+                  FROM bank_journal_line
+                 WHERE account_id BETWEEN %(first)s AND %(last)s AND gl_code = 'customer_deposits'
+                 GROUP BY account_id
+            ), checked AS (
+                SELECT a.id, a.balance, coalesce(l.balance, 0) AS expected
+                  FROM bank_account a
+                  LEFT JOIN ledger l ON l.account_id = a.id
+                 WHERE a.id BETWEEN %(first)s AND %(last)s
+            ), drift AS (
+                INSERT INTO bank_balance_drift
+                       (check_date, account_id, drift_type, expected, actual, state,
+                        create_uid, create_date, write_uid, write_date)
+                SELECT %(check_date)s, id, 'balance', expected, balance,
+                       'open', %(uid)s, %(check_date)s, %(uid)s, %(check_date)s
+                  FROM checked
+                 WHERE balance <> expected
+                RETURNING account_id
+            )
+            SELECT (SELECT count(*) FROM checked), array(SELECT account_id FROM drift)
+        """, values)
+        checked, drifted_ids = self.env.cr.fetchone()
+        self.invalidate_model()
+        if params.get('rebuild') and drifted_ids:
+            self._rebuild_balances(drifted_ids)
+        return checked
+
+    @api.model
+    def _rebuild_balances(self, account_ids):
+        """Reset the balances of account_ids to the sum of their journal lines
+
+        Open balance findings of these accounts are marked as rebuilt and
+        each change is written to the audit log.
+        """
+        self.env['bank.account'].flush_model(['balance', 'hold_amount', 'available_balance'])
+        self.env.cr.execute("""
+            WITH ledger AS (
+                SELECT account_id, -sum(amount_currency) AS balance
+                  FROM bank_journal_line
+                 WHERE account_id = ANY(%(account_ids)s) AND gl_code = 'customer_deposits'
+                 GROUP BY account_id
+            ), previous AS (
+                SELECT id, balance FROM bank_account WHERE id = ANY(%(account_ids)s) FOR UPDATE
+            )
+            UPDATE bank_account a
+               SET balance = coalesce(l.balance, 0),
+                   available_balance = coalesce(l.balance, 0) - a.hold_amount,
+                   write_date = now() at time zone 'UTC', write_uid = %(uid)s
+              FROM previous p
+              LEFT JOIN ledger l ON l.account_id = p.id
+             WHERE a.id = p.id AND a.balance <> coalesce(l.balance, 0)
+         RETURNING a.id, p.balance, a.balance, a.available_balance
+        """, {'account_ids': list(account_ids), 'uid': self.env.uid})
+        rebuilt = self.env.cr.fetchall()
+        self.env['bank.account'].browse(account_ids).invalidate_recordset(['balance', 'available_balance'])
+        self.env['bank.event']._publish_balances([
+            (account_id, new_balance, available, new_balance - old_balance)
+            for account_id, old_balance, new_balance, available in rebuilt
+        ])
+        self.env.cr.execute("""
+            UPDATE bank_balance_drift
+               SET state = 'rebuilt'
+             WHERE account_id = ANY(%s) AND drift_type = 'balance' AND state = 'open'
+        """, [list(account_ids)])
+        self.invalidate_model(['state'])
+        self.env['bank.audit.log'].create([{
+            'action': 'update',
+            'model_name': 'bank.account',
+            'record_id': account_id,
+            'description': f'Balance rebuilt from the journal: {old_balance} -> {new_balance}',
+            'severity': 'warning',
+            'user_id': self.env.user.id,
+        } for account_id, old_balance, new_balance, _available in rebuilt])
+        return len(rebuilt)
+
+    def action_rebuild_balance(self):
+        """Rebuild the balances of the accounts of the selected findings"""
+        count = self._rebuild_balances(self.filtered(lambda d: d.drift_type == 'balance').account_id.ids)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'message': f'{count} account balance(s) rebuilt from the journal.',
+                'type': 'success',
+                'next': {'type': 'ir.actions.act_window_close'},
+            },
+        }
+
+    @api.model
+    def cron_check_balances(self, batch_size=5000, rebuild=False):
+        """Cron job to check all account balances and balance chains, chunk by chunk
+
+        Chunks are account id ranges, so duplicating the bank job worker
+        checks several ranges in parallel. With rebuild, drifted balances are
+        reset from the journal.
+        """
+        self.env['bank.account'].flush_model()
+        self.env.cr.execute("SELECT min(id), max(id) FROM bank_account")
+        low, high = self.env.cr.fetchone()
+        Job = self.env['bank.job.run']
+        Job._launch('balance_check', 'Check Account Balances', self._name, '_job_check_accounts',
+                    Job._chunk_range(low, high, batch_size) if low else [],
+                    {'check_date': fields.Datetime.to_string(fields.Datetime.now()), 'rebuild': rebuild})
+        return True
+
+    @api.model
+    def action_check_now(self):
+        """Run the balance check cron as soon as possible"""
+        self.env.ref('odoo_bank.cron_check_balances')._trigger()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'message': 'The balance consistency check has been scheduled.',
+                'type': 'info',
+            },
+        }
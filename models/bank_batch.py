@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+
+from odoo import models, api
+
+if os.name == 'posix':
+    import resource
+else:
+    resource = None
+
+_logger = logging.getLogger(__name__)
+
+
+class BankBatch(models.AbstractModel):
+    _name = 'bank.batch'
+    _description = 'Bank Batch Iteration'
+
+    @api.model
+    def _max_rss(self):
+        """Return the memory high-water mark of the worker process in MB, 0 if unknown"""
+        if resource is None:
+            return 0.0
+        # ru_maxrss is in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+    @api.model
+    def _iter_batches(self, records, size=100, commit=False, label=None):
+        """Yield records in recordsets of at most size records with a bounded ORM cache
+
+        Each batch only prefetches its own ids. Once the caller is done with
+        a batch, pending writes are flushed, committed with commit, and the
+        whole environment cache is emptied before the next batch is browsed,
+        so memory does not grow with the number of records touched. Do not
+        commit from a job chunk handler: chunks run inside a savepoint and
+        are committed by the job worker.
+        """
+        ids = list(records.ids)
+        model = records.browse()
+        label = label or model._name
+        start_rss = self._max_rss()
+        for start in range(0, len(ids), size):
+            yield model.browse(ids[start:start + size])
+            self.env.flush_all()
+            if commit:
+                self.env.cr.commit()
+            self.env.invalidate_all()
+        if ids:
+            max_rss = self._max_rss()
+            _logger.info('%s: %s records in batches of %s, memory high-water mark %.1f MB (+%.1f MB)',
+                         label, len(ids), size, max_rss, max_rss - start_rss)
+
+    @api.model
+    def _next_numbers(self, code, count):
+        """Return count successive numbers of the sequence code, like count next_by_code() calls
+
+        Standard sequences without date ranges draw all the numbers with one
+        nextval() over generate_series(); other sequences fall back to one
+        call per number.
+        """
+        Sequence = self.env['ir.sequence']
+        if count <= 0:
+            return []
+        sequence = Sequence.sudo().search([
+            ('code', '=', code), ('company_id', 'in', [self.env.company.id, False]),
+        ], order='company_id', limit=1)
+        if not sequence:
+            return [False] * count
+        if sequence.implementation != 'standard' or sequence.use_date_range:
+            return [sequence.next_by_id() for _index in range(count)]
+        self.env.cr.execute("SELECT nextval(%s) FROM generate_series(1, %s)",
+                            [f'ir_sequence_{sequence.id:03d}', count])
+        return [sequence.get_next_char(row[0]) for row in self.env.cr.fetchall()]
@@ -1,7 +1,18 @@
 # -*- coding: utf-8 -*-
 
+import base64
+import logging
+
 from odoo import models, fields, api
-from odoo.exceptions import ValidationError
+from odoo.exceptions import ValidationError, UserError
+from odoo.tools.image import image_process
+
+from .bank_fee_rule import CUSTOMER_SEGMENTS
+
+_logger = logging.getLogger(__name__)
+
+KYC_DOCUMENT_FIELDS = ('id_document', 'address_proof', 'photo')
+KYC_THUMBNAIL_SIZE = (256, 256)
 
 
 class BankCustomer(models.Model):
@@ -50,6 +61,28 @@ class BankCustomer(models.Model):
     photo = fields.Binary(string='Photo', attachment=True)
     photo_filename = fields.Char(string='Photo Filename')
     
+    # KYC Document Metadata (copied from the filestore attachments)
+    id_document_size = fields.Integer(string='ID Document Size', compute='_compute_kyc_metadata', store=True)
+    id_document_mimetype = fields.Char(string='ID Document Type', compute='_compute_kyc_metadata', store=True)
+    id_document_checksum = fields.Char(string='ID Document Checksum', compute='_compute_kyc_metadata',
+                                       store=True, index='btree_not_null')
+    address_proof_size = fields.Integer(string='Address Proof Size', compute='_compute_kyc_metadata', store=True)
+    address_proof_mimetype = fields.Char(string='Address Proof Type', compute='_compute_kyc_metadata', store=True)
+    address_proof_checksum = fields.Char(string='Address Proof Checksum', compute='_compute_kyc_metadata',
+                                         store=True, index='btree_not_null')
+    photo_size = fields.Integer(string='Photo Size', compute='_compute_kyc_metadata', store=True)
+    photo_mimetype = fields.Char(string='Photo Type', compute='_compute_kyc_metadata', store=True)
+    photo_checksum = fields.Char(string='Photo Checksum', compute='_compute_kyc_metadata',
+                                 store=True, index='btree_not_null')
+    
+    # KYC Document Thumbnails (generated once on upload)
+    id_document_thumbnail = fields.Binary(string='ID Document Preview', attachment=True,
+                                          compute='_compute_kyc_thumbnails', store=True)
+    address_proof_thumbnail = fields.Binary(string='Address Proof Preview', attachment=True,
+                                            compute='_compute_kyc_thumbnails', store=True)
+    photo_thumbnail = fields.Binary(string='Photo Preview', attachment=True,
+                                    compute='_compute_kyc_thumbnails', store=True)
+    
     # KYC Status
     kyc_status = fields.Selection([
         ('draft', 'Draft'),
@@ -68,6 +101,8 @@ class BankCustomer(models.Model):
         ('medium', 'Medium'),
         ('high', 'High')
     ], string='Risk Level', default='low')
+    segment = fields.Selection(CUSTOMER_SEGMENTS, string='Segment', default='retail',
+                               required=True, tracking=True)
     
     # Relations
     account_ids = fields.One2many('bank.account', 'customer_id', string='Accounts')
@@ -93,46 +128,94 @@ class BankCustomer(models.Model):
     
     @api.depends('account_ids')
     def _compute_account_count(self):
+        counts = dict(self.env['bank.account']._read_group(
+            [('customer_id', 'in', self.ids)], ['customer_id'], ['__count']))
+        for record in self:
+            record.account_count = counts.get(record, 0)
+    
+    @api.depends(*KYC_DOCUMENT_FIELDS)
+    def _compute_kyc_metadata(self):
+        """Copy size, mimetype and checksum of the KYC attachments into plain columns
+        
+        Binary attachment fields are stored content-addressed in the filestore
+        (by sha1 checksum), so identical documents already share one file; the
+        checksum column makes such duplicates searchable.
+        """
+        metadata = {}
+        if self.ids:
+            for attachment in self.env['ir.attachment'].sudo().search_read([
+                ('res_model', '=', self._name),
+                ('res_field', 'in', list(KYC_DOCUMENT_FIELDS)),
+                ('res_id', 'in', self.ids),
+            ], ['res_id', 'res_field', 'file_size', 'mimetype', 'checksum']):
+                metadata[attachment['res_id'], attachment['res_field']] = attachment
         for record in self:
-            record.account_count = len(record.account_ids)
+            for field_name in KYC_DOCUMENT_FIELDS:
+                attachment = metadata.get((record.id, field_name), {})
+                record[f'{field_name}_size'] = attachment.get('file_size', 0)
+                record[f'{field_name}_mimetype'] = attachment.get('mimetype', False)
+                record[f'{field_name}_checksum'] = attachment.get('checksum', False)
+    
+    @api.depends(*KYC_DOCUMENT_FIELDS)
+    def _compute_kyc_thumbnails(self):
+        """Pre-generate review thumbnails for image documents (PDFs get none)"""
+        for record in self:
+            for field_name in KYC_DOCUMENT_FIELDS:
+                thumbnail = False
+                data = record.with_context(bin_size=False)[field_name]
+                if data:
+                    try:
+                        thumbnail = base64.b64encode(image_process(
+                            base64.b64decode(data), size=KYC_THUMBNAIL_SIZE, output_format='JPEG'))
+                    except UserError:
+                        # Not an image (e.g. a PDF scan)
+                        pass
+                    except Exception:
+                        _logger.warning('Could not generate thumbnail for %s %s', field_name, record.id,
+                                        exc_info=True)
+                record[f'{field_name}_thumbnail'] = thumbnail
     
     def action_submit_kyc(self):
         """Submit KYC for review"""
         for record in self:
-            if not record.id_document or not record.address_proof or not record.photo:
+            # Metadata columns: no need to read the documents themselves
+            if not record.id_document_size or not record.address_proof_size or not record.photo_size:
                 raise ValidationError('Please upload all required KYC documents.')
             record.kyc_status = 'submitted'
             record.message_post(body='KYC submitted for review')
     
     def action_approve_kyc(self):
-        """Approve KYC"""
-        for record in self:
-            record.write({
-                'kyc_status': 'approved',
-                'kyc_verified_by': self.env.user.id,
-                'kyc_verified_date': fields.Datetime.now()
-            })
-            record.message_post(body='KYC approved')
-            # Send notification
-            self.env['bank.notification'].create({
-                'customer_id': record.id,
-                'notification_type': 'email',
-                'subject': 'KYC Approved',
-                'message': f'Your KYC has been approved. Customer ID: {record.customer_id}',
-            })
+        """Approve KYC of every customer under review in the selection, in bulk"""
+        customers = self.filtered(lambda c: c.kyc_status in ('submitted', 'under_review'))
+        if not customers:
+            return True
+        # One multi-row UPDATE; the chatter message below records the change
+        customers.with_context(tracking_disable=True).write({
+            'kyc_status': 'approved',
+            'kyc_verified_by': self.env.user.id,
+            'kyc_verified_date': fields.Datetime.now()
+        })
+        customers._message_log_batch(bodies=dict.fromkeys(customers.ids, 'KYC approved'))
+        # Send notification
+        self.env['bank.notification']._notify('kyc_approved', [
+            (record, {'customer_ref': record.customer_id}) for record in customers
+        ])
+        return True
     
     def action_reject_kyc(self):
-        """Reject KYC"""
-        for record in self:
-            record.kyc_status = 'rejected'
-            record.message_post(body=f'KYC rejected: {record.kyc_rejection_reason}')
-            # Send notification
-            self.env['bank.notification'].create({
-                'customer_id': record.id,
-                'notification_type': 'email',
-                'subject': 'KYC Rejected',
-                'message': f'Your KYC has been rejected. Reason: {record.kyc_rejection_reason}',
-            })
+        """Reject KYC of every customer under review in the selection, in bulk"""
+        customers = self.filtered(lambda c: c.kyc_status in ('submitted', 'under_review'))
+        if not customers:
+            return True
+        customers.with_context(tracking_disable=True).write({'kyc_status': 'rejected'})
+        customers._message_log_batch(bodies={
+            record.id: f'KYC rejected: {record.kyc_rejection_reason}' for record in customers
+        })
+        # Send notification
+        self.env['bank.notification']._notify('kyc_rejected', [
+            (record, {'reason': record.kyc_rejection_reason or ''}) for record in customers
+        ])
+        return True
     
     def action_view_accounts(self):
         """View customer accounts"""
@@ -144,3 +227,75 @@ class BankCustomer(models.Model):
             'domain': [('customer_id', '=', self.id)],
             'context': {'default_customer_id': self.id}
         }
+    
+    def get_customer_summary(self, transaction_limit=10):
+        """Return {customer id: summary} with accounts, active loans, FDs and recent transactions
+        
+        The number of queries does not depend on the number of customers or
+        accounts: one read per model, plus one query selecting the most
+        recent transactions of every customer, each read from the top of the
+        customer history index. KYC documents are not included, use
+        get_kyc_document() to fetch one on demand.
+        """
+        customers = self.read([
+            'customer_id', 'full_name', 'email', 'phone', 'mobile', 'kyc_status',
+            'risk_level', 'segment', 'user_id',
+        ])
+        summary = {customer['id']: dict(customer, accounts=[], loans=[], fixed_deposits=[],
+                                        transactions=[])
+                   for customer in customers}
+        if not summary:
+            return summary
+        
+        for key, model, domain, field_names in [
+            ('accounts', 'bank.account', [], [
+                'account_number', 'account_name', 'account_type', 'currency_id', 'balance',
+                'available_balance', 'hold_amount', 'status',
+            ]),
+            ('loans', 'bank.loan', [('status', 'in', ['disbursed', 'active'])], [
+                'loan_number', 'loan_type', 'account_id', 'currency_id', 'disbursed_amount',
+                'outstanding_amount', 'emi_amount', 'status',
+            ]),
+            ('fixed_deposits', 'bank.fixed.deposit', [('status', 'in', ['active', 'matured'])], [
+                'fd_number', 'fd_type', 'source_account_id', 'currency_id', 'principal_amount',
+                'maturity_amount', 'maturity_date', 'status',
+            ]),
+        ]:
+            rows = self.env[model].search_read(
+                [('customer_id', 'in', list(summary))] + domain, field_names + ['customer_id'])
+            for row in rows:
+                summary[row.pop('customer_id')[0]][key].append(row)
+        
+        if transaction_limit:
+            Transaction = self.env['bank.transaction']
+            Transaction.flush_model(['customer_id', 'transaction_date'])
+            self.env.cr.execute("""
+                SELECT t.id
+                  FROM unnest(%s::int[]) AS c(id)
+                 CROSS JOIN LATERAL (
+                        SELECT id, transaction_date
+                          FROM bank_transaction
+                         WHERE customer_id = c.id
+                         ORDER BY transaction_date DESC, id DESC
+                         LIMIT %s
+                       ) t
+                 ORDER BY t.transaction_date DESC, t.id DESC
+            """, [list(summary), transaction_limit])
+            transaction_ids = [row[0] for row in self.env.cr.fetchall()]
+            for row in Transaction.browse(transaction_ids).read([
+                'transaction_number', 'transaction_date', 'account_id', 'transaction_type',
+                'amount', 'currency_id', 'balance_after', 'status', 'customer_id',
+            ]):
+                summary[row.pop('customer_id')[0]]['transactions'].append(row)
+        return summary
+    
+    def get_kyc_document(self, field_name):
+        """Return one KYC document (base64) and its filename, loaded only when requested"""
+        self.ensure_one()
+        if field_name not in KYC_DOCUMENT_FIELDS:
+            raise ValidationError(f'{field_name} is not a KYC document.')
+        record = self.with_context(bin_size=False)
+        return {
+            'data': record[field_name] or False,
+            'filename': record[f'{field_name}_filename'] or False,
+        }
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+
+# Bus channel of live banking updates, subscribed by bank staff only
+BUS_CHANNEL = 'odoo_bank.updates'
+BUS_NOTIFICATION = 'odoo_bank/updates'
+
+
+class BankEvent(models.AbstractModel):
+    _name = 'bank.event'
+    _description = 'Bank Live Update Events'
+
+    @api.model
+    def _pending_events(self):
+        """Return the events of the current transaction, sent on commit
+
+        Events are keyed by record so that successive changes of a record in
+        the same transaction collapse into one; a rolled back transaction
+        drops them with the other precommit data. Rolling back to a savepoint
+        does not: the events only name the records changed, and their values
+        are read back when the transaction commits, see _send_events.
+        """
+        data = self.env.cr.precommit.data
+        if 'odoo_bank.events' not in data:
+            data['odoo_bank.events'] = {'balances': {}, 'transfers': {}, 'transactions': set()}
+            self.env.cr.precommit.add(self._send_events)
+        return data['odoo_bank.events']
+
+    @api.model
+    def _publish_balances(self, rows):
+        """Queue balance updates from (account id, balance, available balance, delta) rows
+
+        Only the balance before the first change of each account is kept.
+        """
+        balances = self._pending_events()['balances']
+        for account_id, balance, _available_balance, delta in rows:
+            balances.setdefault(account_id, float(balance) - float(delta))
+
+    @api.model
+    def _publish_transfer_status(self, transfers, status, previous_status=None):
+        """Queue a status change of transfers, keeping the status they had first
+
+        previous_status replaces the current status of transfers created
+        directly in their final status.
+        """
+        events = self._pending_events()['transfers']
+        for transfer in transfers:
+            events.setdefault(transfer.id, previous_status or transfer.status)
+
+    @api.model
+    def _publish_transactions(self, transaction_ids):
+        """Queue the ids of transactions completed"""
+        self._pending_events()['transactions'].update(transaction_ids)
+
+    @api.model
+    def _send_events(self):
+        """Send the events of the committing transaction as one bus notification
+
+        Balances, transfer statuses and completed transactions are read back
+        from the database, so changes undone by a savepoint rollback (a
+        failed transfer of a batch, a failed job chunk) are not announced.
+        """
+        events = self.env.cr.precommit.data.pop('odoo_bank.events', None)
+        if not events:
+            return
+        cr = self.env.cr
+        balances, transfers, transactions = [], [], 0
+        if events['balances']:
+            cr.execute("""
+                SELECT id, balance, available_balance FROM bank_account WHERE id = ANY(%s)
+            """, [list(events['balances'])])
+            balances = [{
+                'id': account_id,
+                'balance': float(balance),
+                'available_balance': float(available_balance),
+                'delta': float(balance) - events['balances'][account_id],
+            } for account_id, balance, available_balance in cr.fetchall()]
+        if events['transfers']:
+            cr.execute("SELECT id, status FROM bank_transfer WHERE id = ANY(%s)", [list(events['transfers'])])
+            transfers = [
+                {'id': transfer_id, 'status': status, 'previous': events['transfers'][transfer_id]}
+                for transfer_id, status in cr.fetchall() if status != events['transfers'][transfer_id]
+            ]
+        if events['transactions']:
+            cr.execute("""
+                SELECT count(*) FROM bank_transaction WHERE id = ANY(%s) AND status = 'completed'
+            """, [list(events['transactions'])])
+            transactions = cr.fetchone()[0]
+        if not (balances or transfers or transactions):
+            return
+        self.env['bus.bus']._sendone(BUS_CHANNEL, BUS_NOTIFICATION, {
+            'balances': balances,
+            'transfers': transfers,
+            'transactions': transactions,
+        })
+
+
+class IrWebsocket(models.AbstractModel):
+    _inherit = 'ir.websocket'
+
+    def _build_bus_channel_list(self, channels):
+        # Only bank staff receive live updates, whatever the client asks for
+        channels = [channel for channel in channels if channel != BUS_CHANNEL]
+        if self.env.user.has_group('odoo_bank.group_bank_teller'):
+            channels.append(BUS_CHANNEL)
+        return super(IrWebsocket, self)._build_bus_channel_list(channels)
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api, tools
+from odoo.exceptions import ValidationError
+
+
+class BankExchangeRate(models.AbstractModel):
+    _name = 'bank.exchange.rate'
+    _description = 'Bank Exchange Rate Cache'
+
+    @tools.ormcache('company_id', 'date')
+    def _get_rate_table(self, company_id, date):
+        """Return {currency_id: rate} in effect on date, loaded in one query and cached per registry
+
+        Rates are units of currency per unit of the company currency, as
+        stored by res.currency.rate; a company rate wins over a shared one
+        of the same day.
+        """
+        self.env['res.currency.rate'].flush_model()
+        self.env.cr.execute("""
+            SELECT DISTINCT ON (currency_id) currency_id, rate
+              FROM res_currency_rate
+             WHERE name <= %s AND (company_id = %s OR company_id IS NULL)
+             ORDER BY currency_id, name DESC, company_id NULLS LAST
+        """, [date, company_id])
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _get_rate(self, from_currency, to_currency, date=None):
+        """Return the rate converting from_currency amounts to to_currency on date"""
+        if from_currency == to_currency:
+            return 1.0
+        company = self.env.company
+        rates = self._get_rate_table(company.id, fields.Date.to_date(date or fields.Date.today()))
+        from_rate = rates.get(from_currency.id, 1.0 if from_currency == company.currency_id else None)
+        to_rate = rates.get(to_currency.id, 1.0 if to_currency == company.currency_id else None)
+        if not from_rate or not to_rate:
+            raise ValidationError(f'No exchange rate from {from_currency.name} to {to_currency.name} '
+                                  f'on {date or fields.Date.today()}.')
+        return to_rate / from_rate
+
+    @api.model
+    def _convert(self, amount, from_currency, to_currency, date=None):
+        """Convert amount into to_currency, rounded, with the cached rate of date"""
+        if from_currency == to_currency:
+            return amount
+        return to_currency.round(amount * self._get_rate(from_currency, to_currency, date))
+
+
+class ResCurrencyRate(models.Model):
+    _inherit = 'res.currency.rate'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super(ResCurrencyRate, self).create(vals_list)
+        self.env.registry.clear_cache()
+        return records
+
+    def write(self, vals):
+        result = super(ResCurrencyRate, self).write(vals)
+        self.env.registry.clear_cache()
+        return result
+
+    def unlink(self):
+        result = super(ResCurrencyRate, self).unlink()
+        self.env.registry.clear_cache()
+        return result
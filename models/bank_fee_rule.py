@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+from bisect import bisect_right
+from collections import defaultdict
+
+from odoo import models, fields, api, tools
+from odoo.exceptions import ValidationError
+
+TRANSFER_TYPES = [
+    ('internal', 'Internal Transfer'),
+    ('external', 'External Transfer'),
+    ('rtgs', 'RTGS'),
+    ('neft', 'NEFT'),
+    ('imps', 'IMPS'),
+]
+
+CUSTOMER_SEGMENTS = [
+    ('retail', 'Retail'),
+    ('premium', 'Premium'),
+    ('corporate', 'Corporate'),
+]
+
+
+class BankFeeRule(models.Model):
+    _name = 'bank.fee.rule'
+    _description = 'Bank Transfer Fee Rule'
+    _order = 'transfer_type, segment, min_amount, id'
+
+    name = fields.Char(string='Name', required=True)
+    transfer_type = fields.Selection(TRANSFER_TYPES, string='Transfer Type', required=True)
+    segment = fields.Selection(CUSTOMER_SEGMENTS, string='Customer Segment',
+                               help='Leave empty to apply to all segments without a specific rule.')
+
+    # Amount Band
+    min_amount = fields.Monetary(string='From Amount', currency_field='currency_id', default=0.0,
+                                 help='Inclusive lower bound of the amount band.')
+    max_amount = fields.Monetary(string='To Amount', currency_field='currency_id', default=0.0,
+                                 help='Exclusive upper bound of the amount band, 0 for no limit.')
+    currency_id = fields.Many2one('res.currency', string='Currency', required=True,
+                                  default=lambda self: self.env.company.currency_id)
+
+    # Fee
+    fixed_fee = fields.Monetary(string='Fixed Fee', currency_field='currency_id', default=0.0)
+    percent_fee = fields.Float(string='Percentage Fee (%)', digits=(5, 3), default=0.0)
+
+    active = fields.Boolean(string='Active', default=True)
+
+    _min_amount_positive = models.Constraint('CHECK(min_amount >= 0)', 'Band lower bound cannot be negative!')
+    _max_above_min = models.Constraint('CHECK(max_amount = 0 OR max_amount > min_amount)',
+                                       'Band upper bound must be above its lower bound!')
+
+    @api.constrains('transfer_type', 'segment', 'currency_id', 'min_amount', 'max_amount', 'active')
+    def _check_overlap(self):
+        for record in self.filtered('active'):
+            others = self.search([
+                ('id', '!=', record.id),
+                ('transfer_type', '=', record.transfer_type),
+                ('segment', '=', record.segment),
+                ('currency_id', '=', record.currency_id.id),
+            ])
+            upper = record.max_amount or float('inf')
+            for other in others:
+                if other.min_amount < upper and record.min_amount < (other.max_amount or float('inf')):
+                    raise ValidationError(f'Fee rule "{record.name}" overlaps with "{other.name}".')
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super(BankFeeRule, self).create(vals_list)
+        self.env.registry.clear_cache()
+        return records
+
+    def write(self, vals):
+        result = super(BankFeeRule, self).write(vals)
+        self.env.registry.clear_cache()
+        return result
+
+    def unlink(self):
+        result = super(BankFeeRule, self).unlink()
+        self.env.registry.clear_cache()
+        return result
+
+    @tools.ormcache()
+    def _get_fee_table(self):
+        """Compile the active rules into {(transfer_type, segment, currency id): (lower bounds, bands)}
+
+        Bands are sorted by lower bound so an amount is located with a binary
+        search. The table is cached per registry and rebuilt after any change.
+        """
+        rules = self.sudo().search_read([], [
+            'transfer_type', 'segment', 'currency_id', 'min_amount', 'max_amount', 'fixed_fee', 'percent_fee',
+        ], order='min_amount', load=None)
+        table = defaultdict(list)
+        for rule in rules:
+            table[(rule['transfer_type'], rule['segment'], rule['currency_id'])].append((
+                rule['min_amount'],
+                rule['max_amount'] or float('inf'),
+                rule['fixed_fee'],
+                rule['percent_fee'] / 100,
+            ))
+        return {
+            key: (tuple(band[0] for band in bands), tuple(bands))
+            for key, bands in table.items()
+        }
+
+    @api.model
+    def _compute_fees(self, items):
+        """Return the fee for each (transfer_type, amount, segment, currency id) in items
+
+        Amounts are matched against the bands of their own currency. A
+        segment-specific band takes precedence over the generic one for the
+        same transfer type; amounts outside every band carry no fee. When a
+        transfer type has no rule in the transfer currency, the amount is
+        converted to the company currency, priced with its rules and the fee
+        converted back.
+        """
+        table = self._get_fee_table()
+        Rate = self.env['bank.exchange.rate']
+        company_currency = self.env.company.currency_id
+        fees = []
+        for transfer_type, amount, segment, currency_id in items:
+            currency = self.env['res.currency'].browse(currency_id or company_currency.id)
+            if currency != company_currency and not any(
+                    (transfer_type, key_segment, currency.id) in table for key_segment in (segment or False, False)):
+                fee = self._lookup_fee(table, transfer_type, segment,
+                                       company_currency.id, Rate._convert(amount, currency, company_currency))
+                fees.append(currency.round(Rate._convert(fee, company_currency, currency)))
+                continue
+            fees.append(round(self._lookup_fee(table, transfer_type, segment, currency.id, amount), 2))
+        return fees
+
+    @api.model
+    def _lookup_fee(self, table, transfer_type, segment, currency_id, amount):
+        for key in ((transfer_type, segment or False, currency_id), (transfer_type, False, currency_id)):
+            entry = table.get(key)
+            if not entry:
+                continue
+            index = bisect_right(entry[0], amount) - 1
+            if index >= 0 and amount < entry[1][index][1]:
+                _min, _max, fixed, rate = entry[1][index]
+                return fixed + amount * rate
+        return 0.0
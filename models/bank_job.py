@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import socket
+import time
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+
+class BankJobRun(models.Model):
+    _name = 'bank.job.run'
+    _description = 'Bank Job Run'
+    _order = 'id desc'
+
+    name = fields.Char(string='Job', required=True, readonly=True)
+    code = fields.Char(string='Code', required=True, readonly=True, index=True)
+    model_name = fields.Char(string='Model', required=True, readonly=True)
+    method = fields.Char(string='Chunk Handler', required=True, readonly=True)
+    params = fields.Json(string='Parameters', readonly=True)
+
+    # Status
+    state = fields.Selection([
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Status', default='running', required=True, readonly=True, index=True)
+    started_at = fields.Datetime(string='Started', default=fields.Datetime.now, readonly=True)
+    finished_at = fields.Datetime(string='Finished', readonly=True)
+
+    # Statistics
+    chunk_ids = fields.One2many('bank.job.chunk', 'run_id', string='Chunks', readonly=True)
+    chunk_count = fields.Integer(string='Chunks', compute='_compute_stats')
+    chunk_done_count = fields.Integer(string='Chunks Done', compute='_compute_stats')
+    chunk_failed_count = fields.Integer(string='Chunks Failed', compute='_compute_stats')
+    processed_count = fields.Integer(string='Records Processed', compute='_compute_stats')
+    duration = fields.Float(string='Duration (s)', compute='_compute_stats')
+    max_rss = fields.Float(string='Peak Memory (MB)', compute='_compute_stats',
+                           help='Highest memory high-water mark of the workers after a chunk of this run.')
+
+    @api.depends('chunk_ids.state', 'chunk_ids.processed', 'chunk_ids.max_rss', 'finished_at')
+    def _compute_stats(self):
+        stats = {
+            (run.id, state): (count, processed, max_rss)
+            for run, state, count, processed, max_rss in self.env['bank.job.chunk']._read_group(
+                [('run_id', 'in', self.ids)], ['run_id', 'state'], ['__count', 'processed:sum', 'max_rss:max'])
+        }
+        now = fields.Datetime.now()
+        for record in self:
+            pending = stats.get((record.id, 'pending'), (0, 0, 0.0))
+            done = stats.get((record.id, 'done'), (0, 0, 0.0))
+            failed = stats.get((record.id, 'failed'), (0, 0, 0.0))
+            record.chunk_count = pending[0] + done[0] + failed[0]
+            record.chunk_done_count = done[0]
+            record.chunk_failed_count = failed[0]
+            record.processed_count = done[1]
+            record.max_rss = max(done[2] or 0.0, failed[2] or 0.0)
+            end = record.finished_at or now
+            record.duration = (end - record.started_at).total_seconds() if record.started_at else 0.0
+
+    @api.model
+    def _chunk_keys(self, keys, size):
+        """Split sorted integer keys into (first, last) bounds of at most size keys"""
+        return [(keys[i], keys[min(i + size, len(keys)) - 1]) for i in range(0, len(keys), size)]
+
+    @api.model
+    def _chunk_range(self, low, high, size):
+        """Split the integer interval [low, high] into (first, last) bounds of size values"""
+        return [(start, min(start + size - 1, high)) for start in range(low, high + 1, size)]
+
+    @api.model
+    def _launch(self, code, name, model_name, method, bounds, params=None):
+        """Start a job, or resume the unfinished run of code, and work on it until no chunk is left
+
+        bounds is a list of (first, last) integer keys, one per chunk; the
+        handler model_name.method(first, last, params) processes the records
+        in that interval and returns how many it handled. It must re-check
+        its selection criteria so that a chunk can safely run again.
+
+        The run and its chunks are committed before any work starts; each
+        chunk is then committed with its work, so a killed worker only loses
+        the chunk in progress and the next run picks up from there.
+        """
+        run = self.search([('code', '=', code), ('state', '=', 'running')], limit=1)
+        if run:
+            run._work()
+            if run.state == 'running':
+                # Other workers still hold chunks of it
+                return run
+        if not bounds:
+            return run
+        run = self.create({
+            'name': name,
+            'code': code,
+            'model_name': model_name,
+            'method': method,
+            'params': params or {},
+        })
+        self.env['bank.job.chunk'].create([
+            {'run_id': run.id, 'key_from': first, 'key_to': last}
+            for first, last in bounds
+        ])
+        self.env.cr.commit()
+        run._work()
+        return run
+
+    def _work(self, max_chunks=None):
+        """Claim and process pending chunks of these runs, one committed transaction each
+
+        The environment cache is emptied after each chunk, so that a worker
+        going through many chunks keeps the memory of a single one.
+        """
+        Chunk = self.env['bank.job.chunk']
+        processed = 0
+        while max_chunks is None or processed < max_chunks:
+            chunk = Chunk._claim(self.ids)
+            if not chunk:
+                break
+            chunk._process()
+            self.env.cr.commit()
+            self.env.invalidate_all()
+            processed += 1
+        self._check_finished()
+        self.env.cr.commit()
+        return processed
+
+    def _check_finished(self):
+        """Close the runs without pending chunks"""
+        self.env['bank.job.chunk'].flush_model()
+        self.env.cr.execute("""
+            SELECT r.id, bool_or(c.state = 'failed')
+              FROM bank_job_run r
+              LEFT JOIN bank_job_chunk c ON c.run_id = r.id
+             WHERE r.id = ANY(%s) AND r.state = 'running'
+             GROUP BY r.id
+            HAVING NOT bool_or(coalesce(c.state = 'pending', FALSE))
+        """, [self.ids])
+        now = fields.Datetime.now()
+        for run_id, has_failed in self.env.cr.fetchall():
+            run = self.browse(run_id)
+            run.write({'state': 'failed' if has_failed else 'done', 'finished_at': now})
+            _logger.info('Bank job %s (%s) finished: %s chunks, %s records processed, %s failed chunks, '
+                         'peak memory %.1f MB',
+                         run.name, run.id, run.chunk_count, run.processed_count, run.chunk_failed_count,
+                         run.max_rss)
+
+    def action_retry_failed(self):
+        """Put failed chunks back in the queue and resume the runs"""
+        self.env['bank.job.chunk'].search([
+            ('run_id', 'in', self.ids), ('state', '=', 'failed'),
+        ]).write({'state': 'pending', 'error': False})
+        self.write({'state': 'running', 'finished_at': False})
+        self.env.ref('odoo_bank.cron_bank_job_worker')._trigger()
+
+    @api.model
+    def cron_run_workers(self, max_chunks=100):
+        """Cron job to work on unfinished runs, picking up after interrupted workers
+
+        Several copies of this cron can run at once: chunks are claimed with
+        FOR UPDATE SKIP LOCKED, so workers never process the same chunk.
+        """
+        runs = self.search([('state', '=', 'running')], order='id')
+        if runs:
+            runs._work(max_chunks=max_chunks)
+        return True
+
+
+class BankJobChunk(models.Model):
+    _name = 'bank.job.chunk'
+    _description = 'Bank Job Chunk'
+    _order = 'run_id, id'
+
+    run_id = fields.Many2one('bank.job.run', string='Run', required=True,
+                             ondelete='cascade', index=True)
+    key_from = fields.Integer(string='From', required=True)
+    key_to = fields.Integer(string='To', required=True)
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Status', default='pending', required=True)
+    processed = fields.Integer(string='Processed', default=0)
+    attempts = fields.Integer(string='Attempts', default=0)
+    duration = fields.Float(string='Duration (s)')
+    max_rss = fields.Float(string='Peak Memory (MB)', help='Memory high-water mark of the worker after the chunk.')
+    worker = fields.Char(string='Worker')
+    finished_at = fields.Datetime(string='Finished')
+    error = fields.Text(string='Error')
+
+    def init(self):
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS bank_job_chunk_pending_idx
+                ON bank_job_chunk (run_id, id) WHERE state = 'pending'
+        """)
+
+    @api.model
+    def _claim(self, run_ids):
+        """Lock and return one pending chunk of run_ids that no other worker holds"""
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT id
+              FROM bank_job_chunk
+             WHERE run_id = ANY(%s) AND state = 'pending'
+             ORDER BY run_id, id
+             LIMIT 1
+               FOR UPDATE SKIP LOCKED
+        """, [list(run_ids)])
+        row = self.env.cr.fetchone()
+        return self.browse(row[0] if row else [])
+
+    def _process(self):
+        """Run the handler on this chunk; the row lock is held until the caller commits"""
+        self.ensure_one()
+        run = self.run_id
+        start = time.monotonic()
+        values = {
+            'attempts': self.attempts + 1,
+            'worker': f'{socket.gethostname()}:{os.getpid()}',
+            'finished_at': fields.Datetime.now(),
+        }
+        try:
+            with self.env.cr.savepoint():
+                handler = getattr(self.env[run.model_name], run.method)
+                processed = handler(self.key_from, self.key_to, run.params or {})
+        except Exception as e:
+            self.env.invalidate_all()
+            _logger.exception('Bank job %s chunk %s-%s failed', run.name, self.key_from, self.key_to)
+            values.update(state='failed', error=str(e))
+        else:
+            values.update(state='done', processed=processed or 0, error=False)
+        values['duration'] = time.monotonic() - start
+        values['max_rss'] = self.env['bank.batch']._max_rss()
+        self.write(values)
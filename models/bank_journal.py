@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+
+from collections import defaultdict
+
+from odoo import models, fields, api
+from odoo.exceptions import ValidationError
+
+# General ledger accounts of the bank's books
+GL_ACCOUNTS = [
+    ('cash', '1000 Cash and Clearing'),
+    ('external_clearing', '1100 External Transfer Clearing'),
+    ('loans_receivable', '1200 Loans Receivable'),
+    ('customer_deposits', '2000 Customer Deposits'),
+    ('opening_equity', '3000 Opening Balance Equity'),
+    ('fee_income', '4000 Fee Income'),
+    ('interest_expense', '5000 Interest Expense'),
+]
+
+# Counterpart of the customer deposit line for single-sided transactions
+TRANSACTION_COUNTERPARTS = {
+    'deposit': 'cash',
+    'withdrawal': 'cash',
+    'transfer_in': 'external_clearing',
+    'transfer_out': 'external_clearing',
+    'interest': 'interest_expense',
+    'fee': 'fee_income',
+    'loan_disbursement': 'loans_receivable',
+    'loan_repayment': 'loans_receivable',
+}
+
+
+class BankJournalEntry(models.Model):
+    _name = 'bank.journal.entry'
+    _description = 'Bank Journal Entry'
+    _order = 'date desc, id desc'
+
+    name = fields.Char(string='Number', required=True, readonly=True, copy=False)
+    date = fields.Datetime(string='Date', required=True, readonly=True, default=fields.Datetime.now)
+    reference = fields.Char(string='Reference', readonly=True, index=True)
+    description = fields.Char(string='Description', readonly=True)
+    transfer_id = fields.Many2one('bank.transfer', string='Transfer', readonly=True,
+                                  index='btree_not_null')
+    transaction_ids = fields.One2many('bank.transaction', 'journal_entry_id', string='Transactions')
+    line_ids = fields.One2many('bank.journal.line', 'entry_id', string='Lines', readonly=True)
+    currency_id = fields.Many2one('res.currency', string='Currency', readonly=True,
+                                  default=lambda self: self.env.company.currency_id)
+    amount_total = fields.Monetary(string='Total', currency_field='currency_id',
+                                   compute='_compute_amount_total')
+
+    @api.depends('line_ids.debit')
+    def _compute_amount_total(self):
+        totals = dict(self.env['bank.journal.line']._read_group(
+            [('entry_id', 'in', self.ids)], ['entry_id'], ['debit:sum']))
+        for record in self:
+            record.amount_total = totals.get(record, 0.0)
+
+    def write(self, vals):
+        raise ValidationError('Journal entries cannot be modified. Post a reversing entry instead.')
+
+    def unlink(self):
+        raise ValidationError('Journal entries cannot be deleted. Post a reversing entry instead.')
+
+    @api.model
+    def _post(self, lines, reference, description=False, transfer=None):
+        """Post a balanced entry and apply it to the customer account balances
+
+        lines is a list of (gl_code, bank account id or False, amount,
+        amount in the bank account's currency or False), a positive amount
+        being a debit and a negative one a credit. Amounts are in the company
+        currency, in which entries balance. A credit on customer_deposits
+        raises that account's balance by its account currency amount. The
+        lines are written with one multi-row insert and the balances, a
+        projection of the customer_deposits lines, with one UPDATE that
+        refuses to take an account below its available balance.
+        """
+        deltas = defaultdict(float)
+        for gl_code, account_id, _amount, amount_currency in lines:
+            if gl_code == 'customer_deposits':
+                deltas[account_id] -= amount_currency
+        if deltas:
+            self._apply_balance_deltas(deltas, reference)
+        return self._create_entry(lines, reference, description, transfer)
+
+    @api.model
+    def _create_entry(self, lines, reference, description=False, transfer=None):
+        """Write the entry and its lines, as described by _post, without touching balances"""
+        return self._create_entries([(lines, reference, description, transfer)])
+
+    @api.model
+    def _create_entries(self, entries):
+        """Write entries from (lines, reference, description, transfer) tuples
+
+        The entries are created in one batch, numbered from one sequence
+        draw, and the lines of all of them with one multi-row insert;
+        balances are left to the caller.
+        """
+        currency = self.env.company.currency_id
+        for lines, reference, _description, _transfer in entries:
+            if not currency.is_zero(sum(line[2] for line in lines)):
+                raise ValidationError(f'Unbalanced journal entry for {reference}.')
+        account_currencies = {
+            account.id: account.currency_id.id
+            for account in self.env['bank.account'].browse({
+                line[1] for lines, *_rest in entries for line in lines if line[1]
+            })
+        }
+
+        names = self.env['bank.batch']._next_numbers('bank.journal.entry', len(entries))
+        records = self.create([{
+            'name': name or reference,
+            'reference': reference,
+            'description': description,
+            'transfer_id': transfer.id if transfer else False,
+            'currency_id': currency.id,
+        } for name, (_lines, reference, description, transfer) in zip(names, entries)])
+        flat = [(record, line) for record, (lines, *_rest) in zip(records, entries) for line in lines]
+        self.env.cr.execute("""
+            INSERT INTO bank_journal_line
+                   (entry_id, date, gl_code, account_id, debit, credit, currency_id,
+                    amount_currency, account_currency_id,
+                    create_uid, create_date, write_uid, write_date)
+            SELECT l.entry_id, l.date, l.gl_code, l.account_id,
+                   greatest(l.amount, 0), greatest(-l.amount, 0), %(currency_id)s,
+                   l.amount_currency, l.account_currency_id,
+                   %(uid)s, l.date, %(uid)s, l.date
+              FROM unnest(%(entry_ids)s::int[], %(dates)s::timestamp[], %(gl_codes)s::varchar[],
+                          %(account_ids)s::int[], %(amounts)s::numeric[],
+                          %(amounts_currency)s::numeric[], %(account_currency_ids)s::int[])
+                   AS l(entry_id, date, gl_code, account_id, amount, amount_currency, account_currency_id)
+             WHERE l.amount <> 0 OR l.amount_currency <> 0
+        """, {
+            'currency_id': currency.id,
+            'uid': self.env.uid,
+            'entry_ids': [record.id for record, _line in flat],
+            'dates': [record.date for record, _line in flat],
+            'gl_codes': [line[0] for _record, line in flat],
+            'account_ids': [line[1] or None for _record, line in flat],
+            'amounts': [line[2] for _record, line in flat],
+            'amounts_currency': [line[3] if line[1] else None for _record, line in flat],
+            'account_currency_ids': [account_currencies.get(line[1]) for _record, line in flat],
+        })
+        return records
+
+    @api.model
+    def _apply_balance_deltas(self, deltas, reference):
+        """Add {account id: delta} to the account balances and return {account id: new balance}"""
+        Account = self.env['bank.account']
+        Account.flush_model(['balance', 'available_balance'])
+        account_ids = list(deltas)
+        self.env.cr.execute("""
+            UPDATE bank_account a
+               SET balance = a.balance + d.delta,
+                   available_balance = a.available_balance + d.delta,
+                   write_date = now() at time zone 'UTC', write_uid = %s
+              FROM unnest(%s::int[], %s::numeric[]) AS d(id, delta)
+             WHERE a.id = d.id
+               AND (d.delta >= 0 OR a.available_balance + d.delta >= 0)
+         RETURNING a.id, a.balance, a.available_balance
+        """, [self.env.uid, account_ids, [deltas[account_id] for account_id in account_ids]])
+        rows = self.env.cr.fetchall()
+        Account.browse(account_ids).invalidate_recordset(['balance', 'available_balance'])
+        if len(rows) != len(account_ids):
+            raise ValidationError('Insufficient balance.')
+        new_balances = {account_id: balance for account_id, balance, _available in rows}
+        self.env['bank.event']._publish_balances([
+            (account_id, balance, available, deltas[account_id]) for account_id, balance, available in rows
+        ])
+
+        # Log balance update
+        self.env['bank.audit.log'].create([{
+            'action': 'update',
+            'model_name': 'bank.account',
+            'record_id': account_id,
+            'description': f'Balance updated: {reference} {deltas[account_id]:+}. '
+                           f'New balance: {new_balances[account_id]}',
+            'user_id': self.env.user.id,
+        } for account_id in account_ids])
+        return new_balances
+
+    @api.model
+    def check_trial_balance(self):
+        """Verify the books with one aggregate over the journal
+
+        Returns the debit and credit totals per GL account and overall; the
+        books are balanced when both overall totals match.
+        """
+        self.env['bank.journal.line'].flush_model()
+        self.env.cr.execute("""
+            SELECT gl_code, sum(debit), sum(credit)
+              FROM bank_journal_line
+             GROUP BY ROLLUP (gl_code)
+        """)
+        by_gl = {}
+        debit = credit = 0.0
+        for gl_code, gl_debit, gl_credit in self.env.cr.fetchall():
+            if gl_code is None:
+                debit, credit = float(gl_debit or 0), float(gl_credit or 0)
+            else:
+                by_gl[gl_code] = {'debit': float(gl_debit), 'credit': float(gl_credit)}
+        return {
+            'debit': debit,
+            'credit': credit,
+            'balanced': self.env.company.currency_id.is_zero(debit - credit),
+            'by_gl': by_gl,
+        }
+
+    @api.model
+    def action_check_trial_balance(self):
+        """Run the trial balance check and report the result"""
+        result = self.check_trial_balance()
+        if result['balanced']:
+            message, notification_type = f"Books balanced: {result['debit']:,.2f} debit / credit.", 'success'
+        else:
+            message = (f"Books out of balance: debit {result['debit']:,.2f}, "
+                       f"credit {result['credit']:,.2f}.")
+            notification_type = 'danger'
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {'message': message, 'type': notification_type, 'sticky': not result['balanced']},
+        }
+
+
+class BankJournalLine(models.Model):
+    _name = 'bank.journal.line'
+    _description = 'Bank Journal Line'
+    _order = 'entry_id desc, id'
+
+    entry_id = fields.Many2one('bank.journal.entry', string='Entry', required=True,
+                               ondelete='restrict', index=True, readonly=True)
+    date = fields.Datetime(string='Date', required=True, readonly=True)
+    gl_code = fields.Selection(GL_ACCOUNTS, string='GL Account', required=True, readonly=True)
+    account_id = fields.Many2one('bank.account', string='Bank Account', readonly=True,
+                                 ondelete='restrict', index='btree_not_null')
+    debit = fields.Monetary(string='Debit', currency_field='currency_id', readonly=True)
+    credit = fields.Monetary(string='Credit', currency_field='currency_id', readonly=True)
+    currency_id = fields.Many2one('res.currency', string='Currency', required=True, readonly=True)
+    amount_currency = fields.Monetary(string='Account Amount', currency_field='account_currency_id',
+                                      readonly=True,
+                                      help='Signed amount in the bank account currency, positive for a debit.')
+    account_currency_id = fields.Many2one('res.currency', string='Account Currency', readonly=True)
+
+    _debit_credit_check = models.Constraint('CHECK(debit >= 0 AND credit >= 0 AND (debit = 0 OR credit = 0))',
+                                            'A journal line is either a debit or a credit!')
+    _customer_line_account = models.Constraint("CHECK(gl_code != 'customer_deposits' OR account_id IS NOT NULL)",
+                                               'Customer deposit lines need a bank account!')
+
+    def init(self):
+        # Accounts holding a balance from before the journal existed get an
+        # opening entry, converted to the company currency at the latest rate
+        company_currency = self.env.company.currency_id
+        self.env.cr.execute("""
+            WITH opening AS (
+                SELECT a.id, a.balance, a.currency_id,
+                       CASE WHEN a.currency_id = %(currency_id)s THEN a.balance
+                            ELSE round(a.balance / coalesce(r.rate, 1), %(digits)s)
+                       END AS company_balance
+                  FROM bank_account a
+                  LEFT JOIN LATERAL (
+                        SELECT rate FROM res_currency_rate
+                         WHERE currency_id = a.currency_id
+                         ORDER BY name DESC LIMIT 1
+                       ) r ON TRUE
+                 WHERE a.balance <> 0
+                   AND NOT EXISTS (SELECT 1 FROM bank_journal_line l WHERE l.account_id = a.id)
+            ), entry AS (
+                INSERT INTO bank_journal_entry (name, date, reference, description, currency_id,
+                                                create_date, write_date)
+                SELECT 'OPENING-' || to_char(now(), 'YYYYMMDDHH24MISS'), now() at time zone 'UTC',
+                       'OPENING', 'Opening balances', %(currency_id)s,
+                       now() at time zone 'UTC', now() at time zone 'UTC'
+                  FROM opening
+                HAVING count(*) > 0
+                RETURNING id, date
+            )
+            INSERT INTO bank_journal_line (entry_id, date, gl_code, account_id, debit, credit, currency_id,
+                                           amount_currency, account_currency_id, create_date, write_date)
+            SELECT entry.id, entry.date, 'customer_deposits', o.id,
+                   greatest(-o.company_balance, 0), greatest(o.company_balance, 0), %(currency_id)s,
+                   -o.balance, o.currency_id, entry.date, entry.date
+              FROM opening o, entry
+            UNION ALL
+            SELECT entry.id, entry.date, 'opening_equity', NULL,
+                   greatest(sum(o.company_balance), 0), greatest(-sum(o.company_balance), 0), %(currency_id)s,
+                   NULL, NULL, entry.date, entry.date
+              FROM opening o, entry
+             GROUP BY entry.id, entry.date
+        """, {'currency_id': company_currency.id, 'digits': company_currency.decimal_places})
+
+    def write(self, vals):
+        raise ValidationError('Journal lines cannot be modified.')
+
+    def unlink(self):
+        raise ValidationError('Journal lines cannot be deleted.')
@@ -8,7 +8,7 @@ from dateutil.relativedelta import relativedelta
 class BankLoan(models.Model):
     _name = 'bank.loan'
     _description = 'Bank Loan'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'bank.status.mixin']
     _order = 'application_date desc, id desc'
     _rec_name = 'loan_number'
 
@@ -176,6 +176,7 @@ class BankLoan(models.Model):
     def action_approve(self):
         """Approve loan"""
         for record in self:
+            record._claim_status(['submitted', 'under_review'])
             record.write({
                 'status': 'approved',
                 'approved_by': self.env.user.id,
@@ -183,14 +184,12 @@ class BankLoan(models.Model):
                 'approved_amount': record.requested_amount,  # Can be modified
             })
             record.message_post(body=f'Loan approved for {record.approved_amount}')
-            
-            # Send notification
-            self.env['bank.notification'].create({
-                'customer_id': record.customer_id.id,
-                'notification_type': 'email',
-                'subject': 'Loan Approved',
-                'message': f'Your {record.loan_type} loan of {record.approved_amount} has been approved.',
-            })
+        
+        # Send notification
+        self.env['bank.notification']._notify('loan_approved', [
+            (record.customer_id, {'loan_type': record.loan_type, 'amount': record.approved_amount})
+            for record in self
+        ])
     
     def action_reject(self):
         """Reject loan"""
@@ -203,12 +202,14 @@ class BankLoan(models.Model):
         for record in self:
             if record.status != 'approved':
                 raise ValidationError('Only approved loans can be disbursed.')
+            record._claim_status(['approved'])
             
             # Create disbursement transaction
-            txn = self.env['bank.transaction'].create({
+            txn = self.env['bank.transaction'].with_context(bank_skip_screening=True).create({
                 'account_id': record.account_id.id,
                 'transaction_type': 'loan_disbursement',
                 'amount': record.approved_amount,
+                'currency_id': record.currency_id.id,
                 'description': f'Loan disbursement - {record.loan_number}',
                 'reference': record.loan_number,
                 'loan_id': record.id,
@@ -233,10 +234,11 @@ class BankLoan(models.Model):
             raise ValidationError('Cannot make payment for inactive loan.')
         
         # Create repayment transaction
-        txn = self.env['bank.transaction'].create({
+        txn = self.env['bank.transaction'].with_context(bank_skip_screening=True).create({
             'account_id': self.account_id.id,
             'transaction_type': 'loan_repayment',
             'amount': amount,
+            'currency_id': self.currency_id.id,
             'description': f'Loan repayment - {self.loan_number}',
             'reference': self.loan_number,
             'loan_id': self.id,
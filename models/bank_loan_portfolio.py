@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+from odoo.tools.sql import create_index
+
+# Loans whose delinquency is tracked by the portfolio snapshot
+PORTFOLIO_STATUSES = ('disbursed', 'active', 'defaulted')
+
+
+class BankLoanPortfolio(models.Model):
+    _name = 'bank.loan.portfolio'
+    _description = 'Loan Portfolio Snapshot'
+    _order = 'snapshot_date desc, days_past_due desc, id'
+    _rec_name = 'loan_id'
+
+    snapshot_date = fields.Date(string='Snapshot Date', required=True, readonly=True, index=True)
+    is_latest = fields.Boolean(string='Latest', readonly=True)
+    loan_id = fields.Many2one('bank.loan', string='Loan', required=True, readonly=True,
+                              ondelete='cascade', index=True)
+    customer_id = fields.Many2one('bank.customer', string='Customer', readonly=True)
+    loan_type = fields.Selection(
+        lambda self: self.env['bank.loan']._fields['loan_type'].selection,
+        string='Loan Type', readonly=True)
+    status = fields.Selection(
+        lambda self: self.env['bank.loan']._fields['status'].selection,
+        string='Loan Status', readonly=True)
+    currency_id = fields.Many2one('res.currency', string='Currency', readonly=True)
+
+    # Schedule vs repayments
+    disbursed_amount = fields.Monetary(string='Disbursed', currency_field='currency_id', readonly=True)
+    installments_due = fields.Integer(string='Installments Due', readonly=True, aggregator='sum')
+    installments_paid = fields.Integer(string='Installments Paid', readonly=True, aggregator='sum')
+    amount_due = fields.Monetary(string='Amount Due', currency_field='currency_id', readonly=True)
+    amount_paid = fields.Monetary(string='Amount Paid', currency_field='currency_id', readonly=True)
+    arrears = fields.Monetary(string='Arrears', currency_field='currency_id', readonly=True)
+    outstanding_amount = fields.Monetary(string='Outstanding', currency_field='currency_id', readonly=True)
+
+    # Delinquency
+    days_past_due = fields.Integer(string='Days Past Due', readonly=True, aggregator='max')
+    risk_bucket = fields.Selection([
+        ('current', 'Current'),
+        ('dpd_1_30', '1-30 DPD'),
+        ('dpd_31_60', '31-60 DPD'),
+        ('dpd_61_90', '61-90 DPD'),
+        ('dpd_90_plus', '90+ DPD'),
+    ], string='Risk Bucket', readonly=True, index=True)
+
+    # Arbiter of the snapshot upsert
+    _loan_date_unique = models.Constraint('unique(loan_id, snapshot_date)',
+                                          'One portfolio snapshot per loan and day!')
+
+    def init(self):
+        # Portfolio reports read the latest snapshot only
+        create_index(self.env.cr, 'bank_loan_portfolio_latest_idx', self._table,
+                     ['risk_bucket', 'loan_type'], where='is_latest')
+
+    @api.model
+    def _job_snapshot_loans(self, first, last, params):
+        """Job chunk: snapshot the loans with ids in [first, last] as of the run date
+
+        The repayment schedule (one EMI a month from the first EMI date) is
+        compared with the completed repayments of each loan in one
+        set-based statement: installments due by the date, installments
+        covered by the repayments, arrears, and days past due counted from
+        the oldest installment not covered. Older snapshots of these loans
+        are pruned to month ends, so the table holds one row per loan and
+        month plus the latest day.
+        """
+        self.env['bank.loan'].flush_model()
+        self.env['bank.transaction'].flush_model()
+        values = {
+            'first': first,
+            'last': last,
+            'date': params['snapshot_date'],
+            'statuses': list(PORTFOLIO_STATUSES),
+            'uid': self.env.uid,
+        }
+        self.env.cr.execute("""
+            DELETE FROM bank_loan_portfolio
+             WHERE loan_id BETWEEN %(first)s AND %(last)s
+               AND snapshot_date < %(date)s
+               AND snapshot_date <> (date_trunc('month', snapshot_date) + interval '1 month - 1 day')::date
+        """, values)
+        self.env.cr.execute("""
+            UPDATE bank_loan_portfolio
+               SET is_latest = FALSE
+             WHERE loan_id BETWEEN %(first)s AND %(last)s AND is_latest AND snapshot_date <> %(date)s
+        """, values)
+        self.env.cr.execute("""
+            WITH payments AS (
+                SELECT loan_id, sum(amount) AS paid
+                  FROM bank_transaction
+                 WHERE loan_id BETWEEN %(first)s AND %(last)s
+                   AND transaction_type = 'loan_repayment' AND status = 'completed'
+                 GROUP BY loan_id
+            ), schedule AS (
+                SELECT l.id, l.customer_id, l.loan_type, l.status, l.currency_id, l.disbursed_amount,
+                       l.emi_amount, l.tenure_months, l.outstanding_amount, l.first_emi_date,
+                       coalesce(p.paid, 0) AS paid,
+                       CASE WHEN l.first_emi_date IS NULL OR l.first_emi_date > %(date)s::date THEN 0
+                            ELSE least(l.tenure_months,
+                                       extract(year FROM age(%(date)s::date, l.first_emi_date))::int * 12
+                                       + extract(month FROM age(%(date)s::date, l.first_emi_date))::int + 1)
+                       END AS due_count,
+                       CASE WHEN l.emi_amount > 0 THEN floor(coalesce(p.paid, 0) / l.emi_amount)::int
+                            ELSE 0
+                       END AS paid_count
+                  FROM bank_loan l
+                  LEFT JOIN payments p ON p.loan_id = l.id
+                 WHERE l.id BETWEEN %(first)s AND %(last)s AND l.status = ANY(%(statuses)s)
+            ), delinquency AS (
+                SELECT s.*,
+                       CASE WHEN s.paid_count >= s.due_count THEN 0
+                            ELSE %(date)s::date - (s.first_emi_date + s.paid_count * interval '1 month')::date
+                       END AS dpd
+                  FROM schedule s
+            )
+            INSERT INTO bank_loan_portfolio
+                   (snapshot_date, is_latest, loan_id, customer_id, loan_type, status, currency_id,
+                    disbursed_amount, installments_due, installments_paid, amount_due, amount_paid,
+                    arrears, outstanding_amount, days_past_due, risk_bucket,
+                    create_uid, create_date, write_uid, write_date)
+            SELECT %(date)s, TRUE, d.id, d.customer_id, d.loan_type, d.status, d.currency_id,
+                   d.disbursed_amount, d.due_count, least(d.paid_count, d.tenure_months),
+                   d.due_count * d.emi_amount, d.paid,
+                   greatest(d.due_count * d.emi_amount - d.paid, 0), d.outstanding_amount, d.dpd,
+                   CASE WHEN d.dpd = 0 THEN 'current'
+                        WHEN d.dpd <= 30 THEN 'dpd_1_30'
+                        WHEN d.dpd <= 60 THEN 'dpd_31_60'
+                        WHEN d.dpd <= 90 THEN 'dpd_61_90'
+                        ELSE 'dpd_90_plus'
+                   END,
+                   %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+              FROM delinquency d
+            ON CONFLICT (loan_id, snapshot_date) DO UPDATE
+               SET is_latest = TRUE,
+                   status = EXCLUDED.status,
+                   installments_due = EXCLUDED.installments_due,
+                   installments_paid = EXCLUDED.installments_paid,
+                   amount_due = EXCLUDED.amount_due,
+                   amount_paid = EXCLUDED.amount_paid,
+                   arrears = EXCLUDED.arrears,
+                   outstanding_amount = EXCLUDED.outstanding_amount,
+                   days_past_due = EXCLUDED.days_past_due,
+                   risk_bucket = EXCLUDED.risk_bucket,
+                   write_uid = EXCLUDED.write_uid,
+                   write_date = EXCLUDED.write_date
+        """, values)
+        count = self.env.cr.rowcount
+        self.invalidate_model()
+        return count
+
+    @api.model
+    def cron_snapshot_portfolio(self, batch_size=20000):
+        """Cron job to snapshot delinquency of every outstanding loan, chunk by chunk
+
+        Chunks cover every loan id, so that loans closed since the previous
+        run also lose their latest flag.
+        """
+        self.env.cr.execute("SELECT min(id), max(id) FROM bank_loan")
+        low, high = self.env.cr.fetchone()
+        Job = self.env['bank.job.run']
+        Job._launch('loan_portfolio', 'Snapshot Loan Portfolio', self._name, '_job_snapshot_loans',
+                    Job._chunk_range(low, high, batch_size) if low else [],
+                    {'snapshot_date': fields.Date.to_string(fields.Date.today())})
+        return True
+
+    @api.model
+    def action_snapshot_now(self):
+        """Run the portfolio snapshot cron as soon as possible"""
+        self.env.ref('odoo_bank.cron_snapshot_loan_portfolio')._trigger()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'message': 'The loan portfolio snapshot has been scheduled.',
+                'type': 'info',
+            },
+        }
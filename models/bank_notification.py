@@ -1,5 +1,8 @@
 # -*- coding: utf-8 -*-
 
+from collections import Counter, defaultdict
+from datetime import timedelta
+
 from odoo import models, fields, api
 
 
@@ -37,6 +40,7 @@ class BankNotification(models.Model):
         ('delivered', 'Delivered'),
         ('failed', 'Failed'),
         ('read', 'Read'),
+        ('merged', 'Merged'),
     ], string='Status', default='draft', tracking=True)
     
     # Delivery
@@ -48,6 +52,15 @@ class BankNotification(models.Model):
     error_message = fields.Text(string='Error Message')
     retry_count = fields.Integer(string='Retry Count', default=0)
     
+    # Coalescing
+    dedupe_key = fields.Char(string='Dedupe Key', index=True, readonly=True,
+                             help='Queued notifications sharing this key within the coalescing window '
+                                  'are merged into one digest.')
+    coalesce_count = fields.Integer(string='Merged Notifications', default=1, readonly=True)
+    send_after = fields.Datetime(string='Send After', readonly=True)
+    digest_id = fields.Many2one('bank.notification', string='Sent In', readonly=True,
+                                index='btree_not_null', ondelete='set null')
+    
     # Gateway Reference (for SMS/Email services)
     gateway_reference = fields.Char(string='Gateway Reference')
     
@@ -62,12 +75,89 @@ class BankNotification(models.Model):
     @api.model_create_multi
     def create(self, vals_list):
         results = super(BankNotification, self).create(vals_list)
+        if self.env.context.get('bank_notification_defer'):
+            return results
         # Auto-send if not draft
         for result in results:
             if result.status != 'draft':
                 result.action_send()
         return results
     
+    @api.model
+    def _coalesce_window(self):
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'odoo_bank.notification_coalesce_seconds', 60))
+    
+    @api.model
+    def _enqueue(self, vals_list):
+        """Queue notifications for the send cron, to be merged into per-customer digests
+        
+        Each notification is inserted as its own queued row, so concurrent
+        postings never update a shared digest row. Notifications sharing a
+        dedupe key (customer and channel unless given) queued within
+        odoo_bank.notification_coalesce_seconds of the first one are merged
+        into it when it is sent, see _merge_digests. A window of 0 disables
+        coalescing.
+        """
+        window = self._coalesce_window()
+        send_after = fields.Datetime.now() + timedelta(seconds=max(window, 0))
+        return self.with_context(bank_notification_defer=True).create([dict(
+            vals,
+            status='queued',
+            dedupe_key=(vals.get('dedupe_key') or f"{vals['customer_id']}:{vals.get('notification_type', 'email')}")
+            if window > 0 else False,
+            coalesce_count=1,
+            send_after=send_after,
+        ) for vals in vals_list])
+    
+    def _merge_digests(self):
+        """Merge the other queued notifications of each digest's dedupe key into it
+
+        self holds the oldest queued notification of each key. The others
+        queued before the digest's send_after are claimed with one
+        conditional UPDATE ... WHERE status = 'queued' RETURNING, so a
+        notification is only ever merged once; later ones wait for the next
+        digest. Repeated identical messages are rendered once with their
+        count, e.g. "Transfer received (x3)".
+        """
+        digests = self.filtered('dedupe_key')
+        if not digests:
+            return
+        self.flush_model()
+        self.env.cr.execute("""
+            UPDATE bank_notification n
+               SET status = 'merged', digest_id = d.id,
+                   write_uid = %s, write_date = now() at time zone 'UTC'
+              FROM bank_notification d
+             WHERE d.id = ANY(%s)
+               AND n.dedupe_key = d.dedupe_key
+               AND n.status = 'queued'
+               AND n.id > d.id
+               AND n.create_date <= d.send_after
+         RETURNING d.id, n.id, n.message
+        """, [self.env.uid, digests.ids])
+        merged = defaultdict(list)
+        for digest_id, notification_id, message in sorted(self.env.cr.fetchall()):
+            merged[digest_id].append(message)
+        self.invalidate_model(['status', 'digest_id'])
+        for digest in digests.filtered(lambda d: d.id in merged):
+            counts = Counter([digest.message, *merged[digest.id]])
+            count = digest.coalesce_count + len(merged[digest.id])
+            digest.write({
+                'subject': self._digest_subject(count, digest.subject),
+                'message': '\n'.join(message if n == 1 else f'{message} (x{n})' for message, n in counts.items()),
+                'coalesce_count': count,
+            })
+    
+    @api.model
+    def _digest_subject(self, count, subject):
+        return subject if count == 1 else f'Account activity ({count} updates)'
+    
+    @api.model
+    def _notify(self, code, items):
+        """Queue notifications from template code for a batch of (customer, values) pairs"""
+        return self._enqueue(self.env['bank.notification.template']._render_notifications(code, items))
+    
     def action_send(self):
         """Send notification"""
         for record in self:
@@ -166,10 +256,61 @@ class BankNotification(models.Model):
     @api.model
     def cron_retry_failed(self):
         """Cron job to retry failed notifications"""
+        failed_ids = self.search([
+            ('status', '=', 'failed'),
+            ('retry_count', '<', 3)
+        ], order='id').ids
+        
+        Job = self.env['bank.job.run']
+        Job._launch('notification_retry', 'Retry Failed Notifications', self._name,
+                    '_job_retry_failed', Job._chunk_keys(failed_ids, 200))
+    
+    @api.model
+    def _job_retry_failed(self, id_from, id_to, params):
+        """Job chunk: retry the failed notifications with ids in [id_from, id_to]"""
         failed_notifications = self.search([
+            ('id', '>=', id_from),
+            ('id', '<=', id_to),
             ('status', '=', 'failed'),
             ('retry_count', '<', 3)
         ])
         
-        for notification in failed_notifications:
-            notification.action_retry()
+        for batch in self.env['bank.batch']._iter_batches(failed_notifications, size=50):
+            for notification in batch:
+                notification.action_retry()
+        return len(failed_notifications)
+    
+    @api.model
+    def _due_digest_ids(self, now, id_from=None, id_to=None):
+        """Return the ids of the digests due: the oldest queued notification of each dedupe key"""
+        self.flush_model(['status', 'send_after', 'dedupe_key'])
+        self.env.cr.execute("""
+            SELECT id
+              FROM bank_notification n
+             WHERE status = 'queued'
+               AND (send_after IS NULL OR send_after <= %(now)s)
+               AND id BETWEEN coalesce(%(id_from)s, id) AND coalesce(%(id_to)s, id)
+               AND (dedupe_key IS NULL OR NOT EXISTS (
+                        SELECT 1 FROM bank_notification o
+                         WHERE o.dedupe_key = n.dedupe_key AND o.status = 'queued' AND o.id < n.id))
+             ORDER BY id
+        """, {'now': now, 'id_from': id_from, 'id_to': id_to})
+        return [row[0] for row in self.env.cr.fetchall()]
+    
+    @api.model
+    def cron_send_queued(self):
+        """Cron job to send queued notifications, merged into their digests"""
+        now = fields.Datetime.now()
+        Job = self.env['bank.job.run']
+        Job._launch('notification_send', 'Send Queued Notifications', self._name,
+                    '_job_send_queued', Job._chunk_keys(self._due_digest_ids(now), 500),
+                    {'now': fields.Datetime.to_string(now)})
+    
+    @api.model
+    def _job_send_queued(self, id_from, id_to, params):
+        """Job chunk: merge and send the digests due with ids in [id_from, id_to]"""
+        queued = self.browse(self._due_digest_ids(params['now'], id_from, id_to))
+        for batch in self.env['bank.batch']._iter_batches(queued, size=50):
+            batch._merge_digests()
+            batch.action_send()
+        return len(queued)
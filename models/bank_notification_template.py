@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import string
+import time
+
+from odoo import models, fields, api, tools
+from odoo.exceptions import ValidationError
+
+_logger = logging.getLogger(__name__)
+
+_FORMATTER = string.Formatter()
+
+# Placeholders passed by the code sending each notification
+TEMPLATE_PLACEHOLDERS = {
+    'kyc_approved': {'customer_ref'},
+    'kyc_rejected': {'reason'},
+    'account_activated': {'account_number'},
+    'transaction_alert': {'transaction_type', 'amount', 'account_number'},
+    'transfer_success': {'amount', 'reference'},
+    'standing_order_failed': {'order', 'amount', 'reason'},
+    'loan_approved': {'loan_type', 'amount'},
+    'fd_opened': {'amount', 'maturity_date'},
+    'fd_matured': {'fd_number', 'amount'},
+}
+
+
+def _compile(text):
+    """Split a str.format() template into (literal, field, format_spec) parts"""
+    return tuple(
+        (literal, field_name, format_spec or '')
+        for literal, field_name, format_spec, _conversion in _FORMATTER.parse(text or '')
+    )
+
+
+def _render_field(values, field_name, spec):
+    """Format one placeholder, leaving it as written when it cannot be filled"""
+    if field_name not in values:
+        return '{' + field_name + (':' + spec if spec else '') + '}'
+    try:
+        return format(values[field_name], spec)
+    except (TypeError, ValueError):
+        return str(values[field_name])
+
+
+def _render(parts, values):
+    return ''.join(
+        literal + (_render_field(values, field_name, spec) if field_name is not None else '')
+        for literal, field_name, spec in parts
+    )
+
+
+class BankNotificationTemplate(models.Model):
+    _name = 'bank.notification.template'
+    _description = 'Bank Notification Template'
+    _order = 'code, lang'
+
+    name = fields.Char(string='Name', required=True)
+    code = fields.Char(string='Code', required=True, index=True,
+                       help='Identifier used by the code sending the notification.')
+    lang = fields.Char(string='Language',
+                       help='Language code (e.g. fr_FR). Leave empty for the default template.')
+    notification_type = fields.Selection([
+        ('email', 'Email'),
+        ('sms', 'SMS'),
+        ('push', 'Push Notification'),
+        ('in_app', 'In-App Notification'),
+    ], string='Type', required=True, default='email')
+    subject = fields.Char(string='Subject', required=True)
+    body = fields.Text(string='Body', required=True,
+                       help='Python format string, e.g. "Transfer of {amount} completed. Ref: {reference}"')
+    active = fields.Boolean(string='Active', default=True)
+
+    _code_lang_unique = models.Constraint('unique(code, lang)', 'Only one template per code and language!')
+
+    @api.constrains('code', 'subject', 'body')
+    def _check_format(self):
+        for record in self:
+            try:
+                parts = _compile(record.subject) + _compile(record.body)
+            except ValueError as e:
+                raise ValidationError(f'Invalid template {record.code}: {e}')
+            allowed = TEMPLATE_PLACEHOLDERS.get(record.code)
+            if allowed is None:
+                continue
+            unknown = {field_name for _literal, field_name, _spec in parts if field_name is not None} - allowed
+            if unknown:
+                raise ValidationError(
+                    f'Invalid template {record.code}: unknown placeholders {", ".join(sorted(unknown))}; '
+                    f'available: {", ".join(sorted(allowed))}')
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super(BankNotificationTemplate, self).create(vals_list)
+        self.env.registry.clear_cache()
+        return records
+
+    def write(self, vals):
+        result = super(BankNotificationTemplate, self).write(vals)
+        self.env.registry.clear_cache()
+        return result
+
+    def unlink(self):
+        result = super(BankNotificationTemplate, self).unlink()
+        self.env.registry.clear_cache()
+        return result
+
+    @tools.ormcache()
+    def _get_compiled_templates(self):
+        """Return {(code, lang): (notification_type, subject parts, body parts)}, cached per registry"""
+        return {
+            (template['code'], template['lang'] or False): (
+                template['notification_type'], _compile(template['subject']), _compile(template['body']),
+            )
+            for template in self.sudo().search_read([], ['code', 'lang', 'notification_type', 'subject', 'body'])
+        }
+
+    @api.model
+    def _render_notifications(self, code, items):
+        """Render notification values for a batch of (customer, values) pairs
+
+        Items are grouped by customer language and each group is rendered
+        with its compiled template in one pass. Returns a list of
+        bank.notification create values; archiving a template stops its
+        notifications.
+        """
+        templates = self._get_compiled_templates()
+        by_lang = {}
+        for customer, values in items:
+            lang = customer.user_id.lang or False
+            by_lang.setdefault(lang if (code, lang) in templates else False, []).append((customer, values))
+        if (code, False) not in templates and by_lang.pop(False, None):
+            _logger.info('No active notification template %s, notifications skipped', code)
+
+        start = time.perf_counter()
+        vals_list = []
+        for lang, lang_items in by_lang.items():
+            notification_type, subject_parts, body_parts = templates[code, lang]
+            vals_list.extend({
+                'customer_id': customer.id,
+                'notification_type': notification_type,
+                'subject': _render(subject_parts, values),
+                'message': _render(body_parts, values),
+            } for customer, values in lang_items)
+        _logger.debug('Rendered %s %s notifications in %.2fms',
+                      len(vals_list), code, (time.perf_counter() - start) * 1000)
+        return vals_list
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+from odoo.tools import str2bool
+
+
+class BankPostingMixin(models.AbstractModel):
+    _name = 'bank.posting.mixin'
+    _description = 'Bank Posting Mixin'
+
+    # Audit log action used when chatter is replaced by the audit stream
+    _bank_audit_action = 'other'
+
+    @api.model
+    def _is_high_throughput(self):
+        """Return True when high-throughput posting mode is enabled"""
+        return str2bool(self.env['ir.config_parameter'].sudo().get_param(
+            'odoo_bank.high_throughput_mode', 'False'))
+
+    def _posting_env(self):
+        """Return self with field tracking disabled in high-throughput mode"""
+        if self.env.context.get('tracking_disable') or not self._is_high_throughput():
+            return self
+        return self.with_context(tracking_disable=True)
+
+    def _log_posting(self, body):
+        """Post a chatter message, or an audit log entry in high-throughput mode"""
+        if not self._is_high_throughput():
+            for record in self:
+                record.message_post(body=body)
+            return
+        self.env['bank.audit.log'].create([{
+            'action': self._bank_audit_action,
+            'model_name': self._name,
+            'record_id': record.id,
+            'description': f'{record.display_name}: {body}',
+            'user_id': self.env.user.id,
+        } for record in self])
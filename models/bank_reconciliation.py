@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import csv
+import difflib
+import io
+import itertools
+import logging
+import tempfile
+import time
+from bisect import insort
+from collections import defaultdict
+from decimal import Decimal
+
+from odoo import models, fields, api
+from odoo.exceptions import ValidationError
+
+_logger = logging.getLogger(__name__)
+
+STATEMENT_COLUMNS = ('reference', 'amount', 'date')
+
+
+class BankReconciliation(models.Model):
+    _name = 'bank.reconciliation'
+    _description = 'Bank Statement Reconciliation'
+    _order = 'create_date desc, id desc'
+
+    name = fields.Char(string='Reference', required=True, copy=False,
+                       readonly=True, default=lambda self: 'New')
+    statement_file = fields.Binary(string='Statement File', attachment=True, required=True,
+                                   help='CSV file with the columns reference, amount and date (YYYY-MM-DD).')
+    statement_filename = fields.Char(string='Statement Filename')
+    reconciliation_date = fields.Date(string='Reconciliation Date', required=True,
+                                      default=fields.Date.today)
+
+    # Matching Parameters
+    date_window_days = fields.Integer(string='Date Window (Days)', default=3, required=True,
+                                      help='Maximum distance between statement and transaction dates.')
+    fuzzy_threshold = fields.Float(string='Fuzzy Reference Threshold', default=0.85,
+                                   digits=(3, 2),
+                                   help='Minimum reference similarity (0-1) for amount/date fallback matches.')
+    chunk_size = fields.Integer(string='Chunk Size', default=20000, required=True)
+
+    # Results
+    status = fields.Selection([
+        ('draft', 'Draft'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Status', default='draft', readonly=True)
+    line_count = fields.Integer(string='Statement Lines', readonly=True)
+    matched_count = fields.Integer(string='Exact Matches', readonly=True)
+    fuzzy_count = fields.Integer(string='Fuzzy Matches', readonly=True)
+    unmatched_count = fields.Integer(string='Unmatched Lines', readonly=True)
+    duration = fields.Float(string='Duration (s)', readonly=True, digits=(12, 2))
+    unmatched_file = fields.Binary(string='Unmatched Lines', attachment=True, readonly=True)
+    unmatched_filename = fields.Char(string='Unmatched Filename', readonly=True)
+    error_message = fields.Text(string='Error Message', readonly=True)
+
+    transaction_ids = fields.One2many('bank.transaction', 'reconciliation_id',
+                                      string='Reconciled Transactions')
+
+    _date_window_positive = models.Constraint('CHECK(date_window_days >= 0)', 'Date window cannot be negative!')
+    _chunk_size_positive = models.Constraint('CHECK(chunk_size > 0)', 'Chunk size must be positive!')
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            if vals.get('name', 'New') == 'New':
+                vals['name'] = self.env['ir.sequence'].next_by_code('bank.reconciliation') or 'New'
+        return super(BankReconciliation, self).create(vals_list)
+
+    def action_reconcile(self):
+        """Match the statement file against unreconciled transactions"""
+        for record in self:
+            if record.status == 'done':
+                raise ValidationError('This statement has already been reconciled.')
+            start = time.monotonic()
+            try:
+                # A failed statement leaves none of its chunks reconciled
+                with self.env.cr.savepoint():
+                    stats = record._run_reconciliation()
+            except (ValueError, KeyError, csv.Error) as e:
+                record.write({'status': 'failed', 'error_message': str(e)})
+                continue
+            stats['duration'] = time.monotonic() - start
+            record.write(dict(stats, status='done', error_message=False))
+            self.env['bank.audit.log'].log_action(
+                'other', self._name, record.id,
+                f'Statement {record.name} reconciled: {stats["matched_count"]} exact, '
+                f'{stats["fuzzy_count"]} fuzzy, {stats["unmatched_count"]} unmatched')
+
+    def _open_statement(self):
+        """Return a binary stream over the statement file without loading it in memory"""
+        self.ensure_one()
+        attachment = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+            ('res_field', '=', 'statement_file'),
+        ], limit=1)
+        if not attachment:
+            raise ValidationError('Please upload a statement file.')
+        if attachment.store_fname:
+            return open(attachment._full_path(attachment.store_fname), 'rb')
+        return io.BytesIO(attachment.raw)
+
+    @api.model
+    def _parse_line(self, row):
+        """Return (reference, amount in cents, date) for a statement row"""
+        return (
+            (row['reference'] or '').strip(),
+            int(round(float(row['amount']) * 100)),
+            fields.Date.to_date(row['date'].strip()),
+        )
+
+    def _run_reconciliation(self):
+        """Stream the statement in chunks and reconcile each chunk
+
+        Memory is bounded by chunk_size: each chunk only loads the candidate
+        transactions for its own references and amounts, and matches are
+        marked reconciled before the next chunk so they are never re-read.
+        """
+        self.ensure_one()
+        self.env['bank.transaction'].flush_model()
+        stats = {'line_count': 0, 'matched_count': 0, 'fuzzy_count': 0, 'unmatched_count': 0}
+        with self._open_statement() as raw, \
+                tempfile.TemporaryFile('w+', newline='') as unmatched, \
+                self.env['bank.replica.router']._read_env() as read_env:
+            # Matches are only committed at the end, so a replica does not see
+            # them yet: remember them to keep later chunks from re-matching.
+            claimed = set() if read_env.cr is not self.env.cr else None
+            reader = csv.DictReader(io.TextIOWrapper(raw, encoding='utf-8-sig', newline=''))
+            missing = set(STATEMENT_COLUMNS) - set(reader.fieldnames or ())
+            if missing:
+                raise ValueError(f'Statement file is missing columns: {", ".join(sorted(missing))}')
+            writer = csv.writer(unmatched)
+            writer.writerow(STATEMENT_COLUMNS)
+            while True:
+                rows = list(itertools.islice(reader, self.chunk_size))
+                if not rows:
+                    break
+                lines = [self._parse_line(row) for row in rows]
+                exact, rest = self._match_exact(lines, read_env.cr, claimed)
+                fuzzy, rest = self._match_fuzzy(rest, read_env.cr, claimed,
+                                                exclude={txn_id for txn_id, _line in exact})
+                # Transactions reconciled meanwhile by another statement are lost matches
+                marked = self._mark_reconciled([txn_id for txn_id, line in exact + fuzzy])
+                rest += [line for txn_id, line in exact + fuzzy if txn_id not in marked]
+                exact = [txn_id for txn_id, line in exact if txn_id in marked]
+                fuzzy = [txn_id for txn_id, line in fuzzy if txn_id in marked]
+                if claimed is not None:
+                    claimed.update(exact, fuzzy)
+                for reference, cents, date in rest:
+                    writer.writerow([reference, f'{cents / 100:.2f}', date])
+                stats['line_count'] += len(lines)
+                stats['matched_count'] += len(exact)
+                stats['fuzzy_count'] += len(fuzzy)
+                stats['unmatched_count'] += len(rest)
+                _logger.info('Reconciliation %s: %s lines processed', self.name, stats['line_count'])
+            if stats['unmatched_count']:
+                unmatched.seek(0)
+                stats['unmatched_file'] = base64.b64encode(unmatched.read().encode())
+                stats['unmatched_filename'] = f'{self.name}_unmatched.csv'
+        return stats
+
+    def _pick_candidate(self, candidates, date):
+        """Pop and return the id of the candidate closest to date within the window"""
+        window = self.date_window_days
+        best = None
+        for index, (txn_date, txn_id) in enumerate(candidates):
+            distance = abs((txn_date - date).days)
+            if distance <= window and (best is None or distance < best[0]):
+                best = (distance, index)
+        if best is None:
+            return None
+        return candidates.pop(best[1])[1]
+
+    def _match_exact(self, lines, cr, claimed=None):
+        """Match lines through a hash index on (reference, amount)
+
+        Candidates are read with cr, skipping ids in claimed. Returns the
+        (transaction id, line) pairs matched and the unmatched lines.
+        """
+        references = list({line[0] for line in lines if line[0]})
+        if not references:
+            return [], lines
+        cr.execute("""
+            SELECT id, reference, round(amount * 100)::bigint, transaction_date::date
+              FROM bank_transaction
+             WHERE reference = ANY(%s)
+               AND status = 'completed'
+               AND NOT is_reconciled
+        """, [references])
+        index = defaultdict(list)
+        for txn_id, reference, cents, txn_date in cr.fetchall():
+            if claimed and txn_id in claimed:
+                continue
+            insort(index[(reference, cents)], (txn_date, txn_id))
+        matched, rest = [], []
+        for line in lines:
+            reference, cents, date = line
+            candidates = index.get((reference, cents))
+            txn_id = candidates and self._pick_candidate(candidates, date)
+            if txn_id:
+                matched.append((txn_id, line))
+            else:
+                rest.append(line)
+        return matched, rest
+
+    def _match_fuzzy(self, lines, cr, claimed=None, exclude=()):
+        """Match remaining lines on amount and date, with a similar reference
+
+        Candidates are read per distinct (amount, date) of the lines, each
+        within its own date window, so a chunk spanning months does not read
+        every transaction of its amounts over the whole span. Transactions in
+        exclude, already matched by the exact pass, are never given to a
+        second line.
+        """
+        if not lines:
+            return [], lines
+        window = self.date_window_days
+        keys = list({(line[1], line[2]) for line in lines})
+        cr.execute("""
+            SELECT DISTINCT t.id, coalesce(t.reference, ''), round(t.amount * 100)::bigint,
+                   t.transaction_date::date
+              FROM unnest(%s::numeric[], %s::date[]) AS l(amount, date)
+              JOIN bank_transaction t
+                ON t.amount = l.amount
+               AND t.transaction_date >= l.date - %s
+               AND t.transaction_date < l.date + %s + 1
+             WHERE t.status = 'completed'
+               AND NOT t.is_reconciled
+        """, [[Decimal(cents).scaleb(-2) for cents, date in keys], [date for cents, date in keys],
+              window, window])
+        index = defaultdict(list)
+        for txn_id, reference, cents, txn_date in cr.fetchall():
+            if claimed and txn_id in claimed:
+                continue
+            index[cents].append((txn_date, txn_id, reference))
+        matched, used, rest = [], set(exclude), []
+        for line in lines:
+            reference, cents, date = line
+            best = None
+            for txn_date, txn_id, txn_reference in index.get(cents, ()):
+                distance = abs((txn_date - date).days)
+                if txn_id in used or distance > window:
+                    continue
+                ratio = difflib.SequenceMatcher(None, reference, txn_reference).ratio()
+                if ratio >= self.fuzzy_threshold and (best is None or (ratio, -distance) > best[:2]):
+                    best = (ratio, -distance, txn_id)
+            if best:
+                used.add(best[2])
+                matched.append((best[2], line))
+            else:
+                rest.append(line)
+        return matched, rest
+
+    def _mark_reconciled(self, transaction_ids):
+        """Mark transactions as reconciled in a single UPDATE and return the ids marked
+
+        Transactions reconciled in the meantime by a concurrent statement are
+        left untouched and not returned.
+        """
+        if not transaction_ids:
+            return set()
+        self.env.cr.execute("""
+            UPDATE bank_transaction
+               SET is_reconciled = TRUE, reconciliation_date = %s,
+                   reconciliation_id = %s, write_date = now() at time zone 'UTC', write_uid = %s
+             WHERE id = ANY(%s)
+               AND NOT is_reconciled
+         RETURNING id
+        """, [self.reconciliation_date, self.id, self.env.uid, transaction_ids])
+        marked = {row[0] for row in self.env.cr.fetchall()}
+        self.env['bank.transaction'].invalidate_model(
+            ['is_reconciled', 'reconciliation_date', 'reconciliation_id'])
+        return marked
+
+    def action_view_transactions(self):
+        """View reconciled transactions"""
+        return {
+            'name': 'Reconciled Transactions',
+            'type': 'ir.actions.act_window',
+            'res_model': 'bank.transaction',
+            'view_mode': 'list,form',
+            'domain': [('reconciliation_id', '=', self.id)],
+        }
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import logging
+
+import psycopg2
+
+from odoo import models, api
+from odoo.sql_db import db_connect
+from odoo.tools import config
+
+_logger = logging.getLogger(__name__)
+
+
+class BankReplicaRouter(models.AbstractModel):
+    _name = 'bank.replica.router'
+    _description = 'Bank Read Replica Router'
+
+    @api.model
+    def _replica_configured(self):
+        """Return True when Odoo is configured with a read-only database replica"""
+        return bool(config.get('db_replica_host') or config.get('db_replica_port'))
+
+    @api.model
+    def _max_replica_lag(self):
+        return float(self.env['ir.config_parameter'].sudo().get_param(
+            'odoo_bank.replica_max_lag_seconds', 30))
+
+    @api.model
+    def _replica_lag(self, cr):
+        """Return the replay lag of the replica behind cr, in seconds"""
+        cr.execute("""
+            SELECT CASE
+                       WHEN NOT pg_is_in_recovery() THEN 0
+                       WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                       ELSE coalesce(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+                   END
+        """)
+        return float(cr.fetchone()[0])
+
+    @api.model
+    def _open_replica_cursor(self):
+        """Return a cursor on the replica, or None if it is missing, down or lagging"""
+        if (self.env.context.get('bank_primary_read')
+                or getattr(self.env.cr, 'readonly', False)
+                or not self._replica_configured()):
+            return None
+        try:
+            cr = db_connect(self.env.cr.dbname, readonly=True).cursor()
+        except psycopg2.Error as e:
+            _logger.warning('Read replica unavailable, using primary: %s', e)
+            return None
+        usable = False
+        try:
+            lag = self._replica_lag(cr)
+            usable = lag <= self._max_replica_lag()
+            if not usable:
+                _logger.info('Read replica lagging by %.1fs, using primary', lag)
+        except psycopg2.Error as e:
+            _logger.warning('Read replica lag check failed, using primary: %s', e)
+        finally:
+            if not usable:
+                cr.close()
+        return cr if usable else None
+
+    @contextlib.contextmanager
+    def _read_env(self):
+        """Yield an environment for read-only work, on the replica when possible
+
+        Falls back to the current environment when no replica is configured,
+        it cannot be reached, or its replay lag exceeds
+        odoo_bank.replica_max_lag_seconds. Records from the yielded
+        environment must not be used after the block exits.
+        """
+        cr = self._open_replica_cursor()
+        if cr is None:
+            yield self.env
+            return
+        try:
+            yield self.env(cr=cr)
+        finally:
+            cr.close()
@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+import time
+from array import array
+
+from odoo import models, fields, api, tools
+
+from .bank_transaction import DEBIT_TYPES
+
+_logger = logging.getLogger(__name__)
+
+# Window code: (span in seconds, number of ring buckets)
+WINDOWS = {
+    '1m': (60, 12),
+    '1h': (3600, 60),
+    '24h': (86400, 96),
+}
+MAX_SPAN = max(span for span, _buckets in WINDOWS.values())
+MAX_COUNTERPARTIES = 1024
+
+
+class _Ring:
+    """Fixed-size ring of time buckets holding a count and a sum each"""
+    __slots__ = ('width', 'size', 'epochs', 'counts', 'sums')
+
+    def __init__(self, span, size):
+        self.width = span / size
+        self.size = size
+        self.epochs = array('q', [-1] * size)
+        self.counts = array('l', [0] * size)
+        self.sums = array('d', [0.0] * size)
+
+    def add(self, ts, amount):
+        epoch = int(ts // self.width)
+        slot = epoch % self.size
+        if self.epochs[slot] != epoch:
+            self.epochs[slot] = epoch
+            self.counts[slot] = 0
+            self.sums[slot] = 0.0
+        self.counts[slot] += 1
+        self.sums[slot] += amount
+
+    def totals(self, ts):
+        oldest = int(ts // self.width) - self.size
+        count, total = 0, 0.0
+        for slot in range(self.size):
+            if self.epochs[slot] > oldest:
+                count += self.counts[slot]
+                total += self.sums[slot]
+        return count, total
+
+
+class VelocityCounter:
+    """Sliding-window count, sum and distinct counterparties for one account or customer"""
+    __slots__ = ('rings', 'counterparties')
+
+    def __init__(self):
+        self.rings = {window: _Ring(span, size) for window, (span, size) in WINDOWS.items()}
+        self.counterparties = {}
+
+    def add(self, ts, amount, counterparty=None):
+        for ring in self.rings.values():
+            ring.add(ts, amount)
+        if counterparty:
+            self.counterparties.pop(counterparty, None)
+            self.counterparties[counterparty] = ts
+            if len(self.counterparties) > MAX_COUNTERPARTIES:
+                # Insertion order is last-seen order: drop the stalest entry
+                del self.counterparties[next(iter(self.counterparties))]
+
+    def stats(self, ts, amount=0.0, counterparty=None, uncommitted=()):
+        """Return {window: (count, sum, distinct counterparties)}, including a prospective posting
+
+        uncommitted holds (ts, amount, counterparty) debits of the current
+        transaction, not in the counters until it commits.
+        """
+        pending = 1 if amount else 0
+        result = {}
+        for window, ring in self.rings.items():
+            span = WINDOWS[window][0]
+            count, total = ring.totals(ts)
+            seen = {cp for cp, last in self.counterparties.items() if last > ts - span}
+            if counterparty:
+                seen.add(counterparty)
+            for debit_ts, debit_amount, debit_counterparty in uncommitted:
+                if debit_ts > ts - span:
+                    count += 1
+                    total += debit_amount
+                    if debit_counterparty:
+                        seen.add(debit_counterparty)
+            result[window] = (count + pending, total + amount, len(seen))
+        return result
+
+
+# Per-process counters: {dbname: {'lock': Lock, 'loaded_at': float, (scope, id): VelocityCounter}}.
+# Each worker process only adds its own committed debits; debits committed
+# by other workers are seen once the counters are rebuilt from the database.
+_COUNTERS = {}
+_COUNTERS_LOCK = threading.Lock()
+
+
+class BankScreeningRule(models.Model):
+    _name = 'bank.screening.rule'
+    _description = 'Bank Velocity Screening Rule'
+    _order = 'sequence, id'
+
+    name = fields.Char(string='Name', required=True)
+    sequence = fields.Integer(string='Sequence', default=10)
+    scope = fields.Selection([
+        ('account', 'Per Account'),
+        ('customer', 'Per Customer'),
+    ], string='Scope', required=True, default='account')
+    window = fields.Selection([
+        ('1m', '1 Minute'),
+        ('1h', '1 Hour'),
+        ('24h', '24 Hours'),
+    ], string='Window', required=True, default='1h')
+    metric = fields.Selection([
+        ('count', 'Number of Debits'),
+        ('amount', 'Total Debited'),
+        ('counterparties', 'Distinct Counterparties'),
+    ], string='Metric', required=True, default='count')
+    threshold = fields.Float(string='Threshold', required=True,
+                             help='The rule triggers when the metric, including the new debit, exceeds this value.')
+    risk_level = fields.Selection([
+        ('low', 'Low'),
+        ('medium', 'Medium'),
+        ('high', 'High')
+    ], string='Customer Risk Level', help='Only apply to customers with this risk level.')
+    rule_action = fields.Selection([
+        ('flag', 'Flag'),
+        ('hold', 'Hold for Review'),
+    ], string='Action', required=True, default='flag')
+    active = fields.Boolean(string='Active', default=True)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super(BankScreeningRule, self).create(vals_list)
+        self.env.registry.clear_cache()
+        return records
+
+    def write(self, vals):
+        result = super(BankScreeningRule, self).write(vals)
+        self.env.registry.clear_cache()
+        return result
+
+    def unlink(self):
+        result = super(BankScreeningRule, self).unlink()
+        self.env.registry.clear_cache()
+        return result
+
+    @tools.ormcache()
+    def _get_rule_table(self):
+        """Return the active rules as a tuple of plain tuples, cached per registry"""
+        metric_index = {'count': 0, 'amount': 1, 'counterparties': 2}
+        return tuple(
+            (rule['name'], rule['scope'], rule['window'], metric_index[rule['metric']],
+             rule['threshold'], rule['risk_level'], rule['rule_action'])
+            for rule in self.sudo().search_read([], [
+                'name', 'scope', 'window', 'metric', 'threshold', 'risk_level', 'rule_action',
+            ])
+        )
+
+
+class BankScreening(models.AbstractModel):
+    _name = 'bank.screening'
+    _description = 'Bank Pre-Posting Screening'
+
+    def _register_hook(self):
+        # A reloaded registry may follow data changes made by another process
+        _COUNTERS.pop(self.env.cr.dbname, None)
+        return super(BankScreening, self)._register_hook()
+
+    def _get_counters(self):
+        """Return this database's counters, rebuilt from the last 24h on first use
+
+        The counters are per worker process: debits posted through other
+        workers are only counted once this worker rebuilds its counters, on
+        its next registry load or when they are older than
+        odoo_bank.screening_counter_ttl seconds (0, the default, never
+        expires them). With several workers, limits are therefore enforced
+        per worker in between, and a customer spreading debits over N
+        workers can reach up to N times a threshold.
+        """
+        dbname = self.env.cr.dbname
+        store = _COUNTERS.get(dbname)
+        if store is not None and not self._counters_expired(store):
+            return store
+        with _COUNTERS_LOCK:
+            store = _COUNTERS.get(dbname)
+            if store is None or self._counters_expired(store):
+                store = _COUNTERS[dbname] = self._load_counters()
+        return store
+
+    def _counters_expired(self, store):
+        ttl = int(self.env['ir.config_parameter'].sudo().get_param('odoo_bank.screening_counter_ttl', 0))
+        return ttl > 0 and time.time() - store['loaded_at'] > ttl
+
+    def _load_counters(self):
+        store = {'lock': threading.Lock(), 'loaded_at': time.time()}
+        self.env.cr.execute("""
+            SELECT t.account_id, t.customer_id,
+                   EXTRACT(EPOCH FROM t.transaction_date), t.amount,
+                   coalesce(dest.account_number, tr.beneficiary_account, t.reference)
+              FROM bank_transaction t
+              LEFT JOIN bank_transfer tr ON tr.id = t.transfer_id
+              LEFT JOIN bank_account dest ON dest.id = tr.to_account_id
+             WHERE t.status = 'completed'
+               AND t.transaction_type = ANY(%s)
+               AND t.transaction_date >= (now() at time zone 'UTC') - interval '24 hours'
+             ORDER BY t.transaction_date
+        """, [list(DEBIT_TYPES)])
+        rows = self.env.cr.fetchall()
+        for account_id, customer_id, ts, amount, counterparty in rows:
+            self._add_to_counters(store, account_id, customer_id, float(ts), float(amount), counterparty)
+        _logger.info('Screening counters rebuilt from %s debits', len(rows))
+        return store
+
+    @api.model
+    def _add_to_counters(self, store, account_id, customer_id, ts, amount, counterparty):
+        for key in (('account', account_id), ('customer', customer_id)):
+            counter = store.get(key)
+            if counter is None:
+                counter = store[key] = VelocityCounter()
+            counter.add(ts, amount, counterparty)
+
+    @api.model
+    def _screening_stages(self):
+        """Return the screening methods to run; extend to plug in more stages
+
+        Each stage is called with (account, amount, counterparty) and returns
+        a list of (action, reason) hits, action being 'flag' or 'hold'.
+        """
+        return ['_screen_velocity']
+
+    @api.model
+    def _screen(self, account, amount, counterparty=None):
+        """Screen a prospective debit and return ('clear'|'flag'|'hold', reasons)"""
+        hits = []
+        for stage in self._screening_stages():
+            hits.extend(getattr(self, stage)(account, amount, counterparty))
+        if not hits:
+            return 'clear', ''
+        verdict = 'hold' if any(action == 'hold' for action, _reason in hits) else 'flag'
+        return verdict, '; '.join(reason for _action, reason in hits)
+
+    @api.model
+    def _screen_velocity(self, account, amount, counterparty=None):
+        rules = self.env['bank.screening.rule']._get_rule_table()
+        if not rules:
+            return []
+        store = self._get_counters()
+        pending = self.env.cr.postcommit.data.get('odoo_bank.screening', ())
+        now = time.time()
+        risk_level = account.customer_id.risk_level
+        subjects = {'account': account.id, 'customer': account.customer_id.id}
+        stats = {}
+        hits = []
+        for name, scope, window, metric, threshold, rule_risk, action in rules:
+            if rule_risk and rule_risk != risk_level:
+                continue
+            if scope not in stats:
+                counter = store.get((scope, subjects[scope])) or VelocityCounter()
+                uncommitted = [(ts, debit_amount, debit_counterparty)
+                               for account_id, customer_id, ts, debit_amount, debit_counterparty in pending
+                               if (account_id if scope == 'account' else customer_id) == subjects[scope]]
+                stats[scope] = counter.stats(now, amount, counterparty, uncommitted)
+            value = stats[scope][window][metric]
+            if value > threshold:
+                hits.append((action, f'{name} ({value:g} > {threshold:g})'))
+        return hits
+
+    @api.model
+    def _record(self, account, amount, counterparty=None):
+        """Add a completed debit to the counters once the transaction commits
+
+        Until then the debit only counts for the screenings of the same
+        transaction, and a rollback discards it.
+        """
+        data = self.env.cr.postcommit.data
+        if 'odoo_bank.screening' not in data:
+            data['odoo_bank.screening'] = []
+            self.env.cr.postcommit.add(self._commit_debits)
+        data['odoo_bank.screening'].append(
+            (account.id, account.customer_id.id, time.time(), amount, counterparty))
+
+    @api.model
+    def _commit_debits(self):
+        """Add the debits recorded by the committed transaction to the counters
+
+        Counters reloaded after the commit, e.g. by this very call when they
+        expired, already hold its debits: their loaded_at is the watermark.
+        """
+        debits = self.env.cr.postcommit.data.pop('odoo_bank.screening', None)
+        if not debits:
+            return
+        committed_at = time.time()
+        store = self._get_counters()
+        if store['loaded_at'] >= committed_at:
+            return
+        with store['lock']:
+            for account_id, customer_id, ts, amount, counterparty in debits:
+                self._add_to_counters(store, account_id, customer_id, ts, amount, counterparty)
@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime, time, timedelta
+
+from dateutil.rrule import rrule, DAILY, WEEKLY, MONTHLY, YEARLY
+
+from odoo import models, fields, api
+from odoo.exceptions import AccessError, ValidationError
+from odoo.tools.sql import create_index
+
+from .bank_transfer import AUTO_APPROVE_LIMIT
+
+RRULE_FREQUENCIES = {'daily': DAILY, 'weekly': WEEKLY, 'monthly': MONTHLY, 'yearly': YEARLY}
+
+# Fields defining what an authorized order pays: changing them needs a new authorization
+PAYMENT_FIELDS = {'from_account_id', 'to_account_id', 'amount', 'currency_id'}
+# Fields only the order's own actions and the executor may set
+EXECUTION_FIELDS = {'status', 'approved_by', 'next_run_at', 'scheduled_at', 'last_run_at',
+                    'run_count', 'failure_count', 'last_error', 'pending_transfer_id'}
+
+
+class BankStandingOrder(models.Model):
+    _name = 'bank.standing.order'
+    _description = 'Bank Standing Order'
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'bank.status.mixin']
+    _order = 'id desc'
+
+    name = fields.Char(string='Number', required=True, copy=False, readonly=True, default=lambda self: 'New')
+    from_account_id = fields.Many2one('bank.account', string='From Account', required=True,
+                                      ondelete='restrict', tracking=True)
+    customer_id = fields.Many2one(related='from_account_id.customer_id', string='Customer',
+                                  readonly=True, store=True)
+    to_account_id = fields.Many2one('bank.account', string='To Account', required=True,
+                                    ondelete='restrict', tracking=True)
+    amount = fields.Monetary(string='Amount', currency_field='currency_id', required=True, tracking=True)
+    currency_id = fields.Many2one('res.currency', string='Currency', required=True, readonly=True,
+                                  default=lambda self: self.env.company.currency_id)
+    description = fields.Char(string='Description')
+
+    # Schedule
+    frequency = fields.Selection([
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+        ('monthly', 'Monthly'),
+        ('yearly', 'Yearly'),
+    ], string='Frequency', required=True, default='monthly', tracking=True)
+    interval_number = fields.Integer(string='Every', required=True, default=1,
+                                     help='Number of periods between two executions.')
+    weekday = fields.Selection([
+        ('0', 'Monday'),
+        ('1', 'Tuesday'),
+        ('2', 'Wednesday'),
+        ('3', 'Thursday'),
+        ('4', 'Friday'),
+        ('5', 'Saturday'),
+        ('6', 'Sunday'),
+    ], string='Weekday', default='0')
+    month_day = fields.Integer(string='Day of Month', default=1,
+                               help='Day of the month of monthly orders; the last day of shorter months is used.')
+    start_date = fields.Date(string='Start Date', required=True, default=fields.Date.today, tracking=True)
+    end_date = fields.Date(string='End Date', tracking=True)
+    max_runs = fields.Integer(string='Number of Payments', help='Leave empty for no limit.')
+    schedule_rule = fields.Char(string='Schedule Rule', compute='_compute_schedule_rule')
+
+    # Execution
+    status = fields.Selection([
+        ('draft', 'Draft'),
+        ('active', 'Active'),
+        ('suspended', 'Suspended'),
+        ('done', 'Done'),
+        ('cancelled', 'Cancelled'),
+    ], string='Status', default='draft', required=True, readonly=True, copy=False, tracking=True)
+    next_run_at = fields.Datetime(string='Next Run', readonly=True, copy=False)
+    scheduled_at = fields.Datetime(string='Occurrence', readonly=True, copy=False,
+                                   help='Occurrence being executed, kept while its execution is retried.')
+    last_run_at = fields.Datetime(string='Last Run', readonly=True, copy=False)
+    run_count = fields.Integer(string='Payments Made', readonly=True, copy=False)
+    approved_by = fields.Many2one('res.users', string='Authorized By', readonly=True, copy=False)
+    transfer_ids = fields.One2many('bank.transfer', 'standing_order_id', string='Transfers', readonly=True)
+    pending_transfer_id = fields.Many2one('bank.transfer', string='Awaiting Transfer', readonly=True, copy=False,
+                                          index='btree_not_null',
+                                          help='Transfer of the current occurrence waiting for approval; '
+                                               'the order is not run again until it completes or fails.')
+
+    # Failure handling
+    max_retries = fields.Integer(string='Retries', default=3,
+                                 help='Further attempts of a failed occurrence before the failure policy applies.')
+    retry_delay_hours = fields.Integer(string='Retry Delay (hours)', default=4,
+                                       help='Delay before the first retry, doubled for each further retry.')
+    failure_policy = fields.Selection([
+        ('skip', 'Skip the Occurrence'),
+        ('suspend', 'Suspend the Order'),
+    ], string='When Retries Are Exhausted', required=True, default='skip')
+    failure_count = fields.Integer(string='Failed Attempts', readonly=True, copy=False)
+    last_error = fields.Text(string='Last Error', readonly=True, copy=False)
+
+    _amount_positive = models.Constraint('CHECK(amount > 0)', 'Amount must be positive!')
+    _interval_positive = models.Constraint('CHECK(interval_number > 0)', 'The interval must be positive!')
+    _month_day_range = models.Constraint('CHECK(month_day BETWEEN 1 AND 31)',
+                                         'The day of month must be between 1 and 31!')
+    _retries_positive = models.Constraint('CHECK(max_retries >= 0 AND retry_delay_hours >= 0)',
+                                          'Retries and retry delay cannot be negative!')
+
+    def init(self):
+        # The executor only looks up active orders that are due
+        create_index(self.env.cr, 'bank_standing_order_due_idx', self._table,
+                     ['next_run_at'], where="status = 'active'")
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            self._check_protected_fields(vals)
+            if vals.get('from_account_id'):
+                self._check_source_account(vals['from_account_id'])
+            if vals.get('name', 'New') == 'New':
+                vals['name'] = self.env['ir.sequence'].next_by_code('bank.standing.order') or 'New'
+        return super(BankStandingOrder, self).create(vals_list)
+
+    def write(self, vals):
+        self._check_protected_fields(vals)
+        if PAYMENT_FIELDS & set(vals) and not self.env.su:
+            if self.filtered(lambda o: o.status not in ('draft', 'suspended')):
+                raise ValidationError('Suspend the standing order before changing its accounts or amount.')
+            if vals.get('from_account_id'):
+                self._check_source_account(vals['from_account_id'])
+            res = super(BankStandingOrder, self).write(vals)
+            # The new payment has to be authorized again
+            super(BankStandingOrder, self.sudo()).write({'status': 'draft', 'approved_by': False, 'next_run_at': False})
+            return res
+        return super(BankStandingOrder, self).write(vals)
+
+    @api.model
+    def _check_protected_fields(self, vals):
+        """Refuse execution fields from anyone but bank managers; actions write them as superuser"""
+        if self.env.su or not EXECUTION_FIELDS & set(vals):
+            return
+        if not self.env.user.has_group('odoo_bank.group_bank_manager'):
+            raise AccessError('Standing orders are activated, suspended and executed through their actions only.')
+
+    @api.model
+    def _check_source_account(self, account_id):
+        """Customers may only pay from their own accounts"""
+        if self.env.su or self.env.user.has_group('odoo_bank.group_bank_teller'):
+            return
+        account = self.env['bank.account'].sudo().browse(account_id)
+        if account.customer_id.user_id != self.env.user:
+            raise AccessError('You can only create standing orders on your own accounts.')
+
+    @api.depends('frequency', 'interval_number', 'weekday', 'month_day', 'start_date', 'end_date', 'max_runs')
+    def _compute_schedule_rule(self):
+        for record in self:
+            record.schedule_rule = str(record._get_rule()).split('\n')[-1] if record.start_date else False
+
+    @api.constrains('from_account_id', 'to_account_id', 'start_date', 'end_date')
+    def _check_order(self):
+        for record in self:
+            if record.from_account_id == record.to_account_id:
+                raise ValidationError('Source and destination accounts cannot be the same.')
+            if record.end_date and record.end_date < record.start_date:
+                raise ValidationError('The end date cannot be before the start date.')
+
+    def _get_rule(self):
+        """Return the dateutil rrule of the order's occurrences, at midnight UTC"""
+        self.ensure_one()
+        kwargs = {
+            'dtstart': datetime.combine(self.start_date, time.min),
+            'interval': self.interval_number or 1,
+        }
+        if self.frequency == 'weekly':
+            kwargs['byweekday'] = int(self.weekday or 0)
+        elif self.frequency == 'monthly':
+            # The earlier of month_day and the last day of the month
+            kwargs.update(bymonthday=(self.month_day or 1, -1), bysetpos=1)
+        if self.end_date:
+            kwargs['until'] = datetime.combine(self.end_date, time.max)
+        return rrule(RRULE_FREQUENCIES[self.frequency], **kwargs)
+
+    def _next_occurrence(self, after, inclusive=False):
+        """Return the first occurrence after the datetime after, or None once the order is over"""
+        self.ensure_one()
+        if self.max_runs and self.run_count >= self.max_runs:
+            return None
+        return self._get_rule().after(after, inc=inclusive)
+
+    def _prepare_transfer_vals(self):
+        self.ensure_one()
+        return {
+            'from_account_id': self.from_account_id.id,
+            'to_account_id': self.to_account_id.id,
+            'amount': self.amount,
+            'description': self.description or f'Standing order {self.name}',
+            'reference': self.name,
+            'standing_order_id': self.id,
+            'approved_by': self.approved_by.id,
+        }
+
+    def action_activate(self):
+        """Authorize the order and schedule its first occurrence from today"""
+        is_manager = self.env.user.has_group('odoo_bank.group_bank_manager')
+        today = datetime.combine(fields.Date.today(), time.min)
+        for record in self:
+            if record.amount >= AUTO_APPROVE_LIMIT and not is_manager:
+                raise ValidationError('Standing orders of this amount must be authorized by a bank manager.')
+            if record.pending_transfer_id:
+                raise ValidationError(f'{record.name} is waiting for transfer '
+                                      f'{record.pending_transfer_id.transfer_number} to be approved.')
+            record._claim_status(['draft', 'suspended'])
+            occurrence = record._next_occurrence(today, inclusive=True)
+            if not occurrence:
+                raise ValidationError(f'{record.name} has no occurrence left in its schedule.')
+            record.sudo().write({
+                'status': 'active',
+                'approved_by': self.env.uid,
+                'next_run_at': occurrence,
+                'scheduled_at': occurrence,
+                'failure_count': 0,
+                'last_error': False,
+            })
+
+    def action_suspend(self):
+        """Stop executing the order until it is activated again"""
+        self._claim_status(['active'])
+        self.sudo().write({'status': 'suspended', 'next_run_at': False})
+
+    def action_cancel(self):
+        """Cancel the order for good"""
+        self._claim_status(['draft', 'active', 'suspended'])
+        self.sudo().write({'status': 'cancelled', 'next_run_at': False})
+
+    def action_view_transfers(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': 'Transfers',
+            'res_model': 'bank.transfer',
+            'view_mode': 'list,form',
+            'domain': [('standing_order_id', '=', self.id)],
+        }
+
+    @api.model
+    def _job_execute_orders(self, first, last, params):
+        """Job chunk: execute the orders with ids in [first, last] due at the run date
+
+        The orders of the chunk are posted together through the bulk
+        internal transfer path. Orders whose transfer completed move to
+        their next occurrence, or are done, with one UPDATE. Orders whose
+        transfer awaits approval are parked until it completes or fails,
+        see _settle_pending_transfers. A failed order is retried after
+        retry_delay_hours, doubled at each attempt, up to max_retries times;
+        its failure policy then skips the occurrence or suspends it.
+        """
+        now = fields.Datetime.to_datetime(params['now'])
+        orders = self.search([
+            ('id', '>=', first),
+            ('id', '<=', last),
+            ('status', '=', 'active'),
+            ('next_run_at', '<=', now),
+        ], order='id')
+        if not orders:
+            return 0
+        results = self.env['bank.transfer']._transfer_internal_batch(
+            [order._prepare_transfer_vals() for order in orders])
+
+        executed, pending, failed = [], [], []
+        for order, result in zip(orders, results):
+            if 'error' in result:
+                failed.append((order, result['error']))
+            elif result['status'] == 'completed':
+                executed.append((order.id, order._following_occurrence()))
+            elif result['status'] in ('failed', 'cancelled'):
+                failed.append((order, f'Transfer {result["transfer_number"]} {result["status"]}.'))
+            else:
+                pending.append((order, result))
+        self._register_runs(executed, now)
+        for order, result in pending:
+            order.sudo().write({'pending_transfer_id': result['id'], 'next_run_at': False, 'last_run_at': now})
+            order.message_post(body=f'Payment {result["transfer_number"]} awaiting approval.')
+        for order, error in failed:
+            order._register_failure(error, now)
+        return len(orders)
+
+    def _following_occurrence(self):
+        """Return the occurrence after the one being executed, None once the schedule is exhausted"""
+        self.ensure_one()
+        if self.max_runs and self.run_count + 1 >= self.max_runs:
+            return None
+        return self._next_occurrence(self.scheduled_at)
+
+    @api.model
+    def _register_runs(self, executed, now):
+        """Count a payment on the orders and move them to their next occurrence, in one UPDATE
+
+        executed is a list of (order id, next occurrence or None). Orders
+        suspended or cancelled since their payment was made keep their
+        status and are not rescheduled.
+        """
+        if not executed:
+            return
+        self.flush_model()
+        self.env.cr.execute("""
+            UPDATE bank_standing_order o
+               SET next_run_at = CASE WHEN o.status = 'active' THEN e.occurrence END,
+                   scheduled_at = e.occurrence,
+                   status = CASE WHEN e.occurrence IS NULL AND o.status IN ('active', 'suspended')
+                                 THEN 'done' ELSE o.status END,
+                   last_run_at = %(now)s,
+                   run_count = o.run_count + 1,
+                   failure_count = 0,
+                   last_error = NULL,
+                   pending_transfer_id = NULL,
+                   write_uid = %(uid)s, write_date = %(now)s
+              FROM unnest(%(ids)s::int[], %(occurrences)s::timestamp[]) AS e(id, occurrence)
+             WHERE o.id = e.id
+        """, {
+            'ids': [order_id for order_id, _occurrence in executed],
+            'occurrences': [occurrence for _order_id, occurrence in executed],
+            'now': now,
+            'uid': self.env.uid,
+        })
+        self.invalidate_model()
+
+    @api.model
+    def _settle_pending_transfers(self, transfers):
+        """Resume the orders waiting for transfers that have completed, failed or been cancelled"""
+        orders = self.sudo().search([('pending_transfer_id', 'in', transfers.ids)])
+        if not orders:
+            return
+        now = fields.Datetime.now()
+        self._register_runs([(order.id, order._following_occurrence()) for order in orders
+                             if order.pending_transfer_id.status == 'completed'], now)
+        for order in orders.filtered(lambda o: o.pending_transfer_id):
+            transfer = order.pending_transfer_id
+            order.write({'pending_transfer_id': False})
+            error = f'Transfer {transfer.transfer_number} {transfer.status}.'
+            if order.status == 'active':
+                order._register_failure(error, now)
+            else:
+                order.message_post(body=f'Payment failed: {error}')
+
+    def _register_failure(self, error, now):
+        """Schedule a retry of the failed occurrence, or apply the failure policy"""
+        self.ensure_one()
+        failure_count = self.failure_count + 1
+        vals = {'failure_count': failure_count, 'last_error': error, 'last_run_at': now}
+        if failure_count <= self.max_retries:
+            vals['next_run_at'] = now + timedelta(hours=self.retry_delay_hours * 2 ** (failure_count - 1))
+            body = f'Payment failed, retry {failure_count}/{self.max_retries} scheduled: {error}'
+        elif self.failure_policy == 'suspend':
+            vals.update(status='suspended', next_run_at=False)
+            body = f'Payment failed {failure_count} times, order suspended: {error}'
+        else:
+            occurrence = self._next_occurrence(self.scheduled_at)
+            vals.update(next_run_at=occurrence, scheduled_at=occurrence, failure_count=0)
+            if not occurrence:
+                vals['status'] = 'done'
+            body = f'Payment failed {failure_count} times, occurrence skipped: {error}'
+        self.sudo().write(vals)
+        self.message_post(body=body)
+        if failure_count == 1 or failure_count > self.max_retries:
+            self.env['bank.notification']._notify('standing_order_failed', [
+                (self.customer_id, {'order': self.name, 'amount': self.amount, 'reason': error}),
+            ])
+
+    @api.model
+    def cron_execute_due(self, batch_size=1000):
+        """Cron job to execute the standing orders due, chunk by chunk
+
+        Chunks are claimed by the bank job workers, so duplicating the
+        worker action executes several chunks in parallel.
+        """
+        self.flush_model(['status', 'next_run_at'])
+        now = fields.Datetime.now()
+        self.env.cr.execute("""
+            SELECT id FROM bank_standing_order
+             WHERE status = 'active' AND next_run_at <= %s
+             ORDER BY id
+        """, [now])
+        due_ids = [row[0] for row in self.env.cr.fetchall()]
+        Job = self.env['bank.job.run']
+        Job._launch('standing_orders', 'Execute Standing Orders', self._name, '_job_execute_orders',
+                    Job._chunk_keys(due_ids, batch_size), {'now': fields.Datetime.to_string(now)})
+        return True
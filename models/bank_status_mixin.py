@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models
+from odoo.exceptions import ValidationError
+from odoo.tools import SQL
+
+
+class BankStatusMixin(models.AbstractModel):
+    _name = 'bank.status.mixin'
+    _description = 'Bank Status Transition Mixin'
+
+    def _claim_status(self, expected):
+        """Check atomically that self is still in one of the expected statuses, or raise
+
+        One conditional UPDATE ... WHERE status IN expected RETURNING id is
+        run on the rows of self, so two users acting on the same record
+        cannot both pass the check: the second statement waits for the
+        first transaction, then either matches no row or fails to serialize
+        and is retried by the server, in both cases without a second
+        transition. The caller then writes the new status through the ORM,
+        which keeps tracking and live updates.
+        """
+        if not self:
+            return self
+        self.flush_recordset(['status'])
+        self.env.cr.execute(SQL("""
+            UPDATE %s
+               SET write_uid = %s, write_date = now() at time zone 'UTC'
+             WHERE id = ANY(%s) AND status = ANY(%s)
+         RETURNING id
+        """, SQL.identifier(self._table), self.env.uid, self.ids, list(expected)))
+        claimed = {row[0] for row in self.env.cr.fetchall()}
+        self.invalidate_recordset(['status', 'write_uid', 'write_date'])
+        stale = self.filtered(lambda r: r.id not in claimed)
+        if stale:
+            raise ValidationError(
+                f'{", ".join(stale.mapped("display_name"))} changed status meanwhile '
+                f'({", ".join(sorted(set(stale.mapped("status"))))}); please reload and try again.')
+        return self
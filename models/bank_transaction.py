@@ -2,21 +2,29 @@
 
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError
+from odoo.tools.sql import create_index
+
+from .bank_journal import TRANSACTION_COUNTERPARTS
+
+# Transaction types that increase / decrease the account balance
+CREDIT_TYPES = ('deposit', 'transfer_in', 'interest', 'loan_disbursement')
+DEBIT_TYPES = ('withdrawal', 'transfer_out', 'fee', 'loan_repayment')
 
 
 class BankTransaction(models.Model):
     _name = 'bank.transaction'
     _description = 'Bank Transaction'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'bank.posting.mixin']
     _order = 'transaction_date desc, id desc'
     _rec_name = 'transaction_number'
+    _bank_audit_action = 'transaction'
 
     # Transaction Information
     transaction_number = fields.Char(string='Transaction Number', required=True, 
                                     copy=False, readonly=True, 
                                     default=lambda self: 'New')
     transaction_date = fields.Datetime(string='Transaction Date', required=True, 
-                                      default=fields.Datetime.now, tracking=True)
+                                      default=fields.Datetime.now, tracking=True, index=True)
     
     # Account
     account_id = fields.Many2one('bank.account', string='Account', 
@@ -41,12 +49,16 @@ class BankTransaction(models.Model):
     currency_id = fields.Many2one('res.currency', string='Currency', 
                                  required=True, 
                                  default=lambda self: self.env.company.currency_id)
+    account_amount = fields.Monetary(string='Account Amount', currency_field='account_currency_id',
+                                     readonly=True, copy=False,
+                                     help='Amount posted to the account, in the account currency.')
+    account_currency_id = fields.Many2one(related='account_id.currency_id', string='Account Currency')
     
     # Balance
     balance_before = fields.Monetary(string='Balance Before', 
-                                    currency_field='currency_id', readonly=True)
+                                    currency_field='account_currency_id', readonly=True)
     balance_after = fields.Monetary(string='Balance After', 
-                                   currency_field='currency_id', readonly=True)
+                                   currency_field='account_currency_id', readonly=True)
     
     # Description
     description = fields.Text(string='Description')
@@ -65,22 +77,51 @@ class BankTransaction(models.Model):
         ('cancelled', 'Cancelled')
     ], string='Status', default='draft', tracking=True)
     
+    # Screening
+    screening_status = fields.Selection([
+        ('clear', 'Clear'),
+        ('flagged', 'Flagged'),
+        ('held', 'Held'),
+        ('released', 'Released'),
+    ], string='Screening', default='clear', readonly=True, copy=False)
+    screening_reason = fields.Text(string='Screening Reason', readonly=True, copy=False)
+    
     # Reconciliation
     is_reconciled = fields.Boolean(string='Reconciled', default=False)
     reconciliation_date = fields.Date(string='Reconciliation Date')
+    reconciliation_id = fields.Many2one('bank.reconciliation', string='Reconciliation',
+                                        readonly=True, index='btree_not_null')
+    
+    # Ledger
+    journal_entry_id = fields.Many2one('bank.journal.entry', string='Journal Entry',
+                                       readonly=True, copy=False, index='btree_not_null')
     
     _sql_constraints = [
         ('amount_positive', 'CHECK(amount > 0)', 'Amount must be positive!'),
     ]
     
+    def init(self):
+        # Candidate lookups of the reconciliation engine only scan open items
+        create_index(self.env.cr, 'bank_transaction_unreconciled_reference_idx', self._table,
+                     ['reference'], where="status = 'completed' AND NOT is_reconciled")
+        create_index(self.env.cr, 'bank_transaction_unreconciled_amount_idx', self._table,
+                     ['amount', 'transaction_date'], where="status = 'completed' AND NOT is_reconciled")
+        # Per-account history in posting order, streamed by the balance consistency check
+        create_index(self.env.cr, 'bank_transaction_account_history_idx', self._table,
+                     ['account_id', 'transaction_date', 'id'], where="status = 'completed'")
+        # Latest transactions of a customer, read by get_customer_summary (also serves customer_id lookups)
+        create_index(self.env.cr, 'bank_transaction_customer_history_idx', self._table,
+                     ['customer_id', 'transaction_date DESC', 'id DESC'])
+    
     @api.model_create_multi
     def create(self, vals_list):
+        self = self._posting_env()
         for vals in vals_list:
             if vals.get('transaction_number', 'New') == 'New':
                 vals['transaction_number'] = self.env['ir.sequence'].next_by_code('bank.transaction') or 'New'
             
             # Get account and store balance before
-            if vals.get('account_id'):
+            if vals.get('account_id') and 'balance_before' not in vals:
                 account = self.env['bank.account'].browse(vals.get('account_id'))
                 vals['balance_before'] = account.balance
         
@@ -95,28 +136,93 @@ class BankTransaction(models.Model):
     
     def action_complete(self):
         """Complete transaction and update account balance"""
-        for record in self:
+        screening = self.env['bank.screening']
+        skip_screening = self.env.context.get('bank_skip_screening')
+        journal_entry_id = self.env.context.get('bank_journal_entry_id')
+        Journal = self.env['bank.journal.entry']
+        Rate = self.env['bank.exchange.rate']
+        company_currency = self.env.company.currency_id
+        alerts = []
+        completed_ids = []
+        for record in self._posting_env():
             if record.status == 'completed':
                 continue
             
-            # Update account balance
-            if record.transaction_type in ['deposit', 'transfer_in', 'interest', 'loan_disbursement']:
-                record.account_id.update_balance(record.amount, 'credit')
-            elif record.transaction_type in ['withdrawal', 'transfer_out', 'fee', 'loan_repayment']:
-                record.account_id.update_balance(record.amount, 'debit')
+            # Pre-posting screening of debits
+            is_debit = record.transaction_type in DEBIT_TYPES
+            counterparty = is_debit and record._get_counterparty()
+            if is_debit and not skip_screening:
+                if record.screening_status == 'held':
+                    continue
+                verdict, reason = screening._screen(record.account_id, record.amount, counterparty)
+                if verdict == 'hold':
+                    record.write({
+                        'status': 'pending',
+                        'screening_status': 'held',
+                        'screening_reason': reason,
+                    })
+                    continue
+                if verdict == 'flag':
+                    record.write({'screening_status': 'flagged', 'screening_reason': reason})
             
-            # Update balance after
-            record.balance_after = record.account_id.balance
-            record.status = 'completed'
+            # Post to the journal, which updates the account balance; legs of
+            # a transfer are linked to the entry already posted for it
+            if journal_entry_id:
+                record.write({'journal_entry_id': journal_entry_id, 'status': 'completed'})
+            else:
+                # Converted at the cached rates of the transaction date, unless
+                # the account amount is already known (reversals)
+                signed = -record.amount if is_debit else record.amount
+                if record.account_amount:
+                    account_signed = -record.account_amount if is_debit else record.account_amount
+                else:
+                    account_signed = Rate._convert(signed, record.currency_id, record.account_currency_id,
+                                                   record.transaction_date)
+                company_signed = Rate._convert(signed, record.currency_id, company_currency,
+                                               record.transaction_date)
+                entry = Journal._post([
+                    (TRANSACTION_COUNTERPARTS[record.transaction_type], False, company_signed, False),
+                    ('customer_deposits', record.account_id.id, -company_signed, -account_signed),
+                ], record.transaction_number, record.description)
+                record.write({
+                    'journal_entry_id': entry.id,
+                    'account_amount': abs(account_signed),
+                    'balance_after': record.account_id.balance,
+                    'status': 'completed',
+                })
+            completed_ids.append(record.id)
+            if is_debit:
+                screening._record(record.account_id, record.amount, counterparty)
             
             # Send notification for significant transactions
             if record.amount >= 10000:
-                self.env['bank.notification'].create({
-                    'customer_id': record.customer_id.id,
-                    'notification_type': 'sms',
-                    'subject': 'Transaction Alert',
-                    'message': f'{record.transaction_type}: {record.amount} on account {record.account_id.account_number}',
-                })
+                alerts.append((record.customer_id, {
+                    'transaction_type': record.transaction_type,
+                    'amount': record.amount,
+                    'account_number': record.account_id.account_number,
+                }))
+        if completed_ids:
+            self.env['bank.event']._publish_transactions(completed_ids)
+        if alerts:
+            self.env['bank.notification']._notify('transaction_alert', alerts)
+    
+    def _get_counterparty(self):
+        """Return the counterparty identifier used by velocity screening"""
+        self.ensure_one()
+        transfer = self.transfer_id
+        return (transfer.to_account_id.account_number or transfer.beneficiary_account
+                or self.reference or False)
+    
+    def action_release_screening(self):
+        """Release transactions held by screening and complete them"""
+        held = self.filtered(lambda t: t.screening_status == 'held')
+        held.write({'screening_status': 'released'})
+        for record in held:
+            self.env['bank.audit.log'].log_action(
+                'approve', self._name, record.id,
+                f'Screening hold released on {record.transaction_number}: {record.screening_reason}',
+                severity='warning')
+        held.with_context(bank_skip_screening=True).action_complete()
     
     def action_cancel(self):
         """Cancel transaction"""
@@ -141,10 +247,13 @@ class BankTransaction(models.Model):
             'fee': 'deposit',
         }
         
-        reversal = self.create({
+        reversal = self.with_context(bank_skip_screening=True).create({
             'account_id': self.account_id.id,
             'transaction_type': reversal_type_map.get(self.transaction_type, 'fee'),
             'amount': self.amount,
+            'currency_id': self.currency_id.id,
+            # Undo exactly what was posted to the account, whatever the rate today
+            'account_amount': self.account_amount,
             'description': f'Reversal of {self.transaction_number}',
             'reference': self.transaction_number,
             'status': 'pending',
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+
+from dateutil.relativedelta import relativedelta
+
+from odoo import models, fields, api
+
+# Columns moved from bank_transaction to the archive, in table order
+ARCHIVE_COLUMNS = (
+    'id', 'transaction_number', 'transaction_date', 'account_id', 'customer_id',
+    'transaction_type', 'amount', 'currency_id', 'balance_before', 'balance_after',
+    'description', 'reference', 'transfer_id', 'loan_id', 'status', 'is_reconciled',
+    'reconciliation_date', 'reconciliation_id', 'account_amount', 'journal_entry_id',
+    'screening_status', 'screening_reason', 'create_uid', 'create_date', 'write_uid', 'write_date',
+)
+# Only transactions in a final status leave the hot table
+ARCHIVE_STATUSES = ('completed', 'failed', 'cancelled')
+
+
+class BankTransactionArchive(models.Model):
+    _name = 'bank.transaction.archive'
+    _description = 'Archived Bank Transaction'
+    _auto = False
+    _log_access = False
+    _order = 'transaction_date desc, id desc'
+    _rec_name = 'transaction_number'
+
+    transaction_number = fields.Char(string='Transaction Number', readonly=True)
+    transaction_date = fields.Datetime(string='Transaction Date', readonly=True)
+    account_id = fields.Many2one('bank.account', string='Account', readonly=True)
+    customer_id = fields.Many2one('bank.customer', string='Customer', readonly=True)
+    transaction_type = fields.Selection(
+        lambda self: self.env['bank.transaction']._fields['transaction_type'].selection,
+        string='Transaction Type', readonly=True)
+    amount = fields.Monetary(string='Amount', currency_field='currency_id', readonly=True)
+    currency_id = fields.Many2one('res.currency', string='Currency', readonly=True)
+    account_amount = fields.Monetary(string='Account Amount', currency_field='account_currency_id',
+                                     readonly=True)
+    account_currency_id = fields.Many2one(related='account_id.currency_id', string='Account Currency')
+    balance_before = fields.Monetary(string='Balance Before', currency_field='account_currency_id',
+                                     readonly=True)
+    balance_after = fields.Monetary(string='Balance After', currency_field='account_currency_id',
+                                    readonly=True)
+    description = fields.Text(string='Description', readonly=True)
+    reference = fields.Char(string='Reference', readonly=True)
+    transfer_id = fields.Many2one('bank.transfer', string='Related Transfer', readonly=True)
+    loan_id = fields.Many2one('bank.loan', string='Related Loan', readonly=True)
+    status = fields.Selection(
+        lambda self: self.env['bank.transaction']._fields['status'].selection,
+        string='Status', readonly=True)
+    is_reconciled = fields.Boolean(string='Reconciled', readonly=True)
+    reconciliation_date = fields.Date(string='Reconciliation Date', readonly=True)
+    reconciliation_id = fields.Many2one('bank.reconciliation', string='Reconciliation', readonly=True)
+    journal_entry_id = fields.Many2one('bank.journal.entry', string='Journal Entry', readonly=True)
+    screening_status = fields.Selection(
+        lambda self: self.env['bank.transaction']._fields['screening_status'].selection,
+        string='Screening', readonly=True)
+    screening_reason = fields.Text(string='Screening Reason', readonly=True)
+    create_uid = fields.Many2one('res.users', string='Created by', readonly=True)
+    create_date = fields.Datetime(string='Created on', readonly=True)
+    write_uid = fields.Many2one('res.users', string='Last Updated by', readonly=True)
+    write_date = fields.Datetime(string='Last Updated on', readonly=True)
+    archived_date = fields.Datetime(string='Archived On', readonly=True)
+
+    def init(self):
+        # Range-partitioned by month: date-bounded queries only scan the matching partitions
+        self.env.cr.execute("""
+            CREATE TABLE IF NOT EXISTS bank_transaction_archive (
+                id integer NOT NULL,
+                transaction_number varchar,
+                transaction_date timestamp NOT NULL,
+                account_id integer NOT NULL,
+                customer_id integer,
+                transaction_type varchar,
+                amount numeric,
+                currency_id integer,
+                balance_before numeric,
+                balance_after numeric,
+                description text,
+                reference varchar,
+                transfer_id integer,
+                loan_id integer,
+                status varchar,
+                is_reconciled boolean,
+                reconciliation_date date,
+                reconciliation_id integer,
+                account_amount numeric,
+                journal_entry_id integer,
+                screening_status varchar,
+                screening_reason text,
+                create_uid integer,
+                create_date timestamp,
+                write_uid integer,
+                write_date timestamp,
+                archived_date timestamp NOT NULL DEFAULT (now() at time zone 'UTC'),
+                PRIMARY KEY (id, transaction_date)
+            ) PARTITION BY RANGE (transaction_date)
+        """)
+        self.env.cr.execute("""
+            ALTER TABLE bank_transaction_archive
+                ADD COLUMN IF NOT EXISTS account_amount numeric,
+                ADD COLUMN IF NOT EXISTS journal_entry_id integer,
+                ADD COLUMN IF NOT EXISTS screening_status varchar,
+                ADD COLUMN IF NOT EXISTS screening_reason text,
+                ADD COLUMN IF NOT EXISTS create_uid integer,
+                ADD COLUMN IF NOT EXISTS create_date timestamp,
+                ADD COLUMN IF NOT EXISTS write_uid integer,
+                ADD COLUMN IF NOT EXISTS write_date timestamp
+        """)
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS bank_transaction_archive_account_date_idx
+                ON bank_transaction_archive (account_id, transaction_date);
+            CREATE INDEX IF NOT EXISTS bank_transaction_archive_number_idx
+                ON bank_transaction_archive (transaction_number);
+        """)
+
+    @api.model
+    def _hot_cutoff(self):
+        """Return the first day of the oldest month kept in bank_transaction"""
+        months = int(self.env['ir.config_parameter'].sudo().get_param(
+            'odoo_bank.transaction_hot_months', 12))
+        return fields.Date.today().replace(day=1) - relativedelta(months=months)
+
+    @api.model
+    def _ensure_partitions(self, date_from, date_to):
+        """Create the monthly partitions covering [date_from, date_to)"""
+        month = date_from.replace(day=1)
+        while month < date_to:
+            next_month = month + relativedelta(months=1)
+            self.env.cr.execute(f"""
+                CREATE TABLE IF NOT EXISTS bank_transaction_archive_y{month:%Y}m{month:%m}
+                    PARTITION OF bank_transaction_archive
+                    FOR VALUES FROM (%s) TO (%s)
+            """, [month, next_month])
+            month = next_month
+
+    @api.model
+    def _job_archive_range(self, id_from, id_to, params):
+        """Job chunk: move the transactions with ids in [id_from, id_to] older than the cutoff
+
+        Rows are locked with SKIP LOCKED so postings are never blocked; a row
+        skipped that way is picked up by the next run. Loan transactions stay
+        hot: loan repayment totals are computed from them. Transfers keep the
+        numbers of their legs, their links to the moved rows are cleared.
+        """
+        self.env['bank.transaction'].flush_model()
+        self.env['bank.transfer'].flush_model(['debit_transaction_number', 'credit_transaction_number'])
+        bounds = {'id_from': id_from, 'id_to': id_to}
+        for leg in ('debit', 'credit'):
+            # Transfers posted before the numbers were stored
+            self.env.cr.execute(f"""
+                UPDATE bank_transfer t
+                   SET {leg}_transaction_number = tx.transaction_number
+                  FROM bank_transaction tx
+                 WHERE t.{leg}_transaction_id = tx.id
+                   AND t.{leg}_transaction_number IS NULL
+                   AND tx.id BETWEEN %(id_from)s AND %(id_to)s
+            """, bounds)
+        columns = ', '.join(ARCHIVE_COLUMNS)
+        self.env.cr.execute(f"""
+            WITH moved AS (
+                DELETE FROM bank_transaction
+                 WHERE id IN (
+                        SELECT id
+                          FROM bank_transaction
+                         WHERE id BETWEEN %(id_from)s AND %(id_to)s
+                           AND transaction_date < %(cutoff)s
+                           AND status = ANY(%(statuses)s)
+                           AND loan_id IS NULL
+                           FOR UPDATE SKIP LOCKED
+                       )
+                RETURNING {columns}
+            )
+            INSERT INTO bank_transaction_archive ({columns})
+            SELECT {columns} FROM moved
+        """, {
+            'id_from': id_from,
+            'id_to': id_to,
+            'cutoff': params['cutoff'],
+            'statuses': list(ARCHIVE_STATUSES),
+        })
+        moved = self.env.cr.rowcount
+        self.env['bank.transaction'].invalidate_model()
+        self.env['bank.transfer'].invalidate_model(['debit_transaction_id', 'credit_transaction_id',
+                                                    'debit_transaction_number', 'credit_transaction_number'])
+        return moved
+
+    @api.model
+    def cron_archive_transactions(self, batch_size=10000):
+        """Cron job to move transactions older than the hot window to the archive, chunk by chunk
+
+        Runs as a bank job over id ranges: each chunk is committed on its own,
+        so the migration runs online and an interrupted run resumes.
+        """
+        self.env['bank.transaction'].flush_model()
+        cutoff = self._hot_cutoff()
+        self.env.cr.execute("""
+            SELECT min(transaction_date)::date, min(id), max(id)
+              FROM bank_transaction
+             WHERE transaction_date < %s AND status = ANY(%s) AND loan_id IS NULL
+        """, [cutoff, list(ARCHIVE_STATUSES)])
+        oldest, low, high = self.env.cr.fetchone()
+        if oldest:
+            self._ensure_partitions(oldest, cutoff)
+        Job = self.env['bank.job.run']
+        Job._launch('transaction_archive', 'Archive Old Transactions', self._name, '_job_archive_range',
+                    Job._chunk_range(low, high, batch_size) if oldest else [],
+                    {'cutoff': fields.Date.to_string(cutoff)})
+        return True
+
+    @api.model
+    def action_archive_now(self):
+        """Run the archiving cron as soon as possible"""
+        self.env.ref('odoo_bank.cron_archive_transactions')._trigger()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'message': 'Archiving of old transactions has been scheduled.',
+                'type': 'info',
+            },
+        }
+
+    @api.model
+    def read_history(self, account_ids, date_from=None, date_to=None, limit=None):
+        """Return transactions of accounts from the hot table and the archive, newest first
+
+        With date bounds, PostgreSQL only scans the archive partitions of the
+        requested months, and skips the archive entirely for recent ranges.
+        Each row is a dict with the ARCHIVE_COLUMNS keys plus 'archived'.
+        """
+        self.env['bank.transaction'].flush_model()
+        columns = ', '.join(ARCHIVE_COLUMNS)
+        conditions = ['account_id = ANY(%(account_ids)s)']
+        if date_from:
+            conditions.append('transaction_date >= %(date_from)s')
+        if date_to:
+            conditions.append('transaction_date <= %(date_to)s')
+        where = ' AND '.join(conditions)
+        self.env.cr.execute(f"""
+            SELECT * FROM (
+                SELECT {columns}, FALSE AS archived FROM bank_transaction WHERE {where}
+                UNION ALL
+                SELECT {columns}, TRUE AS archived FROM bank_transaction_archive WHERE {where}
+            ) history
+            ORDER BY transaction_date DESC, id DESC
+            LIMIT %(limit)s
+        """, {
+            'account_ids': list(account_ids),
+            'date_from': date_from,
+            'date_to': date_to,
+            'limit': limit,
+        })
+        return self.env.cr.dictfetchall()
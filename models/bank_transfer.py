@@ -1,15 +1,21 @@
 # -*- coding: utf-8 -*-
 
+from collections import defaultdict
+
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError
 
+# Transfers below this amount are approved without a manager
+AUTO_APPROVE_LIMIT = 100000
+
 
 class BankTransfer(models.Model):
     _name = 'bank.transfer'
     _description = 'Bank Transfer'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'bank.posting.mixin', 'bank.status.mixin']
     _order = 'transfer_date desc, id desc'
     _rec_name = 'transfer_number'
+    _bank_audit_action = 'transfer'
 
     # Transfer Information
     transfer_number = fields.Char(string='Transfer Number', required=True, 
@@ -77,8 +83,26 @@ class BankTransfer(models.Model):
     rejection_reason = fields.Text(string='Rejection Reason')
     
     # Related Transactions
-    debit_transaction_id = fields.Many2one('bank.transaction', string='Debit Transaction', readonly=True)
-    credit_transaction_id = fields.Many2one('bank.transaction', string='Credit Transaction', readonly=True)
+    debit_transaction_id = fields.Many2one('bank.transaction', string='Debit Transaction', readonly=True,
+                                           index='btree_not_null')
+    credit_transaction_id = fields.Many2one('bank.transaction', string='Credit Transaction', readonly=True,
+                                            index='btree_not_null')
+    # Kept when the legs are moved to the transaction archive
+    debit_transaction_number = fields.Char(string='Debit Transaction Number', readonly=True, copy=False)
+    credit_transaction_number = fields.Char(string='Credit Transaction Number', readonly=True, copy=False)
+    
+    # Screening
+    screening_status = fields.Selection([
+        ('clear', 'Clear'),
+        ('flagged', 'Flagged'),
+        ('held', 'Held'),
+        ('released', 'Released'),
+    ], string='Screening', default='clear', readonly=True, copy=False)
+    screening_reason = fields.Text(string='Screening Reason', readonly=True, copy=False)
+    
+    # Standing Order
+    standing_order_id = fields.Many2one('bank.standing.order', string='Standing Order', readonly=True,
+                                        index='btree_not_null')
     
     # External Gateway (Placeholder)
     gateway_reference = fields.Char(string='Gateway Reference', readonly=True)
@@ -93,20 +117,31 @@ class BankTransfer(models.Model):
         for vals in vals_list:
             if vals.get('transfer_number', 'New') == 'New':
                 vals['transfer_number'] = self.env['ir.sequence'].next_by_code('bank.transfer') or 'New'
-        return super(BankTransfer, self).create(vals_list)
+        records = super(BankTransfer, self).create(vals_list)
+        self.env['bank.account']._add_recent_accounts((records.to_account_id | records.from_account_id).ids)
+        return records
     
-    @api.depends('transfer_type', 'amount')
+    def write(self, vals):
+        if 'status' in vals:
+            self.env['bank.event']._publish_transfer_status(
+                self.filtered(lambda t: t.status != vals['status']), vals['status'])
+        res = super(BankTransfer, self).write(vals)
+        if vals.get('status') in ('completed', 'failed', 'cancelled'):
+            standing = self.filtered('standing_order_id')
+            if standing:
+                self.env['bank.standing.order']._settle_pending_transfers(standing)
+        return res
+    
+    @api.depends('transfer_type', 'amount', 'currency_id', 'from_account_id')
     def _compute_fee(self):
-        """Calculate transfer fee based on type"""
-        for record in self:
-            if record.transfer_type == 'internal':
-                record.fee = 0.0
-            elif record.transfer_type in ['rtgs', 'neft']:
-                record.fee = 25.0 if record.amount < 200000 else 50.0
-            elif record.transfer_type == 'imps':
-                record.fee = 5.0
-            else:
-                record.fee = 10.0
+        """Calculate transfer fee from the fee rule tariff of the transfer currency"""
+        fees = self.env['bank.fee.rule']._compute_fees([
+            (record.transfer_type, record.amount, record.from_account_id.customer_id.segment,
+             record.currency_id.id)
+            for record in self
+        ])
+        for record, fee in zip(self, fees):
+            record.fee = fee
     
     @api.depends('amount', 'fee')
     def _compute_total_amount(self):
@@ -124,12 +159,14 @@ class BankTransfer(models.Model):
     
     def action_submit(self):
         """Submit transfer for approval"""
-        for record in self:
+        for record in self._posting_env():
             # Validate
             if record.from_account_id.status != 'active':
                 raise ValidationError('Source account is not active.')
             
-            if record.from_account_id.available_balance < record.total_amount:
+            total_in_account_currency = self.env['bank.exchange.rate']._convert(
+                record.total_amount, record.currency_id, record.from_account_id.currency_id)
+            if record.from_account_id.available_balance < total_in_account_currency:
                 raise ValidationError('Insufficient balance in source account.')
             
             # Check daily limit
@@ -143,22 +180,35 @@ class BankTransfer(models.Model):
             if total_today + record.amount > record.from_account_id.daily_transfer_limit:
                 raise ValidationError('Daily transfer limit exceeded.')
             
+            # Velocity screening
+            verdict, reason = self.env['bank.screening']._screen(
+                record.from_account_id, record.total_amount, record._get_counterparty())
+            if verdict != 'clear':
+                record.write({
+                    'screening_status': 'held' if verdict == 'hold' else 'flagged',
+                    'screening_reason': reason,
+                })
+            
             # Auto-approve small amounts, otherwise pending
-            if record.amount < 100000:
+            if record.amount < AUTO_APPROVE_LIMIT and verdict != 'hold':
                 record.action_approve()
             else:
                 record.status = 'pending'
-                record.message_post(body='Transfer submitted for approval')
+                if verdict == 'hold':
+                    record._log_posting(f'Transfer held for review by screening: {reason}')
+                else:
+                    record._log_posting('Transfer submitted for approval')
     
     def action_approve(self):
         """Approve transfer"""
-        for record in self:
+        for record in self._posting_env():
+            record._claim_status(['draft', 'pending'])
             record.write({
                 'status': 'approved',
                 'approved_by': self.env.user.id,
                 'approved_date': fields.Datetime.now()
             })
-            record.message_post(body='Transfer approved')
+            record._log_posting('Transfer approved')
             # Process immediately
             record.action_process()
     
@@ -170,39 +220,76 @@ class BankTransfer(models.Model):
     
     def action_process(self):
         """Process the transfer"""
-        for record in self:
+        for record in self._posting_env():
             if record.status != 'approved':
                 raise ValidationError('Only approved transfers can be processed.')
+            record._claim_status(['approved'])
             
             record.status = 'processing'
             
             try:
-                # Create debit transaction
-                debit_txn = self.env['bank.transaction'].create({
-                    'account_id': record.from_account_id.id,
+                # Post both sides and the fee as one balanced journal entry
+                # before creating the transaction legs, so the accounts never
+                # see half a transfer. Each account line carries the amount in
+                # the account currency; the entry balances in the company
+                # currency, the fee taking the conversion rounding.
+                Rate = self.env['bank.exchange.rate']
+                company_currency = self.env.company.currency_id
+                from_account = record.from_account_id
+                to_account = record.to_account_id
+                is_internal = record.transfer_type == 'internal' and to_account
+                total_company = Rate._convert(record.total_amount, record.currency_id, company_currency)
+                amount_company = Rate._convert(record.amount, record.currency_id, company_currency)
+                from_amount = Rate._convert(record.total_amount, record.currency_id, from_account.currency_id)
+                lines = [('customer_deposits', from_account.id, total_company, from_amount)]
+                if is_internal:
+                    to_amount = Rate._convert(record.amount, record.currency_id, to_account.currency_id)
+                    lines.append(('customer_deposits', to_account.id, -amount_company, -to_amount))
+                else:
+                    lines.append(('external_clearing', False, -amount_company, False))
+                if record.fee:
+                    lines.append(('fee_income', False, amount_company - total_company, False))
+                entry = self.env['bank.journal.entry']._post(
+                    lines, record.transfer_number, f'Transfer {record.transfer_number}', transfer=record)
+                
+                # Transaction legs, linked to the entry already posted
+                Transaction = self.env['bank.transaction'].with_context(
+                    bank_skip_screening=True, bank_journal_entry_id=entry.id)
+                from_balance = from_account.balance
+                debit_txn = Transaction.create({
+                    'account_id': from_account.id,
                     'transaction_type': 'transfer_out',
                     'amount': record.total_amount,
-                    'description': f'Transfer to {record.beneficiary_name or record.to_account_id.account_number}',
+                    'currency_id': record.currency_id.id,
+                    'account_amount': from_amount,
+                    'balance_before': from_balance + from_amount,
+                    'balance_after': from_balance,
+                    'description': f'Transfer to {record.beneficiary_name or to_account.account_number}',
                     'reference': record.transfer_number,
                     'transfer_id': record.id,
                     'status': 'pending',
                 })
-                debit_txn.action_complete()
                 record.debit_transaction_id = debit_txn.id
+                record.debit_transaction_number = debit_txn.transaction_number
                 
                 # For internal transfers, create credit transaction
-                if record.transfer_type == 'internal' and record.to_account_id:
-                    credit_txn = self.env['bank.transaction'].create({
-                        'account_id': record.to_account_id.id,
+                if is_internal:
+                    to_balance = to_account.balance
+                    credit_txn = Transaction.create({
+                        'account_id': to_account.id,
                         'transaction_type': 'transfer_in',
                         'amount': record.amount,
-                        'description': f'Transfer from {record.from_account_id.account_number}',
+                        'currency_id': record.currency_id.id,
+                        'account_amount': to_amount,
+                        'balance_before': to_balance - to_amount,
+                        'balance_after': to_balance,
+                        'description': f'Transfer from {from_account.account_number}',
                         'reference': record.transfer_number,
                         'transfer_id': record.id,
                         'status': 'pending',
                     })
-                    credit_txn.action_complete()
                     record.credit_transaction_id = credit_txn.id
+                    record.credit_transaction_number = credit_txn.transaction_number
                 
                 # For external transfers, simulate gateway call
                 elif record.transfer_type in ['external', 'rtgs', 'neft', 'imps']:
@@ -211,21 +298,254 @@ class BankTransfer(models.Model):
                     record.gateway_status = 'SUCCESS'
                 
                 record.status = 'completed'
-                record.message_post(body='Transfer completed successfully')
+                record._log_posting('Transfer completed successfully')
                 
                 # Send notification
-                self.env['bank.notification'].create({
-                    'customer_id': record.from_customer_id.id,
-                    'notification_type': 'sms',
-                    'subject': 'Transfer Successful',
-                    'message': f'Transfer of {record.amount} completed. Ref: {record.transfer_number}',
-                })
+                self.env['bank.notification']._notify('transfer_success', [
+                    (record.from_customer_id, {'amount': record.amount, 'reference': record.transfer_number}),
+                ])
                 
             except Exception as e:
                 record.status = 'failed'
-                record.message_post(body=f'Transfer failed: {str(e)}')
+                record._log_posting(f'Transfer failed: {str(e)}')
                 raise
     
+    @api.model
+    def transfer_internal(self, from_account_id, to_account_id, amount, description=False):
+        """Transfer amount between two accounts of the bank and return the transfer's id, number and status
+
+        Clear transfers below the auto-approval limit between accounts in
+        the company currency take the fast path of _transfer_internal_batch;
+        other transfers are created and submitted as usual.
+        """
+        if from_account_id == to_account_id:
+            raise ValidationError('Source and destination accounts cannot be the same.')
+        if amount <= 0:
+            raise ValidationError('Amount must be positive!')
+        result = self._transfer_internal_batch([{
+            'from_account_id': from_account_id,
+            'to_account_id': to_account_id,
+            'amount': amount,
+            'description': description,
+        }])[0]
+        if 'error' in result:
+            raise ValidationError(result['error'])
+        return result
+
+    @api.model
+    def _transfer_internal_batch(self, vals_list):
+        """Complete internal transfers in bulk and return one result per vals, in order
+
+        vals hold from_account_id, to_account_id, amount and optionally
+        description, reference, standing_order_id and approved_by, a
+        transfer carrying its approver being exempt from the approval limit.
+        Results are {'id', 'transfer_number', 'status'} or {'error'}.
+
+        All the accounts are locked in id order and checked with one query,
+        then the transfers are validated one after the other against the
+        running balances and daily totals. The accepted ones are written
+        with a fixed number of statements whatever their count: one
+        sequence draw per numbering, the transfers, their journal entries,
+        their completed transaction legs and one balance update per account,
+        with audit log entries instead of chatter messages. The records, balances, notifications and live
+        updates are the same as through action_submit. Transfers needing
+        approval, held by screening or in another currency are created and
+        submitted as usual, each in its own savepoint.
+        """
+        currency = self.env.company.currency_id
+        Account = self.env['bank.account']
+        Screening = self.env['bank.screening']
+        results = [None] * len(vals_list)
+        from_ids = sorted({vals['from_account_id'] for vals in vals_list})
+        account_ids = sorted(set(from_ids) | {vals['to_account_id'] for vals in vals_list})
+        Account.flush_model()
+        self.flush_model(['from_account_id', 'transfer_date', 'status', 'amount'])
+        self.env.cr.execute("""
+            SELECT a.id, a.status, a.currency_id, a.balance, a.available_balance, a.daily_transfer_limit,
+                   c.segment, a.account_number,
+                   CASE WHEN a.id = ANY(%(from_ids)s) THEN (
+                       SELECT coalesce(sum(t.amount), 0)
+                         FROM bank_transfer t
+                        WHERE t.from_account_id = a.id AND t.transfer_date >= %(today)s
+                          AND t.status = 'completed'
+                   ) END
+              FROM bank_account a
+              LEFT JOIN bank_customer c ON c.id = a.customer_id
+             WHERE a.id = ANY(%(account_ids)s)
+             ORDER BY a.id
+               FOR UPDATE OF a
+        """, {'from_ids': from_ids, 'account_ids': account_ids, 'today': fields.Date.today()})
+        accounts = {row[0]: list(row) for row in self.env.cr.fetchall()}
+        fees = self.env['bank.fee.rule']._compute_fees([
+            ('internal', vals['amount'], accounts[vals['from_account_id']][6], currency.id)
+            if vals['from_account_id'] in accounts else ('internal', vals['amount'], False, currency.id)
+            for vals in vals_list
+        ])
+
+        # Validate against running balances; the accounts stay locked
+        accepted, regular = [], []
+        for index, (vals, fee) in enumerate(zip(vals_list, fees)):
+            source = accounts.get(vals['from_account_id'])
+            destination = accounts.get(vals['to_account_id'])
+            if not source or not destination or source is destination:
+                results[index] = {'error': 'Source and destination must be two existing accounts.'}
+                continue
+            amount = vals['amount']
+            if amount <= 0:
+                results[index] = {'error': 'Amount must be positive!'}
+                continue
+            total = amount + fee
+            from_account = Account.browse(source[0])
+            verdict, reason = Screening._screen(from_account, total, destination[7])
+            if ((amount >= AUTO_APPROVE_LIMIT and not vals.get('approved_by')) or verdict == 'hold'
+                    or source[2] != currency.id or destination[2] != currency.id):
+                regular.append(index)
+                continue
+            if source[1] != 'active':
+                results[index] = {'error': 'Source account is not active.'}
+            elif source[4] < total:
+                results[index] = {'error': 'Insufficient balance in source account.'}
+            elif source[8] + amount > source[5]:
+                results[index] = {'error': 'Daily transfer limit exceeded.'}
+            else:
+                source[4] -= total
+                source[8] += amount
+                Screening._record(from_account, total, destination[7])
+                accepted.append((index, vals, fee, verdict, reason))
+
+        if accepted:
+            self._write_internal_batch(accepted, accounts, results)
+
+        for index in regular:
+            vals = vals_list[index]
+            try:
+                with self.env.cr.savepoint():
+                    transfer = self.create({
+                        key: value for key, value in vals.items() if key != 'approved_by'
+                    } | {'transfer_type': 'internal', 'currency_id': currency.id})
+                    transfer.action_submit()
+                results[index] = {'id': transfer.id, 'transfer_number': transfer.transfer_number,
+                                  'status': transfer.status}
+            except ValidationError as e:
+                results[index] = {'error': str(e)}
+        return results
+
+    @api.model
+    def _write_internal_batch(self, accepted, accounts, results):
+        """Write the transfers validated by _transfer_internal_batch and fill their results
+
+        accepted holds (index, vals, fee, verdict, reason) tuples and
+        accounts the locked account rows, balances of the batch's start.
+        """
+        currency = self.env.company.currency_id
+        now = fields.Datetime.now()
+        Batch = self.env['bank.batch']
+        mail_context = {'tracking_disable': True, 'mail_create_nolog': True, 'mail_create_nosubscribe': True}
+        transfer_numbers = Batch._next_numbers('bank.transfer', len(accepted))
+        leg_numbers = iter(Batch._next_numbers('bank.transaction', 2 * len(accepted)))
+        transfers = self.with_context(**mail_context).create([dict(
+            vals,
+            transfer_number=number or 'New',
+            transfer_type='internal',
+            currency_id=currency.id,
+            status='completed',
+            approved_by=vals.get('approved_by') or self.env.uid,
+            approved_date=now,
+            screening_status='flagged' if verdict == 'flag' else 'clear',
+            screening_reason=reason or False,
+        ) for number, (_index, vals, _fee, verdict, reason) in zip(transfer_numbers, accepted)])
+
+        # Balances, and the balance each leg leaves, in the order of the batch
+        balances = {account_id: row[3] for account_id, row in accounts.items()}
+        deltas = defaultdict(float)
+        entries, leg_vals = [], []
+        for transfer, (_index, vals, fee, _verdict, _reason) in zip(transfers, accepted):
+            number = transfer.transfer_number
+            from_id, to_id, amount = vals['from_account_id'], vals['to_account_id'], vals['amount']
+            total = amount + fee
+            lines = [
+                ('customer_deposits', from_id, total, total),
+                ('customer_deposits', to_id, -amount, -amount),
+            ]
+            if fee:
+                lines.append(('fee_income', False, -fee, False))
+            entries.append((lines, number, f'Transfer {number}', transfer))
+            deltas[from_id] -= total
+            deltas[to_id] += amount
+            balances[from_id] -= total
+            balances[to_id] += amount
+            for account_id, other_id, leg_type, leg_amount, before, label in (
+                (from_id, to_id, 'transfer_out', total, balances[from_id] + total, 'Transfer to'),
+                (to_id, from_id, 'transfer_in', amount, balances[to_id] - amount, 'Transfer from'),
+            ):
+                leg_vals.append({
+                    'transaction_number': next(leg_numbers) or 'New',
+                    'transaction_date': now,
+                    'account_id': account_id,
+                    'transaction_type': leg_type,
+                    'amount': leg_amount,
+                    'currency_id': currency.id,
+                    'account_amount': leg_amount,
+                    'balance_before': before,
+                    'balance_after': balances[account_id],
+                    'description': f'{label} {accounts[other_id][7]}',
+                    'reference': number,
+                    'transfer_id': transfer.id,
+                    'status': 'completed',
+                })
+
+        Journal = self.env['bank.journal.entry']
+        reference = transfers[0].transfer_number if len(transfers) == 1 else \
+            f'{transfers[0].transfer_number}..{transfers[-1].transfer_number}'
+        Journal._apply_balance_deltas(deltas, reference)
+        journal_entries = Journal._create_entries(entries)
+        for index, entry in enumerate(journal_entries):
+            leg_vals[2 * index]['journal_entry_id'] = entry.id
+            leg_vals[2 * index + 1]['journal_entry_id'] = entry.id
+        legs = self.env['bank.transaction'].with_context(**mail_context).create(leg_vals)
+        self.env.cr.execute("""
+            UPDATE bank_transfer t
+               SET debit_transaction_id = l.debit_id, credit_transaction_id = l.credit_id,
+                   debit_transaction_number = l.debit_number, credit_transaction_number = l.credit_number
+              FROM unnest(%s::int[], %s::int[], %s::int[], %s::varchar[], %s::varchar[])
+                   AS l(id, debit_id, credit_id, debit_number, credit_number)
+             WHERE t.id = l.id
+        """, [transfers.ids, legs[0::2].ids, legs[1::2].ids,
+              legs[0::2].mapped('transaction_number'), legs[1::2].mapped('transaction_number')])
+        transfers.invalidate_recordset(['debit_transaction_id', 'credit_transaction_id',
+                                        'debit_transaction_number', 'credit_transaction_number'])
+
+        self.env['bank.audit.log'].create([{
+            'action': 'transfer',
+            'model_name': self._name,
+            'record_id': transfer.id,
+            'description': f'{transfer.transfer_number}: Transfer completed successfully',
+            'user_id': self.env.user.id,
+        } for transfer in transfers])
+        Event = self.env['bank.event']
+        Event._publish_transfer_status(transfers, 'completed', previous_status='draft')
+        Event._publish_transactions(legs.ids)
+        Notification = self.env['bank.notification']
+        Notification._notify('transfer_success', [
+            (transfer.from_customer_id, {'amount': transfer.amount, 'reference': transfer.transfer_number})
+            for transfer in transfers
+        ])
+        alerts = [(leg.customer_id, {
+            'transaction_type': leg.transaction_type,
+            'amount': leg.amount,
+            'account_number': leg.account_id.account_number,
+        }) for leg in legs if leg.amount >= 10000]
+        if alerts:
+            Notification._notify('transaction_alert', alerts)
+        for transfer, (index, *_rest) in zip(transfers, accepted):
+            results[index] = {'id': transfer.id, 'transfer_number': transfer.transfer_number,
+                              'status': 'completed'}
+
+    def _get_counterparty(self):
+        """Return the counterparty identifier used by velocity screening"""
+        self.ensure_one()
+        return self.to_account_id.account_number or self.beneficiary_account or False
+    
     def action_cancel(self):
         """Cancel transfer"""
         for record in self:
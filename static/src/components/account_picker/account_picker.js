@@ -0,0 +1,81 @@
+/** @odoo-module **/
+
+import { Component, useState } from "@odoo/owl";
+import { rpc } from "@web/core/network/rpc";
+import { useDebounced } from "@web/core/utils/timing";
+
+const PAGE_SIZE = 20;
+
+export class AccountPicker extends Component {
+    setup() {
+        this.state = useState({
+            term: "",
+            records: [],
+            hasMore: false,
+            open: false,
+            loading: false,
+        });
+        // Only the latest request may fill the list
+        this.requestId = 0;
+        this.debouncedSearch = useDebounced(() => this.search(), 250);
+    }
+
+    async fetchPage(offset) {
+        const requestId = ++this.requestId;
+        this.state.loading = true;
+        const result = await rpc("/bank/api/accounts/search", {
+            term: this.state.term,
+            offset,
+            limit: PAGE_SIZE,
+        });
+        if (requestId !== this.requestId) {
+            return;
+        }
+        this.state.records = offset ? [...this.state.records, ...result.records] : result.records;
+        this.state.hasMore = result.has_more;
+        this.state.loading = false;
+    }
+
+    search() {
+        return this.fetchPage(0);
+    }
+
+    loadMore() {
+        return this.fetchPage(this.state.records.length);
+    }
+
+    onFocus() {
+        this.state.open = true;
+        if (!this.state.records.length) {
+            this.search();
+        }
+    }
+
+    onInput(ev) {
+        this.state.term = ev.target.value;
+        this.state.open = true;
+        this.debouncedSearch();
+    }
+
+    onBlur() {
+        this.state.open = false;
+    }
+
+    select(account) {
+        this.state.term = "";
+        this.state.open = false;
+        this.props.onSelect(account);
+    }
+
+    clear() {
+        this.props.onSelect(null);
+    }
+}
+
+AccountPicker.template = "odoo_bank.AccountPicker";
+AccountPicker.props = {
+    value: { type: [Object, { value: null }], optional: true },
+    onSelect: Function,
+    placeholder: { type: String, optional: true },
+    showBalance: { type: Boolean, optional: true },
+};
@@ -1,6 +1,6 @@
 /** @odoo-module **/
 
-import { Component, useState } from "@odoo/owl";
+import { Component, onWillUnmount, useState } from "@odoo/owl";
 import { registry } from "@web/core/registry";
 import { useService } from "@web/core/utils/hooks";
 
@@ -19,48 +19,29 @@ export class BankDashboard extends Component {
         });
 
         this.loadDashboardData();
+
+        // Live updates pushed on commit by the posting path
+        this.busService = useService("bus_service");
+        this.onBankUpdates = this.onBankUpdates.bind(this);
+        this.busService.subscribe("odoo_bank/updates", this.onBankUpdates);
+        onWillUnmount(() => this.busService.unsubscribe("odoo_bank/updates", this.onBankUpdates));
+    }
+
+    onBankUpdates({ balances, transfers, transactions }) {
+        for (const balance of balances) {
+            this.state.totalBalance += balance.delta;
+        }
+        for (const transfer of transfers) {
+            this.state.pendingTransfers += (transfer.status === "pending") - (transfer.previous === "pending");
+        }
+        this.state.transactionCount += transactions;
     }
 
     async loadDashboardData() {
         try {
-            // Load account statistics
-            const accounts = await this.orm.searchRead(
-                "bank.account",
-                [["status", "=", "active"]],
-                ["balance"]
-            );
-
-            this.state.accountCount = accounts.length;
-            this.state.totalBalance = accounts.reduce((sum, acc) => sum + acc.balance, 0);
-
-            // Load transaction count
-            const transactionCount = await this.orm.searchCount(
-                "bank.transaction",
-                [["status", "=", "completed"]]
-            );
-            this.state.transactionCount = transactionCount;
-
-            // Load pending transfers
-            const pendingTransfers = await this.orm.searchCount(
-                "bank.transfer",
-                [["status", "=", "pending"]]
-            );
-            this.state.pendingTransfers = pendingTransfers;
-
-            // Load active loans
-            const activeLoans = await this.orm.searchCount(
-                "bank.loan",
-                [["status", "=", "active"]]
-            );
-            this.state.activeLoans = activeLoans;
-
-            // Load active FDs
-            const activeFDs = await this.orm.searchCount(
-                "bank.fixed.deposit",
-                [["status", "=", "active"]]
-            );
-            this.state.activeFDs = activeFDs;
-
+            // Aggregates are computed server-side, on the read replica when available
+            const data = await this.orm.call("bank.account", "get_dashboard_data", []);
+            Object.assign(this.state, data);
             this.state.loading = false;
         } catch (error) {
             console.error("Error loading dashboard data:", error);
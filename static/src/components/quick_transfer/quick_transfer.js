@@ -1,32 +1,55 @@
 /** @odoo-module **/
 
-import { Component, useState } from "@odoo/owl";
+import { Component, onWillUnmount, useState } from "@odoo/owl";
+import { rpc } from "@web/core/network/rpc";
 import { registry } from "@web/core/registry";
 import { useService } from "@web/core/utils/hooks";
+import { AccountPicker } from "../account_picker/account_picker";
 
 export class QuickTransfer extends Component {
     setup() {
-        this.orm = useService("orm");
         this.notification = useService("notification");
         this.state = useState({
             fromAccount: null,
             toAccount: null,
             amount: 0,
             description: "",
-            accounts: [],
             loading: false,
+            lastTransfer: null,
         });
 
-        this.loadAccounts();
+        // Balances and transfer statuses are patched in place from bus events
+        this.busService = useService("bus_service");
+        this.onBankUpdates = this.onBankUpdates.bind(this);
+        this.busService.subscribe("odoo_bank/updates", this.onBankUpdates);
+        onWillUnmount(() => this.busService.unsubscribe("odoo_bank/updates", this.onBankUpdates));
     }
 
-    async loadAccounts() {
-        const accounts = await this.orm.searchRead(
-            "bank.account",
-            [["status", "=", "active"]],
-            ["account_number", "account_name", "balance"]
-        );
-        this.state.accounts = accounts;
+    onBankUpdates({ balances, transfers }) {
+        for (const account of [this.state.fromAccount, this.state.toAccount]) {
+            const update = account && balances.find((balance) => balance.id === account.id);
+            if (update) {
+                account.balance = update.balance;
+            }
+        }
+        const lastTransfer = this.state.lastTransfer;
+        const transfer = lastTransfer && transfers.find((t) => t.id === lastTransfer.id);
+        if (transfer && transfer.status !== lastTransfer.status) {
+            lastTransfer.status = transfer.status;
+            if (transfer.status === "completed") {
+                this.notification.add("Transfer completed", { type: "success" });
+            } else if (transfer.status === "failed") {
+                this.notification.add("Transfer failed", { type: "danger" });
+            }
+        }
+    }
+
+    selectFromAccount(account) {
+        this.state.fromAccount = account;
+    }
+
+    selectToAccount(account) {
+        this.state.toAccount = account;
     }
 
     async submitTransfer() {
@@ -40,7 +63,7 @@ export class QuickTransfer extends Component {
             return;
         }
 
-        if (this.state.fromAccount === this.state.toAccount) {
+        if (this.state.fromAccount.id === this.state.toAccount.id) {
             this.notification.add("Cannot transfer to the same account", { type: "warning" });
             return;
         }
@@ -48,16 +71,21 @@ export class QuickTransfer extends Component {
         this.state.loading = true;
 
         try {
-            await this.orm.create("bank.transfer", [{
-                from_account_id: parseInt(this.state.fromAccount),
-                to_account_id: parseInt(this.state.toAccount),
-                transfer_type: "internal",
+            const transfer = await rpc("/bank/api/transfer", {
+                from_account_id: this.state.fromAccount.id,
+                to_account_id: this.state.toAccount.id,
                 amount: parseFloat(this.state.amount),
                 description: this.state.description,
-                status: "draft",
-            }]);
+            });
 
-            this.notification.add("Transfer created successfully", { type: "success" });
+            if (transfer.status === "completed") {
+                this.notification.add(`Transfer ${transfer.transfer_number} completed`, { type: "success" });
+            } else {
+                this.notification.add(`Transfer ${transfer.transfer_number} submitted for approval`, {
+                    type: "info",
+                });
+            }
+            this.state.lastTransfer = { id: transfer.id, status: transfer.status };
 
             // Reset form
             this.state.fromAccount = null;
@@ -74,5 +102,6 @@ export class QuickTransfer extends Component {
 }
 
 QuickTransfer.template = "odoo_bank.QuickTransfer";
+QuickTransfer.components = { AccountPicker };
 
 registry.category("actions").add("quick_transfer", QuickTransfer);
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+
+from . import test_bank_account
+from . import test_bank_account_hold
+from . import test_bank_concurrency
+from . import test_bank_customer
+from . import test_bank_fee_rule
+from . import test_bank_notification
+from . import test_bank_posting_mode
+from . import test_bank_reconciliation
+from . import test_bank_screening
+from . import test_bank_transaction_archive
+from . import test_bank_transfer
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests.common import TransactionCase
+
+
+class BankTestCommon(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.customer = cls._create_customer('Test Customer', 'customer@example.com', 'ID0001')
+        cls.account_a = cls._create_account(cls.customer, 'Account A', 10000.0)
+        cls.account_b = cls._create_account(cls.customer, 'Account B', 10000.0)
+
+    @classmethod
+    def _create_customer(cls, name, email, id_number, env=None, **vals):
+        return (env or cls.env)['bank.customer'].create(dict({
+            'full_name': name,
+            'date_of_birth': '1980-01-01',
+            'gender': 'other',
+            'email': email,
+            'phone': '+10000000000',
+            'id_type': 'passport',
+            'id_number': id_number,
+            'kyc_status': 'approved',
+        }, **vals))
+
+    @classmethod
+    def _create_account(cls, customer, name, balance=0.0):
+        return customer.env['bank.account'].create({
+            'account_name': name,
+            'customer_id': customer.id,
+            'balance': balance,
+            'status': 'active',
+        })
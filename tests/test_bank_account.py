@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+
+from odoo.addons.odoo_bank.models.bank_account import _RECENT_ACCOUNTS
+from .common import BankTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestBankAccountSearch(BankTestCommon):
+
+    def test_search_by_name_prefix(self):
+        """The account picker matches name prefixes whatever their case"""
+        result = self.env['bank.account'].search_accounts('account a')
+        self.assertIn(self.account_a.id, [record['id'] for record in result['records']])
+        self.assertNotIn(self.account_b.id, [record['id'] for record in result['records']])
+        result = self.env['bank.account'].search_accounts(self.account_b.account_number[:-1])
+        self.assertIn(self.account_b.id, [record['id'] for record in result['records']])
+
+    def test_name_search_uses_prefix_index(self):
+        """Name prefixes are read from the partial lower(account_name) index, not a table scan"""
+        self.env['bank.account'].flush_model()
+        self.cr.execute("SET LOCAL enable_seqscan = off")
+        self.cr.execute("""
+            EXPLAIN SELECT id FROM bank_account
+                     WHERE status = 'active' AND lower(account_name) LIKE lower(%s) || '%%'
+        """, ['Account'])
+        plan = '\n'.join(row[0] for row in self.cr.fetchall())
+        self.assertIn('bank_account_name_prefix_idx', plan)
+
+    def test_recent_accounts_updated_on_commit(self):
+        """A transfer only moves its accounts to the recent accounts once committed"""
+        key = (self.env.cr.dbname, self.env.uid)
+        Account = self.env['bank.account']
+        _RECENT_ACCOUNTS[key] = ()
+        self.addCleanup(_RECENT_ACCOUNTS.__delitem__, key)
+        self.env['bank.transfer'].transfer_internal(self.account_a.id, self.account_b.id, 10.0)
+        self.assertEqual(Account._get_recent_account_ids(), [])
+        Account._commit_recent_accounts()
+        self.assertEqual(set(Account._get_recent_account_ids()), {self.account_a.id, self.account_b.id})
+
+
+@tagged('post_install', '-at_install')
+class TestBankAccountOpening(BankTestCommon):
+
+    def test_opening_entry_keeps_books_balanced(self):
+        """An account created with a balance gets an opening entry against opening equity"""
+        account = self._create_account(self.customer, 'Opening Account', 750.0)
+        lines = self.env['bank.journal.line'].search([('account_id', '=', account.id)])
+        self.assertEqual(lines.mapped('gl_code'), ['customer_deposits'])
+        self.assertEqual((lines.debit, lines.credit), (0.0, 750.0))
+        equity = self.env['bank.journal.line'].search([('entry_id', '=', lines.entry_id.id)]) - lines
+        self.assertEqual((equity.gl_code, equity.debit), ('opening_equity', 750.0))
+
+        self.assertFalse(self.env['bank.journal.line'].search([('account_id', '=', self._create_account(
+            self.customer, 'Empty Account').id)]))
+        result = self.env['bank.journal.entry'].check_trial_balance()
+        self.assertTrue(result['balanced'])
+        self.env.cr.execute("""
+            SELECT sum(credit - debit) FROM bank_journal_line
+             WHERE gl_code = 'customer_deposits' AND account_id = %s
+        """, [account.id])
+        self.assertEqual(float(self.env.cr.fetchone()[0]), account.balance)
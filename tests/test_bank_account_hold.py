@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+from odoo.exceptions import ValidationError
+from odoo.tests import tagged
+
+from .common import BankTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestBankAccountHold(BankTestCommon):
+
+    def _hold_vals(self, account, hold_type, amount):
+        return {'account_id': account.id, 'hold_type': hold_type, 'amount': amount}
+
+    def test_card_authorisation_checked_per_account(self):
+        """Card authorisations are checked against their own account, other holds may exceed it"""
+        Hold = self.env['bank.account.hold']
+        Hold.create([
+            self._hold_vals(self.account_a, 'card_auth', 9000.0),
+            self._hold_vals(self.account_a, 'legal', 5000.0),
+            self._hold_vals(self.account_b, 'legal', 500.0),
+        ])
+        self.assertEqual(self.account_a.hold_amount, 14000.0)
+        self.assertEqual(self.account_a.available_balance, -4000.0)
+        self.assertEqual(self.account_b.available_balance, 9500.0)
+
+        with self.assertRaisesRegex(ValidationError, self.account_b.account_number):
+            Hold.create([
+                self._hold_vals(self.account_a, 'legal', 100.0),
+                self._hold_vals(self.account_b, 'card_auth', 9600.0),
+            ])
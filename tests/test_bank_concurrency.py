@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+
+from psycopg2.errors import SerializationFailure
+
+from odoo import api, SUPERUSER_ID
+from odoo.exceptions import ValidationError
+from odoo.tests import tagged
+from odoo.tools import mute_logger
+
+from .common import BankTestCommon
+
+# A transition losing the race fails either way: on a stale snapshot the
+# conditional UPDATE cannot serialize, on a fresh one it matches no row
+RACE_ERRORS = (ValidationError, SerializationFailure)
+
+
+@tagged('post_install', '-at_install')
+class TestBankConcurrency(BankTestCommon):
+    """Competing status transitions run in separate, committed transactions"""
+
+    def setUp(self):
+        super().setUp()
+        env = self._cursor()
+        customer = self._create_customer('Race Customer', 'race@example.com', 'RACE0001', env=env)
+        source = self._create_account(customer, 'Race Source', 100000.0)
+        destination = self._create_account(customer, 'Race Destination', 0.0)
+        self.customer_id, self.account_ids = customer.id, [source.id, destination.id]
+        env.cr.commit()
+        self.addCleanup(self._cleanup)
+
+    def _cursor(self):
+        """Return an environment on a new cursor, as another user session would use"""
+        cr = self.registry.cursor()
+        self.addCleanup(cr.close)
+        return api.Environment(cr, SUPERUSER_ID, {})
+
+    def _cleanup(self):
+        """Delete every row the tests committed: records, their postings, chatter and audit trail"""
+        with self.registry.cursor() as cr:
+            params = {'accounts': self.account_ids, 'customer': self.customer_id}
+            cr.execute("""
+                CREATE TEMPORARY TABLE race_records ON COMMIT DROP AS
+                    SELECT 'bank.customer'::varchar AS model, %(customer)s AS id
+                    UNION ALL SELECT 'bank.account', unnest(%(accounts)s::int[])
+                    UNION ALL SELECT 'bank.transaction', id FROM bank_transaction WHERE account_id = ANY(%(accounts)s)
+                    UNION ALL SELECT 'bank.transfer', id FROM bank_transfer
+                               WHERE from_account_id = ANY(%(accounts)s) OR to_account_id = ANY(%(accounts)s)
+                    UNION ALL SELECT 'bank.loan', id FROM bank_loan WHERE customer_id = %(customer)s
+                    UNION ALL SELECT 'bank.fixed.deposit', id FROM bank_fixed_deposit WHERE customer_id = %(customer)s
+                    UNION ALL SELECT 'bank.account.hold', id FROM bank_account_hold WHERE account_id = ANY(%(accounts)s)
+                    UNION ALL SELECT 'bank.notification', id FROM bank_notification WHERE customer_id = %(customer)s;
+                CREATE TEMPORARY TABLE race_entries ON COMMIT DROP AS
+                    SELECT entry_id AS id FROM bank_journal_line WHERE account_id = ANY(%(accounts)s)
+                    UNION SELECT journal_entry_id FROM bank_transaction
+                           WHERE account_id = ANY(%(accounts)s) AND journal_entry_id IS NOT NULL
+                    UNION SELECT e.id FROM bank_journal_entry e
+                            JOIN race_records r ON r.model = 'bank.transfer' AND r.id = e.transfer_id;
+
+                DELETE FROM mail_tracking_value WHERE mail_message_id IN (
+                    SELECT m.id FROM mail_message m JOIN race_records r ON r.model = m.model AND r.id = m.res_id);
+                DELETE FROM mail_message m USING race_records r WHERE r.model = m.model AND r.id = m.res_id;
+                DELETE FROM mail_followers f USING race_records r WHERE r.model = f.res_model AND r.id = f.res_id;
+                DELETE FROM mail_activity a USING race_records r WHERE r.model = a.res_model AND r.id = a.res_id;
+                DELETE FROM bank_audit_log l USING race_records r WHERE r.model = l.model_name AND r.id = l.record_id;
+
+                UPDATE bank_transaction SET journal_entry_id = NULL WHERE account_id = ANY(%(accounts)s);
+                DELETE FROM bank_journal_line WHERE entry_id IN (SELECT id FROM race_entries);
+                DELETE FROM bank_journal_entry WHERE id IN (SELECT id FROM race_entries);
+                DELETE FROM bank_account_hold WHERE account_id = ANY(%(accounts)s);
+                DELETE FROM bank_transaction WHERE account_id = ANY(%(accounts)s);
+                DELETE FROM bank_transfer WHERE from_account_id = ANY(%(accounts)s) OR to_account_id = ANY(%(accounts)s);
+                DELETE FROM bank_loan WHERE customer_id = %(customer)s;
+                DELETE FROM bank_fixed_deposit WHERE customer_id = %(customer)s;
+                DELETE FROM bank_notification WHERE customer_id = %(customer)s;
+                DELETE FROM bank_account WHERE id = ANY(%(accounts)s);
+                DELETE FROM bank_customer WHERE id = %(customer)s;
+            """, params)
+
+    def _create(self, model, vals):
+        env = self._cursor()
+        record_id = env[model].create(vals).id
+        env.cr.commit()
+        return record_id
+
+    def _race(self, model, record_id, method):
+        """Run method on the record in two transactions started together and return the loser's error
+
+        The first transaction commits its transition before the second one
+        attempts it, on a snapshot taken before that commit.
+        """
+        winner, loser = self._cursor(), self._cursor()
+        loser.cr.execute('SELECT 1')
+        getattr(winner[model].browse(record_id), method)()
+        winner.cr.commit()
+        with self.assertRaises(RACE_ERRORS) as error, mute_logger('odoo.sql_db'):
+            getattr(loser[model].browse(record_id), method)()
+        loser.cr.rollback()
+        return error.exception
+
+    def _transfer_vals(self, **vals):
+        return dict({
+            'from_account_id': self.account_ids[0],
+            'to_account_id': self.account_ids[1],
+            'transfer_type': 'internal',
+            'amount': 100.0,
+        }, **vals)
+
+    def test_claim_status(self):
+        """Only one of two concurrent claims of the same status succeeds"""
+        transfer_id = self._create('bank.transfer', self._transfer_vals())
+        self._race('bank.transfer', transfer_id, 'action_approve')
+        # A transaction starting after the winner committed sees the new status
+        with self.assertRaises(ValidationError):
+            self._cursor()['bank.transfer'].browse(transfer_id)._claim_status(['draft', 'pending'])
+
+    def test_transfer_approve(self):
+        """A pending transfer approved twice concurrently is posted once"""
+        transfer_id = self._create('bank.transfer', self._transfer_vals(status='pending'))
+        self._race('bank.transfer', transfer_id, 'action_approve')
+        env = self._cursor()
+        transfer = env['bank.transfer'].browse(transfer_id)
+        self.assertEqual(transfer.status, 'completed')
+        legs = env['bank.transaction'].search([('transfer_id', '=', transfer_id)])
+        self.assertEqual(len(legs), 2)
+        self.assertEqual(env['bank.account'].browse(self.account_ids[1]).balance, 100.0)
+
+    def test_loan_approve_and_disburse(self):
+        """A loan is approved once and disbursed once under concurrent actions"""
+        loan_id = self._create('bank.loan', {
+            'customer_id': self.customer_id,
+            'account_id': self.account_ids[1],
+            'loan_type': 'personal',
+            'requested_amount': 5000.0,
+            'interest_rate': 10.0,
+            'tenure_months': 12,
+            'status': 'submitted',
+        })
+        self._race('bank.loan', loan_id, 'action_approve')
+        self._race('bank.loan', loan_id, 'action_disburse')
+        env = self._cursor()
+        self.assertEqual(env['bank.loan'].browse(loan_id).status, 'active')
+        disbursements = env['bank.transaction'].search([('loan_id', '=', loan_id)])
+        self.assertEqual(len(disbursements), 1)
+        self.assertEqual(env['bank.account'].browse(self.account_ids[1]).balance, 5000.0)
+
+    def test_fd_close(self):
+        """A fixed deposit closed twice concurrently is credited once"""
+        fd_id = self._create('bank.fixed.deposit', {
+            'customer_id': self.customer_id,
+            'source_account_id': self.account_ids[1],
+            'principal_amount': 1000.0,
+            'interest_rate': 5.0,
+            'tenure_months': 12,
+            'status': 'matured',
+        })
+        self._race('bank.fixed.deposit', fd_id, 'action_close')
+        env = self._cursor()
+        fd = env['bank.fixed.deposit'].browse(fd_id)
+        self.assertEqual(fd.status, 'closed')
+        credits = env['bank.transaction'].search([('reference', '=', fd.fd_number)])
+        self.assertEqual(len(credits), 1)
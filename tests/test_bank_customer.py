@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+
+from .common import BankTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestBankCustomerSummary(BankTestCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Transfer = cls.env['bank.transfer']
+        cls.customers = cls.customer
+        for index in range(4):
+            customer = cls._create_customer(f'Customer {index}', f'customer{index}@example.com', f'ID1{index:03}')
+            first = cls._create_account(customer, f'Account {index}.1', 5000.0)
+            second = cls._create_account(customer, f'Account {index}.2', 5000.0)
+            for amount in (10.0, 20.0, 30.0):
+                Transfer.transfer_internal(first.id, second.id, amount)
+            cls.customers |= customer
+        Transfer.transfer_internal(cls.account_a.id, cls.account_b.id, 10.0)
+
+    def _summary_query_count(self, customers):
+        self.env.invalidate_all()
+        start = self.cr.sql_log_count
+        customers.get_customer_summary(transaction_limit=2)
+        return self.cr.sql_log_count - start
+
+    def test_summary_query_count(self):
+        """The number of queries does not grow with the number of customers"""
+        expected = self._summary_query_count(self.customer)
+        self.env.invalidate_all()
+        with self.assertQueryCount(expected):
+            summary = self.customers.get_customer_summary(transaction_limit=2)
+        self.assertEqual(len(summary), 5)
+        for customer_summary in summary.values():
+            self.assertEqual(len(customer_summary['transactions']), 2)
+
+    def test_summary_uses_customer_index(self):
+        """Recent transactions are read from the customer history index, not a table scan"""
+        self.env['bank.transaction'].flush_model()
+        self.cr.execute("SET LOCAL enable_seqscan = off")
+        self.cr.execute("""
+            EXPLAIN SELECT id FROM bank_transaction
+                     WHERE customer_id = %s ORDER BY transaction_date DESC, id DESC LIMIT 2
+        """, [self.customer.id])
+        plan = '\n'.join(row[0] for row in self.cr.fetchall())
+        self.assertIn('bank_transaction_customer_history_idx', plan)
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+
+from .common import BankTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestBankFeeRule(BankTestCommon):
+
+    def test_fee_bands_per_currency(self):
+        """Amounts are priced with the bands of their own currency"""
+        FeeRule = self.env['bank.fee.rule']
+        company_currency = self.env.company.currency_id
+        other = self.env.ref('base.EUR') if company_currency != self.env.ref('base.EUR') else self.env.ref('base.USD')
+        company_fee = FeeRule._compute_fees([('imps', 100.0, False, company_currency.id)])
+
+        FeeRule.create({
+            'name': f'IMPS {other.name}',
+            'transfer_type': 'imps',
+            'currency_id': other.id,
+            'min_amount': 0.0,
+            'fixed_fee': 7.0,
+        })
+        self.assertEqual(FeeRule._compute_fees([('imps', 100.0, False, other.id)]), [7.0])
+        self.assertEqual(FeeRule._compute_fees([('imps', 100.0, False, company_currency.id)]), company_fee)
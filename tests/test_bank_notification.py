@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+from datetime import timedelta
+
+from odoo.tests import tagged
+
+from .common import BankTestCommon
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('post_install', '-at_install')
+class TestBankNotification(BankTestCommon):
+
+    def _enqueue(self, *messages):
+        return self.env['bank.notification']._enqueue([{
+            'customer_id': self.customer.id,
+            'subject': 'Transfer received',
+            'message': message,
+        } for message in messages])
+
+    def test_merge_counts_repeated_messages(self):
+        """Repeated identical messages are kept with their count in the digest"""
+        digest, *others = self._enqueue('Transfer received', 'Transfer received', 'Card payment', 'Transfer received')
+        digest._merge_digests()
+        self.assertEqual(digest.coalesce_count, 4)
+        self.assertEqual(digest.message, 'Transfer received (x3)\nCard payment')
+        self.assertEqual(digest.subject, 'Account activity (4 updates)')
+        self.assertEqual({other.status for other in others}, {'merged'})
+
+    def test_merge_stops_at_send_after(self):
+        """Notifications queued after the digest's window wait for the next digest"""
+        digest, late = self._enqueue('Transfer received', 'Card payment')
+        late.flush_recordset()
+        self.env.cr.execute("UPDATE bank_notification SET create_date = %s WHERE id = %s",
+                            [digest.send_after + timedelta(seconds=1), late.id])
+        digest._merge_digests()
+        self.assertEqual(digest.coalesce_count, 1)
+        self.assertEqual(digest.message, 'Transfer received')
+        self.assertEqual(late.status, 'queued')
+
+
+@tagged('post_install', '-at_install', '-standard', 'bank_benchmark')
+class TestBankNotificationRender(BankTestCommon):
+    """Rendering benchmark of notification templates, run with --test-tags bank_benchmark"""
+
+    SAMPLES = 5000
+
+    def test_compiled_render_latency(self):
+        Template = self.env['bank.notification.template']
+        items = [(self.customer, {'amount': f'{index}.00 USD', 'reference': f'TRF{index:06}'})
+                 for index in range(self.SAMPLES)]
+
+        start = time.perf_counter()
+        expected = []
+        for customer, values in items:
+            template = Template.search([('code', '=', 'transfer_success'), ('lang', '=', False)], limit=1)
+            expected.append((template.subject.format(**values), template.body.format(**values)))
+        naive = time.perf_counter() - start
+
+        Template._get_compiled_templates()
+        start = time.perf_counter()
+        vals_list = Template._render_notifications('transfer_success', items)
+        compiled = time.perf_counter() - start
+
+        self.assertEqual([(vals['subject'], vals['message']) for vals in vals_list], expected)
+        _logger.info('Rendering %s notifications: str.format per item %.2fms, compiled templates %.2fms',
+                     self.SAMPLES, naive * 1000, compiled * 1000)
+        self.assertLess(compiled, naive, 'compiled notification templates are slower than str.format per item')
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+
+from .common import BankTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestBankPostingMode(BankTestCommon):
+
+    def _post_transfer(self, high_throughput):
+        """Submit a transfer and return (mail.message rows, mail.tracking.value rows, queries) it added"""
+        self.env['ir.config_parameter'].sudo().set_param('odoo_bank.high_throughput_mode', str(high_throughput))
+        transfer = self.env['bank.transfer'].create({
+            'from_account_id': self.account_a.id,
+            'to_account_id': self.account_b.id,
+            'transfer_type': 'internal',
+            'amount': 100.0,
+        })
+        Message = self.env['mail.message'].sudo()
+        Tracking = self.env['mail.tracking.value'].sudo()
+        self.env.flush_all()
+        messages, trackings = Message.search_count([]), Tracking.search_count([])
+        start = self.cr.sql_log_count
+        transfer.action_submit()
+        self.env.flush_all()
+        queries = self.cr.sql_log_count - start
+        self.assertEqual(transfer.status, 'completed')
+        return Message.search_count([]) - messages, Tracking.search_count([]) - trackings, queries
+
+    def test_high_throughput_mode(self):
+        """High-throughput mode posts without chatter or tracking rows, in fewer queries"""
+        # Warm up the caches loaded on first use
+        self._post_transfer(False)
+        messages, trackings, queries = self._post_transfer(False)
+        self.assertGreater(messages, 0)
+        self.assertGreater(trackings, 0)
+
+        audit_logs = self.env['bank.audit.log'].search_count([])
+        fast_messages, fast_trackings, fast_queries = self._post_transfer(True)
+        self.assertEqual(fast_messages, 0)
+        self.assertEqual(fast_trackings, 0)
+        self.assertLess(fast_queries, queries)
+        self.assertGreater(self.env['bank.audit.log'].search_count([]), audit_logs)
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+
+import base64
+
+from odoo import fields
+from odoo.tests import tagged
+
+from .common import BankTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestBankReconciliation(BankTestCommon):
+
+    def _reconcile(self, rows):
+        csv_data = 'reference,amount,date\n' + ''.join(f'{reference},{amount},{date}\n' for reference, amount, date in rows)
+        reconciliation = self.env['bank.reconciliation'].create({
+            'statement_file': base64.b64encode(csv_data.encode()),
+            'statement_filename': 'statement.csv',
+        })
+        reconciliation.action_reconcile()
+        return reconciliation
+
+    def test_exact_match_not_reused_by_fuzzy_pass(self):
+        """A transaction matched exactly is not matched again to a similar line of the same chunk"""
+        transaction = self.env['bank.transaction'].create({
+            'account_id': self.account_a.id,
+            'transaction_type': 'deposit',
+            'amount': 123.45,
+            'reference': 'STMT-000001',
+            'status': 'pending',
+        })
+        self.assertEqual(transaction.status, 'completed')
+        today = fields.Date.to_string(transaction.transaction_date.date())
+        reconciliation = self._reconcile([
+            ('STMT-000001', '123.45', today),
+            ('STMT-000001X', '123.45', today),
+        ])
+        self.assertEqual(reconciliation.status, 'done')
+        self.assertEqual(reconciliation.matched_count, 1)
+        self.assertEqual(reconciliation.fuzzy_count, 0)
+        self.assertEqual(reconciliation.unmatched_count, 1)
+        self.assertEqual(reconciliation.transaction_ids, transaction)
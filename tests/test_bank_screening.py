@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+from odoo.tests import tagged
+
+from odoo.addons.odoo_bank.models.bank_screening import _COUNTERS
+from .common import BankTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestBankScreeningCounters(BankTestCommon):
+
+    def test_reload_on_commit_counts_debit_once(self):
+        """A debit loaded by a counter reload after its commit is not added a second time"""
+        dbname = self.env.cr.dbname
+        self.addCleanup(_COUNTERS.pop, dbname, None)
+        transaction = self.env['bank.transaction'].create({
+            'account_id': self.account_a.id,
+            'transaction_type': 'withdrawal',
+            'amount': 50.0,
+            'status': 'pending',
+        })
+        self.assertEqual(transaction.status, 'completed')
+        transaction.flush_recordset()
+        # The counters expire: the postcommit callback reloads them, debit included
+        _COUNTERS.pop(dbname, None)
+        self.env['bank.screening']._commit_debits()
+        counter = _COUNTERS[dbname][('account', self.account_a.id)]
+        self.assertEqual(counter.rings['24h'].totals(time.time()), (1, 50.0))
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+from dateutil.relativedelta import relativedelta
+
+from odoo import fields
+from odoo.tests import tagged
+
+from odoo.addons.odoo_bank.models.bank_transaction_archive import ARCHIVE_COLUMNS
+from .common import BankTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestBankTransactionArchive(BankTestCommon):
+
+    def test_archive_columns(self):
+        """Every stored column of bank_transaction is moved to the archive"""
+        Transaction = self.env['bank.transaction']
+        stored = {name for name, field in Transaction._fields.items() if field.store and field.column_type}
+        self.assertEqual(set(ARCHIVE_COLUMNS), stored)
+        self.env.cr.execute("""
+            SELECT column_name FROM information_schema.columns WHERE table_name = 'bank_transaction_archive'
+        """)
+        self.assertLessEqual(set(ARCHIVE_COLUMNS), {row[0] for row in self.env.cr.fetchall()})
+
+    def test_archive_keeps_transfer_legs(self):
+        """Archived legs keep their journal entry and stay referenced by number"""
+        result = self.env['bank.transfer'].transfer_internal(self.account_a.id, self.account_b.id, 100.0)
+        transfer = self.env['bank.transfer'].browse(result['id'])
+        legs = transfer.debit_transaction_id | transfer.credit_transaction_id
+        numbers = transfer.debit_transaction_number, transfer.credit_transaction_number
+        self.assertEqual(numbers, (transfer.debit_transaction_id.transaction_number,
+                                   transfer.credit_transaction_id.transaction_number))
+        entry = legs[0].journal_entry_id
+        self.assertTrue(entry)
+
+        old_date = fields.Datetime.now() - relativedelta(years=3)
+        legs.write({'transaction_date': old_date})
+        Archive = self.env['bank.transaction.archive']
+        cutoff = Archive._hot_cutoff()
+        Archive._ensure_partitions(old_date.date(), cutoff)
+        moved = Archive._job_archive_range(min(legs.ids), max(legs.ids), {'cutoff': fields.Date.to_string(cutoff)})
+
+        self.assertEqual(moved, 2)
+        self.assertFalse(legs.exists())
+        self.assertEqual((transfer.debit_transaction_number, transfer.credit_transaction_number), numbers)
+        archived = Archive.search([('id', 'in', legs.ids)])
+        self.assertEqual(set(archived.mapped('transaction_number')), set(numbers))
+        self.assertEqual(archived.journal_entry_id, entry)
+        self.assertEqual(set(archived.mapped('screening_status')), {'clear'})
+
+    def test_archived_transaction_still_read(self):
+        """Statement lines and read_history include archived transactions"""
+        transaction = self.env['bank.transaction'].create({
+            'account_id': self.account_a.id,
+            'transaction_type': 'deposit',
+            'amount': 250.0,
+            'status': 'pending',
+        })
+        old_date = fields.Datetime.now() - relativedelta(years=3)
+        transaction.write({'transaction_date': old_date})
+        number = transaction.transaction_number
+        Archive = self.env['bank.transaction.archive']
+        cutoff = Archive._hot_cutoff()
+        Archive._ensure_partitions(old_date.date(), cutoff)
+        Archive._job_archive_range(transaction.id, transaction.id, {'cutoff': fields.Date.to_string(cutoff)})
+        self.assertFalse(transaction.exists())
+
+        history = Archive.read_history(self.account_a.ids, date_to=old_date)
+        self.assertEqual([(row['transaction_number'], row['archived']) for row in history], [(number, True)])
+
+        lines = self.account_a._get_statement_lines(date_from=old_date - relativedelta(days=1),
+                                                   date_to=old_date + relativedelta(days=1))
+        self.assertEqual([line['transaction_number'] for line in lines], [number])
+        self.assertEqual(lines[0]['amount'], 250.0)
+        self.assertEqual(lines[0]['transaction_type_label'], 'Deposit')
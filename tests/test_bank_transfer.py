@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+
+from odoo.tests import tagged
+
+from .common import BankTestCommon
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('post_install', '-at_install')
+class TestBankTransferBatch(BankTestCommon):
+
+    def _batch_query_count(self, count):
+        vals_list = [{
+            'from_account_id': self.account_a.id,
+            'to_account_id': self.account_b.id,
+            'amount': 10.0,
+        } for _index in range(count)]
+        self.env.invalidate_all()
+        start = self.cr.sql_log_count
+        results = self.env['bank.transfer']._transfer_internal_batch(vals_list)
+        self.env.flush_all()
+        queries = self.cr.sql_log_count - start
+        self.assertEqual([result['status'] for result in results], ['completed'] * count)
+        return queries
+
+    def test_fast_path_statement_count(self):
+        """The fast path writes a batch with the same number of statements whatever its size"""
+        # Warm up the caches loaded on first use (templates, parameters, sequences)
+        self._batch_query_count(1)
+        expected = self._batch_query_count(1)
+        self.assertEqual(self._batch_query_count(20), expected)
+
+    def test_fast_path_numbers(self):
+        """Numbers drawn in bulk follow the sequences and stay unique"""
+        Transfer = self.env['bank.transfer']
+        results = Transfer._transfer_internal_batch([{
+            'from_account_id': self.account_a.id,
+            'to_account_id': self.account_b.id,
+            'amount': 10.0,
+        } for _index in range(5)])
+        transfers = Transfer.browse([result['id'] for result in results])
+        legs = transfers.debit_transaction_id | transfers.credit_transaction_id
+        entries = legs.journal_entry_id
+        for records, field_name, prefix in ((transfers, 'transfer_number', 'TRF'),
+                                            (legs, 'transaction_number', 'TXN'),
+                                            (entries, 'name', 'JE')):
+            numbers = records.mapped(field_name)
+            self.assertEqual(len(set(numbers)), len(records))
+            self.assertTrue(all(number.startswith(prefix) for number in numbers))
+
+
+@tagged('post_install', '-at_install', '-standard', 'bank_benchmark')
+class TestBankTransferLatency(BankTestCommon):
+    """Latency benchmark of single Quick Transfer postings, run with --test-tags bank_benchmark"""
+
+    SAMPLES = 500
+
+    def test_transfer_internal_latency(self):
+        Transfer = self.env['bank.transfer']
+        timings = []
+        for _index in range(self.SAMPLES):
+            start = time.perf_counter()
+            Transfer.transfer_internal(self.account_a.id, self.account_b.id, 1.0)
+            self.env.flush_all()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p50 = timings[len(timings) // 2]
+        p99 = timings[int(len(timings) * 0.99) - 1]
+        _logger.info('transfer_internal over %s transfers: p50 %.2fms, p99 %.2fms, max %.2fms',
+                     self.SAMPLES, p50, p99, timings[-1])
+        self.assertLess(p99, 250, 'p99 latency of transfer_internal regressed')